@@ -0,0 +1,572 @@
+"""
+Benchmark suite for the import, the lookups and the rendering of nodesets.
+
+For each nodeset the following metrics are measured:
+
+* ``parse``: parsing the nodeset file
+* ``import``: parsing and merging the nodeset into the node model of the domain
+* ``find_*``: lookups per second of the ``find_*`` methods of :class:`~opcuadomain.opcua.OpcuaDomain`
+* ``add_uanode``: average cost of :func:`~opcuadomain.uanode.add_uanode` per documented node
+* ``render``: average cost of :func:`~opcuadomain.layout.build_need` per documented node
+* ``build``: in-process Sphinx build of a project documenting a sample of the nodes
+* ``peak_memory``: peak of the memory allocated while importing the nodeset
+
+Additionally the end-to-end ``sphinx-build`` of ``tests/doc_tests/doc_basic`` gets measured, and the
+browsing of ``WDS_Nodeset.xml`` from an in-process asyncua server: ``browse_batched`` by
+:func:`~opcuadomain.browse.browse_model` and ``browse_naive`` with one request per node, both in
+nodes per second, together with the amount of requests. The in-process server answers without network
+latency, so the requests show the round trips saved for remote servers. Times are the best of
+``--repeat`` runs. The nodeset cache is disabled for all measurements.
+
+Results are written as JSON. A run can be compared against a stored baseline, the comparison fails,
+if a metric regressed by more than the threshold::
+
+    python benchmarks/bench.py run -o baseline.json
+    python benchmarks/bench.py run -o current.json --baseline baseline.json --threshold 0.2
+    python benchmarks/bench.py compare baseline.json current.json --threshold 0.2
+
+For scaling measurements, synthetic nodesets of the given sizes get generated with
+:func:`generate.generate_nodeset` and benchmarked like the other nodesets. The node count of every
+nodeset is stored with the results, so the metrics can be plotted against the model size::
+
+    python benchmarks/bench.py run -o scaling.json --skip-doc-basic --skip-browse --nodeset none \\
+        --generate 1000 --generate 10000 --generate 100000 --namespaces 4
+    python benchmarks/bench.py plot scaling.json -o scaling.png
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from timeit import default_timer as timer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NODESET_DIR = os.path.join(REPO_DIR, "tests", "nodesets")
+DOC_BASIC_DIR = os.path.join(REPO_DIR, "tests", "doc_tests", "doc_basic")
+
+# The domain imports some of its modules by their top-level name
+sys.path.insert(0, REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, "opcuadomain"))
+
+from sphinx import __version__ as sphinx_version  # noqa: E402
+from sphinx.application import Sphinx  # noqa: E402
+from asyncua import Client, Server, ua, __version__ as asyncua_version  # noqa: E402
+from asyncua.common.xmlimporter import XmlImporter  # noqa: E402
+
+from opcuadomain import debug  # noqa: E402
+from opcuadomain.browse import NODE_CLASS_ATTRIBUTES, ServerBrowser, browse_model  # noqa: E402
+from opcuadomain.nodeset import read_nodesets  # noqa: E402
+
+from generate import (  # noqa: E402
+    DEFAULT_DEPTH, DEFAULT_FANOUT, DEFAULT_NAMESPACES, DEFAULT_REF_DENSITY, DEFAULT_SEED, generate_nodeset,
+)
+
+# Increase, if the structure of the result files changes
+RESULT_FORMAT = 1
+
+DEFAULT_NODESETS = ("Opc.Ua.NodeSet2.xml", "WDS_Nodeset.xml", "uaNodesGIM.xml")
+BROWSE_NODESET = "WDS_Nodeset.xml"
+DEFAULT_REPEAT = 3
+DEFAULT_SAMPLE = 100
+DEFAULT_THRESHOLD = 0.2
+
+# Metrics plotted against the node count, grouped by subplot
+PLOT_GROUPS = (
+    ("Import", ("parse", "import", "build"), "s"),
+    ("Per documented node", ("add_uanode", "render"), "ms"),
+    ("Lookups", (
+        "find_uanode_by_id", "find_uanode_by_name", "find_child_nodes", "find_references_by_target",
+        "find_inverse_references", "find_referencing_nodes", "find_subtypes",
+    ), "ops/s"),
+    ("Memory", ("peak_memory",), "MB"),
+)
+
+# Minimum time a lookup benchmark runs, to get stable rates for small nodesets
+MIN_LOOKUP_TIME = 0.2
+
+CONF_PY = f"""
+import sys
+sys.path.append({os.path.join(REPO_DIR, "opcuadomain")!r})
+project = "benchmark"
+extensions = ["opcuadomain"]
+opcua_nodeset_cache = False
+"""
+
+
+class Results:
+    """
+    Collected metrics of a benchmark run.
+
+    Every metric has a value, a unit and the information, whether lower values are better.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.nodesets: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, value: float, unit: str, lower_is_better: bool = True) -> None:
+        self.metrics[name] = {"value": value, "unit": unit, "lower_is_better": lower_is_better}
+        print(f"  {name:<50} {value:>14.4f} {unit}", flush=True)
+
+    def add_nodeset(self, name: str, nodes: int, **options: Any) -> None:
+        """Stores the node count and the generator options of a benchmarked nodeset."""
+        self.nodesets[name] = dict(nodes=nodes, **options)
+
+    def to_json(self, repeat: int) -> Dict[str, Any]:
+        return {
+            "format": RESULT_FORMAT,
+            "environment": {
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "sphinx": sphinx_version,
+                "asyncua": asyncua_version,
+                "commit": _git_commit(),
+                "repeat": repeat,
+            },
+            "nodesets": self.nodesets,
+            "metrics": self.metrics,
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Returns the shortest runtime of ``repeat`` calls of ``func`` in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times)
+
+
+def _create_project(project_dir: str, nodeset_path: Optional[str], sample: List[Tuple[str, str]]) -> None:
+    """Creates a Sphinx project, which imports the nodeset and documents the sampled nodes."""
+    os.makedirs(project_dir, exist_ok=True)
+    with open(os.path.join(project_dir, "conf.py"), "w", encoding="utf-8") as f:
+        f.write(CONF_PY)
+
+    lines = ["Benchmark", "=========", ""]
+    if nodeset_path is not None:
+        shutil.copy(nodeset_path, project_dir)
+        lines += [f".. opcua:uaimport:: {os.path.basename(nodeset_path)}", ""]
+    for browsename, nodetype in sample:
+        lines += [f".. opcua:uanode:: {browsename} {nodetype}", ""]
+    with open(os.path.join(project_dir, "index.rst"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def _create_app(project_dir: str, **confoverrides: Any) -> Sphinx:
+    return Sphinx(
+        project_dir,
+        project_dir,
+        os.path.join(project_dir, "_build", "html"),
+        os.path.join(project_dir, "_build", "doctrees"),
+        "html",
+        status=None,
+        warning=io.StringIO(),
+        freshenv=True,
+        confoverrides=confoverrides,
+    )
+
+
+def _sample_nodes(ua_nodes: List[Any], size: int) -> List[Tuple[str, str]]:
+    """Returns ``size`` nodes as (BrowseName, NodeClass), which can be documented by ``uanode``."""
+    seen = set()
+    candidates = []
+    for ua_node in ua_nodes:
+        key = (ua_node.browsename, ua_node.nodetype)
+        if key in seen or not ua_node.browsename or any(c.isspace() for c in ua_node.browsename):
+            continue
+        seen.add(key)
+        candidates.append(key)
+    if len(candidates) <= size:
+        return candidates
+    step = len(candidates) / size
+    return [candidates[int(index * step)] for index in range(size)]
+
+
+def bench_import(results: Results, name: str, path: str, work_dir: str, repeat: int) -> List[Any]:
+    """Measures parsing and importing of a nodeset and the peak memory of the import."""
+    nodeset = read_nodesets([path], 1)[0]
+    results.add(f"{name}/parse", best_of(repeat, lambda: read_nodesets([path], 1)), "s")
+
+    project_dir = os.path.join(work_dir, "empty")
+    _create_project(project_dir, None, [])
+
+    times = []
+    for _ in range(repeat):
+        opcua = _create_app(project_dir).env.get_domain("opcua")
+        start = timer()
+        ua_namespaces, ua_aliases, ua_nodes = read_nodesets([path], 1)[0]
+        opcua.add_nodeset(path, ua_namespaces, ua_aliases, ua_nodes)
+        times.append(timer() - start)
+    results.add(f"{name}/import", min(times), "s")
+
+    opcua = _create_app(project_dir).env.get_domain("opcua")
+    tracemalloc.start()
+    try:
+        ua_namespaces, ua_aliases, ua_nodes = read_nodesets([path], 1)[0]
+        opcua.add_nodeset(path, ua_namespaces, ua_aliases, ua_nodes)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    results.add(f"{name}/peak_memory", peak / (1024 * 1024), "MB")
+
+    return nodeset[2]
+
+
+def bench_lookups(results: Results, name: str, opcua: Any, ua_nodes: List[Any]) -> None:
+    """Measures the throughput of the ``find_*`` methods over all nodes of the nodeset."""
+    node_ids = [ua_node.nodeid for ua_node in ua_nodes]
+    names = [(ua_node.browsename, ua_node.nodetype) for ua_node in ua_nodes]
+    type_ids = [ua_node.nodeid for ua_node in ua_nodes if ua_node.nodetype.endswith("Type")]
+
+    lookups = {
+        "find_uanode_by_id": (opcua.find_uanode_by_id, [(node_id,) for node_id in node_ids]),
+        "find_uanode_by_name": (opcua.find_uanode_by_name, names),
+        "find_child_nodes": (lambda node_id: list(opcua.find_child_nodes(node_id)), [(node_id,) for node_id in node_ids]),
+        "find_references_by_target": (opcua.find_references_by_target, [(node_id,) for node_id in node_ids]),
+        "find_inverse_references": (opcua.find_inverse_references, [(node_id,) for node_id in node_ids]),
+        "find_referencing_nodes": (opcua.find_referencing_nodes, [(node_id,) for node_id in type_ids]),
+        "find_subtypes": (opcua.find_subtypes, [(node_id,) for node_id in type_ids]),
+    }
+    for method, (func, arguments) in lookups.items():
+        if not arguments:
+            continue
+        count = 0
+        start = timer()
+        while True:
+            for args in arguments:
+                func(*args)
+            count += len(arguments)
+            elapsed = timer() - start
+            if elapsed >= MIN_LOOKUP_TIME:
+                break
+        results.add(f"{name}/{method}", count / elapsed, "ops/s", lower_is_better=False)
+
+
+def bench_build(results: Results, name: str, path: str, ua_nodes: List[Any], work_dir: str,
+                repeat: int, sample: int) -> Any:
+    """
+    Builds a project documenting a sample of the nodes and measures the build, ``add_uanode`` and
+    ``build_need``.
+
+    :return: the domain of the last build
+    """
+    project_dir = os.path.join(work_dir, "build")
+    nodes = _sample_nodes(ua_nodes, sample)
+    _create_project(project_dir, path, nodes)
+
+    build_times = []
+    per_node = {"add_uanode": [], "render": []}
+    try:
+        for _ in range(repeat):
+            shutil.rmtree(os.path.join(project_dir, "_build"), ignore_errors=True)
+            app = _create_app(project_dir, opcua_time_measurements=True)
+            start = timer()
+            # The timing report is printed at the end of the build
+            with contextlib.redirect_stdout(io.StringIO()):
+                app.build(force_all=True)
+            build_times.append(timer() - start)
+            for metric, mt_id in (("add_uanode", "uanode_add_uanode"), ("render", "layout_build_need")):
+                measurement = debug.TIME_MEASUREMENTS.get(mt_id)
+                if measurement is not None:
+                    per_node[metric].append(measurement.avg)
+    finally:
+        debug.EXECUTE_TIME_MEASUREMENTS = False
+        debug.TIME_MEASUREMENTS.clear()
+
+    results.add(f"{name}/build", min(build_times), "s")
+    for metric, values in per_node.items():
+        if values:
+            results.add(f"{name}/{metric}", min(values) * 1000, "ms")
+    return app.env.get_domain("opcua")
+
+
+def bench_nodeset(results: Results, path: str, repeat: int, sample: int, **options: Any) -> None:
+    """
+    Runs all benchmarks of a nodeset.
+
+    :param options: generator options of a synthetic nodeset, stored with the results
+    """
+    name = os.path.basename(path)
+    print(f"{name}:", flush=True)
+    with tempfile.TemporaryDirectory(prefix="opcua-bench-") as work_dir:
+        ua_nodes = bench_import(results, name, path, work_dir, repeat)
+        results.add_nodeset(name, len(ua_nodes), **options)
+        opcua = bench_build(results, name, path, ua_nodes, work_dir, repeat, sample)
+        bench_lookups(results, name, opcua, ua_nodes)
+
+
+def bench_doc_basic(results: Results, repeat: int) -> None:
+    """Measures a clean ``sphinx-build`` of ``tests/doc_tests/doc_basic`` in a new process."""
+    print("doc_basic:", flush=True)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory(prefix="opcua-bench-") as out_dir:
+        command = [
+            sys.executable, "-m", "sphinx", "-b", "html", "-E", "-q",
+            "-D", "opcua_nodeset_cache=0", DOC_BASIC_DIR, out_dir,
+        ]
+        results.add(
+            "doc_basic/sphinx_build",
+            best_of(repeat, lambda: subprocess.run(command, env=env, check=True, capture_output=True)),
+            "s",
+        )
+
+
+class _NodesetImporter(XmlImporter):
+    # The models of the bundled nodesets require each other, which the check of asyncua does not allow
+    async def _check_required_models(self, xmlpath=None, xmlstring=None):
+        return None
+
+
+async def _browse_naive(client: Client) -> Tuple[int, int]:
+    """
+    Browses the address space with one Browse and one Read request per node.
+
+    :return: amount of found server nodes and of requests
+    """
+    seen = {ua.NodeId(ua.ObjectIds.RootFolder)}
+    level = list(seen)
+    count = requests = 0
+    while level:
+        next_level = []
+        for node_id in level:
+            references = await client.get_node(node_id).get_references(direction=ua.BrowseDirection.Forward)
+            requests += 1
+            for reference in references:
+                if reference.NodeId in seen:
+                    continue
+                seen.add(reference.NodeId)
+                next_level.append(reference.NodeId)
+                if reference.NodeId.NamespaceIndex != 0:
+                    attributes = (ua.AttributeIds.Description,) + NODE_CLASS_ATTRIBUTES.get(reference.NodeClass, ())
+                    await client.get_node(reference.NodeId).read_attributes(list(attributes))
+                    requests += 1
+                    count += 1
+        level = next_level
+    return count, requests
+
+
+async def _browse_batched(client: Client) -> Tuple[int, int]:
+    browser = ServerBrowser(client)
+    model = await browse_model(browser)
+    return len(model.nodes), browser.request_count
+
+
+async def _bench_browse(results: Results, path: str, repeat: int) -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        url = f"opc.tcp://127.0.0.1:{s.getsockname()[1]}/"
+    server = Server()
+    await server.init()
+    server.set_endpoint(url)
+    await _NodesetImporter(server).import_xml(path)
+    name = os.path.basename(path)
+    async with server:
+        async with Client(url) as client:
+            for method, browse in (("browse_batched", _browse_batched), ("browse_naive", _browse_naive)):
+                times = []
+                for _ in range(repeat):
+                    start = timer()
+                    count, requests = await browse(client)
+                    times.append(timer() - start)
+                results.add(f"{name}/{method}", count / min(times), "nodes/s", lower_is_better=False)
+                results.add(f"{name}/{method}_requests", requests, "requests")
+
+
+def bench_browse(results: Results, repeat: int) -> None:
+    """Measures browsing a nodeset from an in-process server, batched against one request per node."""
+    print("browse:", flush=True)
+    # Warnings of the server about the nodeset and its security policies do not matter here
+    logging.getLogger("asyncua").setLevel(logging.ERROR)
+    asyncio.run(_bench_browse(results, os.path.join(NODESET_DIR, BROWSE_NODESET), repeat))
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compares two result files and prints the change of each metric.
+
+    :param threshold: allowed relative change in the worse direction, like ``0.2`` for 20%
+    :return: names of the regressed metrics
+    """
+    regressions = []
+    base_metrics = baseline["metrics"]
+    print(f"{'metric':<50} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name, metric in current["metrics"].items():
+        base = base_metrics.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<50} {'-':>14} {metric['value']:>14.4f}       new")
+            continue
+        change = metric["value"] / base["value"] - 1
+        # Relative loss, positive if the metric got worse
+        loss = change if metric["lower_is_better"] else -change
+        regressed = loss > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<50} {base['value']:>14.4f} {metric['value']:>14.4f} {change:>+8.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    for name in base_metrics.keys() - current["metrics"].keys():
+        print(f"{name:<50} {base_metrics[name]['value']:>14.4f} {'-':>14}   missing")
+    return regressions
+
+
+def _load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != RESULT_FORMAT:
+        raise SystemExit(f"{path} has result format {data.get('format')}, expected {RESULT_FORMAT}")
+    return data
+
+
+def _check(baseline_path: str, current: Dict[str, Any], threshold: float) -> int:
+    regressions = compare(_load_results(baseline_path), current, threshold)
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"No metric regressed by more than {threshold:.0%}.")
+    return 0
+
+
+def bench_generated(results: Results, args: argparse.Namespace) -> None:
+    """Generates the synthetic nodesets given by ``--generate`` and benchmarks them."""
+    options = dict(namespaces=args.namespaces, depth=args.depth, fanout=args.fanout,
+                   ref_density=args.ref_density, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="opcua-bench-") as generate_dir:
+        for nodes in args.generate:
+            path = os.path.join(generate_dir, f"synthetic-{nodes}.xml")
+            start = timer()
+            generate_nodeset(path, nodes, **options)
+            print(f"Generated {nodes} nodes in {timer() - start:.1f} s.", flush=True)
+            bench_nodeset(results, path, args.repeat, args.sample, generated=options)
+            os.remove(path)
+
+
+def plot(results_paths: List[str], output: str) -> None:
+    """
+    Plots the metrics of the nodesets in the result files against their node count, one line per
+    metric and result file on log-log axes.
+    """
+    try:
+        import matplotlib
+    except ImportError:
+        raise SystemExit("Plotting requires matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, axes = plt.subplots(2, 2, figsize=(14, 10))
+    for ax, (title, metrics, unit) in zip(axes.flat, PLOT_GROUPS):
+        for results_path in results_paths:
+            data = _load_results(results_path)
+            label_prefix = f"{os.path.basename(results_path)}: " if len(results_paths) > 1 else ""
+            sizes = sorted((info["nodes"], name) for name, info in data.get("nodesets", {}).items())
+            for metric in metrics:
+                points = [
+                    (nodes, data["metrics"][f"{name}/{metric}"]["value"])
+                    for nodes, name in sizes
+                    if f"{name}/{metric}" in data["metrics"]
+                ]
+                if points:
+                    ax.plot(*zip(*points), marker="o", label=f"{label_prefix}{metric}")
+        ax.set_title(title)
+        ax.set_xlabel("nodes")
+        ax.set_ylabel(unit)
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.grid(True, which="both", alpha=0.3)
+        if ax.has_data():
+            ax.legend(fontsize="small")
+    figure.tight_layout()
+    figure.savefig(output)
+    print(f"Plot stored under {output}")
+
+
+def run(args: argparse.Namespace) -> int:
+    results = Results()
+    if args.nodeset == ["none"]:
+        nodesets = []
+    else:
+        nodesets = args.nodeset or [os.path.join(NODESET_DIR, name) for name in DEFAULT_NODESETS]
+    for path in nodesets:
+        bench_nodeset(results, path, args.repeat, args.sample)
+    if args.generate:
+        bench_generated(results, args)
+    if not args.skip_doc_basic:
+        bench_doc_basic(results, args.repeat)
+    if not args.skip_browse:
+        bench_browse(results, args.repeat)
+
+    data = results.to_json(args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        print(f"Results stored under {args.output}")
+    if args.baseline:
+        return _check(args.baseline, data, args.threshold)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks import, lookups and rendering of nodesets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="JSON file for the results")
+    run_parser.add_argument("--nodeset", action="append", help="nodeset file, default are the bundled nodesets, none to skip them")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per measurement, the best is taken")
+    run_parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="nodes documented per nodeset")
+    run_parser.add_argument("--skip-doc-basic", action="store_true", help="skip the sphinx-build of doc_basic")
+    run_parser.add_argument("--skip-browse", action="store_true", help="skip browsing a nodeset from a server")
+    run_parser.add_argument("--baseline", help="result file to compare against, fails on regressions")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative regression")
+    run_parser.add_argument("--generate", type=int, action="append", metavar="NODES",
+                            help="benchmark a generated nodeset with the given amount of nodes")
+    run_parser.add_argument("--namespaces", type=int, default=DEFAULT_NAMESPACES, help="namespaces of generated nodesets")
+    run_parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="instance tree depth of generated nodesets")
+    run_parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT, help="children per object of generated nodesets")
+    run_parser.add_argument("--ref-density", type=float, default=DEFAULT_REF_DENSITY,
+                            help="references per instance of generated nodesets")
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed of generated nodesets")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline", help="result file of the baseline")
+    compare_parser.add_argument("current", help="result file to check")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative regression")
+
+    plot_parser = commands.add_parser("plot", help="plot metrics against the node count of the nodesets")
+    plot_parser.add_argument("results", nargs="+", help="result files")
+    plot_parser.add_argument("-o", "--output", default="scaling.png", help="image file of the plot")
+
+    args = parser.parse_args(argv)
+    if args.command == "plot":
+        plot(args.results, args.output)
+        return 0
+    if args.command == "compare":
+        return _check(args.baseline, _load_results(args.current), args.threshold)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
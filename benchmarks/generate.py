@@ -0,0 +1,296 @@
+"""
+Generator for synthetic NodeSet2 files of a given size, used for scaling benchmarks.
+
+The generated model has for each namespace:
+
+* a ReferenceType ``ConnectedTo``, a subtype of ``NonHierarchicalReferences``
+* a hierarchy of ObjectTypes below ``BaseObjectType``, each type with mandatory variable components
+* a folder below ``Objects`` with trees of object instances. Each object has ``fanout`` children,
+  objects and variables, up to ``depth`` levels. Further trees get added, until the node count is
+  reached.
+* ``ConnectedTo`` references between random instances, ``ref_density`` per instance on average
+
+The same options and seed always produce the same file. The file gets written while generating,
+so even files with millions of nodes need little memory::
+
+    python benchmarks/generate.py 100000 -o synthetic.xml --namespaces 4 --seed 1
+"""
+import argparse
+import random
+from array import array
+from typing import IO, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+DEFAULT_NAMESPACES = 1
+DEFAULT_DEPTH = 4
+DEFAULT_FANOUT = 8
+DEFAULT_TYPES = 20
+DEFAULT_TYPE_COMPONENTS = 3
+DEFAULT_REF_DENSITY = 0.5
+DEFAULT_VARIABLE_RATIO = 0.5
+DEFAULT_SEED = 0
+
+NAMESPACE_TEMPLATE = "http://opcuadomain.example/synthetic/{}/"
+
+ALIASES = {
+    "Boolean": "i=1",
+    "Int32": "i=6",
+    "Double": "i=11",
+    "String": "i=12",
+    "Organizes": "i=35",
+    "HasModellingRule": "i=37",
+    "HasTypeDefinition": "i=40",
+    "HasSubtype": "i=45",
+    "HasProperty": "i=46",
+    "HasComponent": "i=47",
+}
+
+DATA_TYPES = ("Boolean", "Int32", "Double", "String")
+
+OBJECTS_FOLDER = "i=85"
+BASE_OBJECT_TYPE = "i=58"
+FOLDER_TYPE = "i=61"
+BASE_DATA_VARIABLE_TYPE = "i=63"
+PROPERTY_TYPE = "i=68"
+NON_HIERARCHICAL_REFERENCES = "i=32"
+MANDATORY = "i=78"
+
+# Instance NodeIds start here, below are the types of the namespace
+FIRST_INSTANCE_ID = 100000
+
+
+class _Writer:
+    """Writes node elements of a NodeSet2 file."""
+
+    def __init__(self, f: IO[str]) -> None:
+        self.f = f
+        self.count = 0
+
+    def node(self, tag: str, node_id: str, browsename: str, references: List[Tuple[str, str, bool]],
+             attributes: Optional[dict] = None, description: Optional[str] = None,
+             parent: Optional[str] = None, inverse_name: Optional[str] = None) -> None:
+        attrs = {"NodeId": node_id, "BrowseName": browsename}
+        if parent:
+            attrs["ParentNodeId"] = parent
+        if attributes:
+            attrs.update(attributes)
+        write = self.f.write
+        write(f"    <{tag} " + " ".join(f"{key}={quoteattr(str(value))}" for key, value in attrs.items()) + ">\n")
+        write(f"        <DisplayName>{escape(browsename.split(':', 1)[-1])}</DisplayName>\n")
+        if description:
+            write(f"        <Description>{escape(description)}</Description>\n")
+        write("        <References>\n")
+        for reftype, target, forward in references:
+            is_forward = "" if forward else ' IsForward="false"'
+            write(f"            <Reference ReferenceType=\"{reftype}\"{is_forward}>{target}</Reference>\n")
+        write("        </References>\n")
+        if inverse_name:
+            write(f"        <InverseName>{escape(inverse_name)}</InverseName>\n")
+        write(f"    </{tag}>\n")
+        self.count += 1
+
+
+def _header(f: IO[str], namespaces: List[str]) -> None:
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    f.write(
+        '<UANodeSet xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xmlns="http://opcfoundation.org/UA/2011/03/UANodeSet.xsd" '
+        'xmlns:uax="http://opcfoundation.org/UA/2008/02/Types.xsd" '
+        'xmlns:xsd="http://www.w3.org/2001/XMLSchema">\n'
+    )
+    f.write("    <NamespaceUris>\n")
+    for uri in namespaces:
+        f.write(f"        <Uri>{escape(uri)}</Uri>\n")
+    f.write("    </NamespaceUris>\n")
+    f.write("    <Models>\n")
+    for uri in namespaces:
+        f.write(f'        <Model ModelUri={quoteattr(uri)} PublicationDate="2024-01-01T00:00:00Z" Version="1.00">\n')
+        f.write(
+            '            <RequiredModel ModelUri="http://opcfoundation.org/UA/" '
+            'PublicationDate="2021-09-15T00:00:00Z" Version="1.04.10"/>\n'
+        )
+        f.write("        </Model>\n")
+    f.write("    </Models>\n")
+    f.write("    <Aliases>\n")
+    for alias, target in ALIASES.items():
+        f.write(f'        <Alias Alias="{alias}">{target}</Alias>\n')
+    f.write("    </Aliases>\n")
+
+
+def generate_nodeset(
+    path: str,
+    nodes: int,
+    namespaces: int = DEFAULT_NAMESPACES,
+    depth: int = DEFAULT_DEPTH,
+    fanout: int = DEFAULT_FANOUT,
+    types: int = DEFAULT_TYPES,
+    type_components: int = DEFAULT_TYPE_COMPONENTS,
+    ref_density: float = DEFAULT_REF_DENSITY,
+    variable_ratio: float = DEFAULT_VARIABLE_RATIO,
+    seed: int = DEFAULT_SEED,
+) -> int:
+    """
+    Writes a synthetic nodeset with exactly ``nodes`` nodes.
+
+    If ``nodes`` is too small for the types of all namespaces, less types get generated.
+
+    :param path: path of the written nodeset
+    :param nodes: amount of nodes
+    :param namespaces: amount of namespaces, the nodes are spread over them
+    :param depth: levels of an instance tree below its root object
+    :param fanout: children per object of an instance tree
+    :param types: ObjectTypes per namespace
+    :param type_components: variable components per ObjectType
+    :param ref_density: average amount of ``ConnectedTo`` references per instance
+    :param variable_ratio: share of variables among the children of an object, the last level
+                           consists of variables only
+    :param seed: seed of the random generator
+    :return: amount of written nodes
+    """
+    rng = random.Random(seed)
+    namespaces = max(1, namespaces)
+    uris = [NAMESPACE_TEMPLATE.format(index) for index in range(1, namespaces + 1)]
+
+    # ReferenceType and folder per namespace, types as far as the node count allows
+    static_per_namespace = 2
+    if nodes < namespaces * static_per_namespace:
+        raise ValueError(f"At least {namespaces * static_per_namespace} nodes are needed for {namespaces} namespaces")
+    types = max(0, min(types, (nodes // namespaces - static_per_namespace) // (1 + type_components)))
+
+    with open(path, "w", encoding="utf-8") as f:
+        _header(f, uris)
+        writer = _Writer(f)
+
+        type_ids: List[List[str]] = []
+        folders = []
+        for ns in range(1, namespaces + 1):
+            prefix = f"ns={ns};i="
+            connected_to = f"{prefix}1"
+            writer.node(
+                "UAReferenceType", connected_to, f"{ns}:ConnectedTo", [("HasSubtype", NON_HIERARCHICAL_REFERENCES, False)],
+                description="Connects two synthetic instances.", inverse_name="ConnectedFrom",
+            )
+
+            namespace_types: List[str] = []
+            next_id = 1000
+            for type_index in range(types):
+                type_id = f"{prefix}{next_id}"
+                next_id += 1
+                # Most types derive from an earlier type, so the hierarchy gets several levels deep
+                supertype = rng.choice(namespace_types) if namespace_types and rng.random() < 0.8 else BASE_OBJECT_TYPE
+                writer.node(
+                    "UAObjectType", type_id, f"{ns}:Type_{ns}_{type_index}", [("HasSubtype", supertype, False)],
+                    description=f"Synthetic object type {type_index}.",
+                )
+                for component_index in range(type_components):
+                    component_id = f"{prefix}{next_id}"
+                    next_id += 1
+                    writer.node(
+                        "UAVariable", component_id, f"{ns}:Component_{component_index}",
+                        [
+                            ("HasComponent", type_id, False),
+                            ("HasTypeDefinition", BASE_DATA_VARIABLE_TYPE, True),
+                            ("HasModellingRule", MANDATORY, True),
+                        ],
+                        attributes={"DataType": DATA_TYPES[component_index % len(DATA_TYPES)]},
+                        description=f"Component {component_index} of type {type_index}.",
+                        parent=type_id,
+                    )
+                namespace_types.append(type_id)
+            type_ids.append(namespace_types)
+
+            folder_id = f"{prefix}2"
+            writer.node(
+                "UAObject", folder_id, f"{ns}:Folder_{ns}",
+                [("Organizes", OBJECTS_FOLDER, False), ("HasTypeDefinition", FOLDER_TYPE, True)],
+                parent=OBJECTS_FOLDER,
+            )
+            folders.append(folder_id)
+
+        # Namespace index per instance, the NodeId is FIRST_INSTANCE_ID + position
+        instance_ns = array("B" if namespaces < 256 else "H")
+        remaining = nodes - writer.count
+        root_index = 0
+        while remaining > 0:
+            ns = root_index % namespaces + 1
+            root_index += 1
+            level: List[str] = []
+            parent = folders[ns - 1]
+            for current_depth in range(depth + 1):
+                parents = level if current_depth else [parent]
+                level = []
+                for parent_id in parents:
+                    children = 1 if current_depth == 0 else fanout
+                    for _ in range(children):
+                        if remaining == 0:
+                            break
+                        remaining -= 1
+                        node_id = f"ns={ns};i={FIRST_INSTANCE_ID + len(instance_ns)}"
+                        position = len(instance_ns)
+                        instance_ns.append(ns)
+
+                        references = [
+                            ("Organizes" if current_depth == 0 else "HasComponent", parent_id, False)
+                        ]
+                        connections = int(ref_density) + (rng.random() < ref_density % 1)
+                        for _ in range(connections if position else 0):
+                            target = rng.randrange(position)
+                            references.append(
+                                (f"ns={ns};i=1", f"ns={instance_ns[target]};i={FIRST_INSTANCE_ID + target}", True)
+                            )
+                        description = f"Synthetic instance {position}." if position % 4 == 0 else None
+
+                        last_level = current_depth == depth
+                        if current_depth > 0 and (last_level or rng.random() < variable_ratio):
+                            is_property = rng.random() < 0.2
+                            references.append(
+                                ("HasTypeDefinition", PROPERTY_TYPE if is_property else BASE_DATA_VARIABLE_TYPE, True)
+                            )
+                            if is_property:
+                                references[0] = ("HasProperty", parent_id, False)
+                            attributes = {"DataType": rng.choice(DATA_TYPES)}
+                            if position % 10 == 0:
+                                attributes.update({"ValueRank": 1, "ArrayDimensions": 0})
+                            writer.node(
+                                "UAVariable", node_id, f"{ns}:Variable_{position}", references,
+                                attributes=attributes, description=description, parent=parent_id,
+                            )
+                        else:
+                            namespace_types = type_ids[ns - 1]
+                            typedef = rng.choice(namespace_types) if namespace_types else BASE_OBJECT_TYPE
+                            references.append(("HasTypeDefinition", typedef, True))
+                            writer.node(
+                                "UAObject", node_id, f"{ns}:Object_{position}", references,
+                                description=description, parent=parent_id,
+                            )
+                            level.append(node_id)
+                if not level:
+                    break
+
+        f.write("</UANodeSet>\n")
+    return writer.count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generates a synthetic nodeset for scaling benchmarks.")
+    parser.add_argument("nodes", type=int, help="amount of nodes")
+    parser.add_argument("-o", "--output", required=True, help="nodeset file to write")
+    parser.add_argument("--namespaces", type=int, default=DEFAULT_NAMESPACES, help="amount of namespaces")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="levels of the instance trees")
+    parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT, help="children per object")
+    parser.add_argument("--types", type=int, default=DEFAULT_TYPES, help="ObjectTypes per namespace")
+    parser.add_argument("--type-components", type=int, default=DEFAULT_TYPE_COMPONENTS, help="components per ObjectType")
+    parser.add_argument("--ref-density", type=float, default=DEFAULT_REF_DENSITY, help="ConnectedTo references per instance")
+    parser.add_argument("--variable-ratio", type=float, default=DEFAULT_VARIABLE_RATIO, help="share of variables among children")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed of the random generator")
+    args = parser.parse_args(argv)
+
+    count = generate_nodeset(
+        args.output, args.nodes, args.namespaces, args.depth, args.fanout, args.types,
+        args.type_components, args.ref_density, args.variable_ratio, args.seed,
+    )
+    print(f"Wrote {count} nodes to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
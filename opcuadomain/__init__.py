@@ -1 +1,6 @@
-from opcuadomain.opcua import setup
\ No newline at end of file
+def setup(app):
+    # The domain imports some of its modules by their top-level name, so it is only imported, when
+    # Sphinx loads the extension. Modules like opcuadomain.convert can be used on their own.
+    from opcuadomain.opcua import setup as opcua_setup
+
+    return opcua_setup(app)
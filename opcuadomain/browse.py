@@ -0,0 +1,641 @@
+"""
+Import of the node model from a running OPC UA server.
+
+The address space gets browsed breadth-first, starting at the Root folder and following all forward
+references. Each level is browsed with batched ``Browse`` requests, references exceeding the limit
+of the server are fetched with ``BrowseNext`` by their continuation points. The attributes of the
+found nodes are read with batched ``Read`` requests, which run concurrently to the browsing of the
+next level. The amount of requests in flight is bounded.
+
+The imported nodes are grouped into subtrees. A subtree starts at a node of the server, which is
+referenced by a core node, like a folder below ``Objects`` or a subtype of ``BaseObjectType``, and
+contains all server nodes found below it. :func:`revalidate_model` uses the subtrees and the
+``NamespacePublicationDate`` of the namespaces to check a previously browsed model, without browsing
+the whole address space again.
+
+Nodes of the core namespace are browsed to find the nodes below them, but they are not imported,
+the same as for an import of the nodeset files. The result has the same form as a parsed nodeset:
+namespaces, aliases and :class:`~opcuadomain.records.UANodeRecord` objects. References are stored
+once per pair of nodes, like in an exported nodeset: inverse hierarchical references to the parent
+and forward non-hierarchical ones.
+"""
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from asyncua import Client, ua
+from asyncua.ua.object_ids import ObjectIdNames
+
+from opcuadomain.logging import get_logger
+from opcuadomain.nodestore import NamespaceRemapper, nodeid_namespace
+from opcuadomain.records import UANodeRecord, UAReference, intern_str
+
+logger = get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_REQUESTS = 4
+
+SERVER_SCHEMES = ("opc.tcp",)
+
+NODE_CLASS_NAMES = {
+    ua.NodeClass.Object: "UAObject",
+    ua.NodeClass.Variable: "UAVariable",
+    ua.NodeClass.Method: "UAMethod",
+    ua.NodeClass.ObjectType: "UAObjectType",
+    ua.NodeClass.VariableType: "UAVariableType",
+    ua.NodeClass.ReferenceType: "UAReferenceType",
+    ua.NodeClass.DataType: "UADataType",
+    ua.NodeClass.View: "UAView",
+}
+
+_A = ua.AttributeIds
+
+# Attributes read per NodeClass, the Description is read for all nodes
+NODE_CLASS_ATTRIBUTES = {
+    ua.NodeClass.Object: (_A.EventNotifier,),
+    ua.NodeClass.Variable: (
+        _A.DataType,
+        _A.ValueRank,
+        _A.ArrayDimensions,
+        _A.AccessLevel,
+        _A.UserAccessLevel,
+        _A.MinimumSamplingInterval,
+        _A.Historizing,
+    ),
+    ua.NodeClass.Method: (),
+    ua.NodeClass.ObjectType: (_A.IsAbstract,),
+    ua.NodeClass.VariableType: (_A.DataType, _A.ValueRank, _A.ArrayDimensions, _A.IsAbstract),
+    ua.NodeClass.ReferenceType: (_A.IsAbstract, _A.Symmetric, _A.InverseName),
+    ua.NodeClass.DataType: (_A.IsAbstract, _A.DataTypeDefinition),
+    ua.NodeClass.View: (_A.EventNotifier,),
+}
+
+
+def is_server_url(path: str) -> bool:
+    """Returns True, if ``path`` is the url of an OPC UA server, like ``opc.tcp://localhost:4840``."""
+    url = urlparse(path)
+    return url.scheme in SERVER_SCHEMES and bool(url.netloc)
+
+
+def _nodeid_str(node_id: ua.NodeId) -> str:
+    return intern_str(ua.NodeId(node_id.Identifier, node_id.NamespaceIndex, node_id.NodeIdType).to_string())
+
+
+def _reftype_str(node_id: ua.NodeId) -> str:
+    # Standard reference types are given by name, as in nodeset files
+    if node_id.NamespaceIndex == 0 and node_id.Identifier in ObjectIdNames:
+        return intern_str(ObjectIdNames[node_id.Identifier])
+    return _nodeid_str(node_id)
+
+
+def _browsename_str(name: ua.QualifiedName) -> str:
+    if name.NamespaceIndex:
+        return intern_str(f"{name.NamespaceIndex}:{name.Name}")
+    return intern_str(name.Name)
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, ua.LocalizedText):
+        return value.Text or ""
+    return value or ""
+
+
+class ServerBrowser:
+    """
+    Batched and concurrent Browse and Read services of a connected client.
+
+    Requests are split into batches of at most ``batch_size`` nodes, which is reduced to the operation
+    limits of the server, see :meth:`read_limits`. At most ``max_requests`` requests are in flight.
+
+    :param client: connected asyncua client
+    :param batch_size: maximum amount of nodes per request
+    :param max_requests: maximum amount of concurrent requests
+    :param max_references: maximum amount of references per node returned by a single request, ``0``
+                           lets the server decide
+    """
+
+    def __init__(self, client: Client, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_requests: int = DEFAULT_MAX_REQUESTS, max_references: int = 0) -> None:
+        self.client = client
+        self.browse_batch_size = batch_size
+        self.read_batch_size = batch_size
+        self.max_references = max_references
+        self._requests = asyncio.Semaphore(max(1, max_requests))
+        self.request_count = 0
+
+    async def _call(self, service, parameters):
+        async with self._requests:
+            self.request_count += 1
+            return await service(parameters)
+
+    async def read_limits(self) -> None:
+        """Reduces the batch sizes to the MaxNodesPerBrowse and MaxNodesPerRead limits of the server."""
+        limits = (
+            ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerBrowse,
+            ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRead,
+        )
+        results = await self.read([(ua.NodeId(limit), _A.Value) for limit in limits])
+        browse_limit, read_limit = (result.Value.Value if result.StatusCode.is_good() else 0 for result in results)
+        if browse_limit:
+            self.browse_batch_size = min(self.browse_batch_size, browse_limit)
+        if read_limit:
+            self.read_batch_size = min(self.read_batch_size, read_limit)
+
+    @staticmethod
+    def _batches(items: List[Any], size: int) -> Iterable[List[Any]]:
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    async def browse(self, node_ids: List[ua.NodeId]) -> List[List[ua.ReferenceDescription]]:
+        """Returns all references of the given nodes in both directions."""
+        results = await asyncio.gather(
+            *(self._browse_batch(batch) for batch in self._batches(node_ids, self.browse_batch_size))
+        )
+        return [references for batch in results for references in batch]
+
+    async def _browse_batch(self, node_ids: List[ua.NodeId]) -> List[List[ua.ReferenceDescription]]:
+        parameters = ua.BrowseParameters()
+        parameters.RequestedMaxReferencesPerNode = self.max_references
+        for node_id in node_ids:
+            description = ua.BrowseDescription()
+            description.NodeId = node_id
+            description.BrowseDirection = ua.BrowseDirection.Both
+            description.ReferenceTypeId = ua.NodeId(ua.ObjectIds.References)
+            description.IncludeSubtypes = True
+            description.NodeClassMask = 0
+            description.ResultMask = ua.BrowseResultMask.All
+            parameters.NodesToBrowse.append(description)
+
+        results = await self._call(self.client.uaclient.browse, parameters)
+
+        references: List[List[ua.ReferenceDescription]] = []
+        pending: Dict[int, bytes] = {}
+        for index, (node_id, result) in enumerate(zip(node_ids, results)):
+            if not result.StatusCode.is_good():
+                logger.warning(f"Could not browse {node_id.to_string()}: {result.StatusCode.name}")
+            references.append(list(result.References or []))
+            if result.ContinuationPoint:
+                pending[index] = result.ContinuationPoint
+
+        # Fetch the remaining references of all nodes of the batch together
+        while pending:
+            next_parameters = ua.BrowseNextParameters()
+            next_parameters.ReleaseContinuationPoints = False
+            next_parameters.ContinuationPoints = list(pending.values())
+            next_results = await self._call(self.client.uaclient.browse_next, next_parameters)
+
+            still_pending = {}
+            for index, result in zip(pending, next_results):
+                references[index].extend(result.References or [])
+                if result.ContinuationPoint:
+                    still_pending[index] = result.ContinuationPoint
+            pending = still_pending
+
+        return references
+
+    async def read(self, items: List[Tuple[ua.NodeId, int]]) -> List[ua.DataValue]:
+        """Reads the given ``(NodeId, AttributeId)`` items."""
+        results = await asyncio.gather(
+            *(self._read_batch(batch) for batch in self._batches(items, self.read_batch_size))
+        )
+        return [data_value for batch in results for data_value in batch]
+
+    async def _read_batch(self, items: List[Tuple[ua.NodeId, int]]) -> List[ua.DataValue]:
+        parameters = ua.ReadParameters()
+        for node_id, attribute in items:
+            read_value = ua.ReadValueId()
+            read_value.NodeId = node_id
+            read_value.AttributeId = attribute
+            parameters.NodesToRead.append(read_value)
+        return await self._call(self.client.uaclient.read, parameters)
+
+
+class _BrowsedNode:
+    __slots__ = ("node_id", "node_class", "browsename", "displayname", "references", "attributes")
+
+    def __init__(self, node_id: ua.NodeId, node_class: ua.NodeClass, browsename: ua.QualifiedName,
+                 displayname: ua.LocalizedText) -> None:
+        self.node_id = node_id
+        self.node_class = node_class
+        self.browsename = browsename
+        self.displayname = displayname
+        self.references: Optional[List[ua.ReferenceDescription]] = None
+        self.attributes: Dict[int, Any] = {}
+
+
+class ServerModel:
+    """
+    Node model browsed from a server, with the data needed to revalidate it later.
+
+    NodeIds of the state are given in the namespace indices of the server, the nodes use the reduced
+    namespace array ``namespaces``, see :func:`browse_model`.
+
+    :param namespaces: namespace uris of the nodes, without the core namespace
+    :param nodes: imported nodes
+    :param server_namespaces: namespace array of the server
+    :param table: dict of server namespace index -> index in ``namespaces``
+    :param publication_dates: dict of namespace uri -> NamespacePublicationDate, if the server provides it
+    :param frontier: core nodes referencing the roots of the subtrees
+    :param subtrees: dict of root -> (structure hash, NodeIds of the subtree)
+    :param hierarchical: NodeIds of HierarchicalReferences and its subtypes
+    """
+
+    def __init__(self, namespaces: List[str], nodes: List[UANodeRecord], server_namespaces: List[str],
+                 table: Dict[int, int], publication_dates: Dict[str, datetime], frontier: List[str],
+                 subtrees: Dict[str, Tuple[str, List[str]]], hierarchical: Set[str]) -> None:
+        self.namespaces = namespaces
+        self.nodes = nodes
+        self.server_namespaces = server_namespaces
+        self.table = table
+        self.publication_dates = publication_dates
+        self.frontier = frontier
+        self.subtrees = subtrees
+        self.hierarchical = hierarchical
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The nodes are stored in a snapshot, only the state gets pickled
+        state = self.__dict__.copy()
+        state["nodes"] = []
+        return state
+
+    def used_namespaces(self) -> Set[int]:
+        """Returns the server namespace indices of all nodes of the subtrees."""
+        return {nodeid_namespace(node_id) for _hash, members in self.subtrees.values() for node_id in members}
+
+
+async def browse_model(browser: ServerBrowser) -> ServerModel:
+    """
+    Browses the complete address space of the server and returns its model.
+
+    :param browser: browser of a connected client
+    """
+    client = browser.client
+    await browser.read_limits()
+    server_namespaces = await client.get_namespace_array()
+    publication_dates = await read_publication_dates(browser)
+
+    root_id = ua.NodeId(ua.ObjectIds.RootFolder)
+    nodes: Dict[str, _BrowsedNode] = {
+        _nodeid_str(root_id): _BrowsedNode(
+            root_id, ua.NodeClass.Object, ua.QualifiedName("Root"), ua.LocalizedText("Root")
+        )
+    }
+    reads = []
+
+    level = [root_id]
+    while level:
+        results = await browser.browse(level)
+        next_level = []
+        for node_id, references in zip(level, results):
+            nodes[_nodeid_str(node_id)].references = references
+            for reference in references:
+                target = reference.NodeId
+                if not reference.IsForward or getattr(target, "ServerIndex", 0):
+                    continue
+                target_str = _nodeid_str(target)
+                if target_str in nodes:
+                    continue
+                nodes[target_str] = _BrowsedNode(
+                    target, reference.NodeClass, reference.BrowseName, reference.DisplayName
+                )
+                next_level.append(target)
+
+        # Read the attributes of this level, while the next one gets browsed
+        new_nodes = [nodes[_nodeid_str(node_id)] for node_id in next_level if node_id.NamespaceIndex != 0]
+        if new_nodes:
+            reads.append(asyncio.ensure_future(_read_attributes(browser, new_nodes)))
+        level = next_level
+
+    await asyncio.gather(*reads)
+
+    frontier = [
+        node_id for node_id, node in nodes.items()
+        if node.node_id.NamespaceIndex == 0 and _server_targets(node)
+    ]
+    subtrees = await _collect_subtrees(browser, nodes, _subtree_roots(nodes, frontier))
+    imported = [node_id for members in subtrees.values() for node_id in members]
+    hierarchical = _hierarchical_reftypes(nodes)
+    ua_nodes = _build_records(nodes, imported, set(imported), hierarchical)
+
+    return _server_model(
+        server_namespaces, publication_dates, ua_nodes, frontier,
+        {root: (_subtree_hash(nodes, members), members) for root, members in subtrees.items()}, hierarchical
+    )
+
+
+async def revalidate_model(
+    browser: ServerBrowser, previous: ServerModel, cached_nodes: Callable[[], Dict[str, UANodeRecord]]
+) -> Optional[ServerModel]:
+    """
+    Checks a previously browsed model against the server and updates it.
+
+    If the namespace array and the ``NamespacePublicationDate`` of all namespaces are unchanged and
+    all namespaces with imported nodes provide one, the model is still valid and ``None`` gets returned.
+    Otherwise the subtrees get browsed again, starting at the core nodes known from ``previous``. Only
+    the nodes of subtrees with a changed structure hash, or with nodes of a namespace with a changed
+    publication date, get read again, the nodes of all other subtrees are taken from ``cached_nodes``.
+    If the namespace array changed, the server gets browsed completely.
+
+    Server nodes below a core node, which had no server nodes below it before, are not found this way.
+    Such changes need a complete browse with :func:`browse_model`.
+
+    :param browser: browser of a connected client
+    :param previous: model of an earlier browse
+    :param cached_nodes: returns the nodes of ``previous`` by their NodeId, in server namespace indices
+    :return: updated model or ``None``, if ``previous`` is still valid
+    """
+    client = browser.client
+    await browser.read_limits()
+    server_namespaces = await client.get_namespace_array()
+    if server_namespaces != previous.server_namespaces:
+        logger.info("Namespace array of the server changed, browsing the complete model.")
+        return await browse_model(browser)
+
+    publication_dates = await read_publication_dates(browser)
+    changed = {
+        index for index, uri in enumerate(server_namespaces)
+        if index and publication_dates.get(uri) != previous.publication_dates.get(uri)
+    }
+    undated = {index for index, uri in enumerate(server_namespaces) if index and uri not in publication_dates}
+    if not changed and not undated & previous.used_namespaces():
+        return None
+
+    # Browse the frontier to find added and removed subtrees, then all subtrees without the core nodes
+    frontier_ids = [ua.NodeId.from_string(node_id) for node_id in previous.frontier]
+    nodes: Dict[str, _BrowsedNode] = {}
+    for node_id, references in zip(frontier_ids, await browser.browse(frontier_ids)):
+        node = nodes[_nodeid_str(node_id)] = _BrowsedNode(node_id, ua.NodeClass.Object, None, None)
+        node.references = references
+        for reference in _server_targets(node):
+            nodes.setdefault(
+                _nodeid_str(reference.NodeId),
+                _BrowsedNode(reference.NodeId, reference.NodeClass, reference.BrowseName, reference.DisplayName)
+            )
+    subtrees = await _collect_subtrees(browser, nodes, _subtree_roots(nodes, previous.frontier))
+    hierarchical = _hierarchical_reftypes(nodes, previous.hierarchical)
+
+    cached = cached_nodes()
+    imported_set = {node_id for members in subtrees.values() for node_id in members}
+    hashes = {}
+    ua_nodes = []
+    outdated = []
+    for root, members in subtrees.items():
+        hashes[root] = _subtree_hash(nodes, members)
+        previous_hash, previous_members = previous.subtrees.get(root, (None, []))
+        if hashes[root] == previous_hash and members == previous_members and all(
+            nodeid_namespace(node_id) not in changed and node_id in cached for node_id in members
+        ):
+            ua_nodes.extend(cached[node_id] for node_id in members)
+        else:
+            outdated.extend(members)
+
+    if not outdated and len(subtrees) == len(previous.subtrees) and publication_dates == previous.publication_dates:
+        return None
+
+    await _read_attributes(browser, [nodes[node_id] for node_id in outdated])
+    ua_nodes.extend(_build_records(nodes, outdated, imported_set, hierarchical))
+    logger.info(
+        f"Server model changed, read {len(outdated)} of {len(imported_set)} nodes "
+        f"in {len(subtrees)} subtrees again."
+    )
+
+    return _server_model(
+        server_namespaces, publication_dates, ua_nodes, previous.frontier,
+        {root: (hashes[root], members) for root, members in subtrees.items()}, hierarchical
+    )
+
+
+def _server_model(server_namespaces: List[str], publication_dates: Dict[str, datetime],
+                  ua_nodes: List[UANodeRecord], frontier: List[str], subtrees: Dict[str, Tuple[str, List[str]]],
+                  hierarchical: Set[str]) -> ServerModel:
+    # Nodesets list the nodes per namespace, dependencies first. Keep that order, as the first node
+    # wins for BrowseNames found in several namespaces.
+    ua_nodes.sort(key=lambda ua_node: nodeid_namespace(ua_node.nodeid))
+
+    # Namespaces without imported nodes, like the one of the server itself, get dropped
+    used = {0}
+    for ua_node in ua_nodes:
+        used.add(nodeid_namespace(ua_node.nodeid))
+        if ua_node.datatype:
+            used.add(nodeid_namespace(ua_node.datatype))
+        for ref in ua_node.refs:
+            used.add(nodeid_namespace(ref.reftype))
+            used.add(nodeid_namespace(ref.target))
+    table = {0: 0}
+    namespaces: List[str] = []
+    for index, uri in enumerate(server_namespaces):
+        if index in used and index != 0:
+            namespaces.append(uri)
+            table[index] = len(namespaces)
+    remapper = NamespaceRemapper(table)
+    return ServerModel(
+        namespaces, [remapper.node(ua_node) for ua_node in ua_nodes], server_namespaces, table,
+        publication_dates, frontier, subtrees, hierarchical
+    )
+
+
+async def read_publication_dates(browser: ServerBrowser) -> Dict[str, datetime]:
+    """
+    Returns the ``NamespacePublicationDate`` of all namespaces, which have a NamespaceMetadata object
+    below ``Server/Namespaces``.
+    """
+    namespaces_id = ua.NodeId(ua.ObjectIds.Server_Namespaces)
+    (references,) = await browser.browse([namespaces_id])
+    metadata_ids = [
+        reference.NodeId for reference in references
+        if reference.IsForward and reference.NodeClass == ua.NodeClass.Object
+    ]
+    if not metadata_ids:
+        return {}
+
+    properties = []
+    for metadata_id, metadata_references in zip(metadata_ids, await browser.browse(metadata_ids)):
+        values = {
+            reference.BrowseName.Name: reference.NodeId for reference in metadata_references
+            if reference.IsForward and reference.BrowseName.Name in ("NamespaceUri", "NamespacePublicationDate")
+        }
+        if len(values) == 2:
+            properties.append((values["NamespaceUri"], values["NamespacePublicationDate"]))
+
+    results = await browser.read([(node_id, _A.Value) for pair in properties for node_id in pair])
+    publication_dates = {}
+    for uri, date in zip(results[::2], results[1::2]):
+        if uri.StatusCode.is_good() and date.StatusCode.is_good() and date.Value.Value is not None:
+            publication_dates[uri.Value.Value] = date.Value.Value
+    return publication_dates
+
+
+def _server_targets(node: _BrowsedNode) -> List[ua.ReferenceDescription]:
+    """Returns the forward references of a node to nodes of the server namespaces."""
+    return [
+        reference for reference in node.references
+        if reference.IsForward and reference.NodeId.NamespaceIndex != 0
+        and not getattr(reference.NodeId, "ServerIndex", 0)
+    ]
+
+
+def _subtree_roots(nodes: Dict[str, _BrowsedNode], frontier: List[str]) -> List[str]:
+    roots: Dict[str, None] = {}
+    for node_id in frontier:
+        node = nodes.get(node_id)
+        if node is not None and node.references is not None:
+            for reference in _server_targets(node):
+                roots.setdefault(_nodeid_str(reference.NodeId))
+    return list(roots)
+
+
+async def _collect_subtrees(
+    browser: ServerBrowser, nodes: Dict[str, _BrowsedNode], roots: List[str]
+) -> Dict[str, List[str]]:
+    """
+    Assigns the server nodes below the given roots to subtrees, breadth-first, a node reached from
+    several subtrees belongs to the first one. Nodes, which were not browsed yet, get browsed.
+
+    :return: dict of root -> NodeIds of the subtree, starting with the root
+    """
+    subtrees = {root: [root] for root in roots}
+    origin = {root: root for root in roots}
+    level = list(roots)
+    while level:
+        missing = [node_id for node_id in level if nodes[node_id].references is None]
+        if missing:
+            results = await browser.browse([nodes[node_id].node_id for node_id in missing])
+            for node_id, references in zip(missing, results):
+                nodes[node_id].references = references
+
+        next_level = []
+        for node_id in level:
+            for reference in _server_targets(nodes[node_id]):
+                target = _nodeid_str(reference.NodeId)
+                if target in origin:
+                    continue
+                origin[target] = origin[node_id]
+                subtrees[origin[node_id]].append(target)
+                if target not in nodes:
+                    nodes[target] = _BrowsedNode(
+                        reference.NodeId, reference.NodeClass, reference.BrowseName, reference.DisplayName
+                    )
+                next_level.append(target)
+        level = next_level
+    return subtrees
+
+
+def _subtree_hash(nodes: Dict[str, _BrowsedNode], members: List[str]) -> str:
+    """Returns a digest over the browse results of the given nodes."""
+    digest = hashlib.blake2b(digest_size=16)
+    for node_id in sorted(members):
+        node = nodes[node_id]
+        references = sorted(
+            (_nodeid_str(reference.ReferenceTypeId), reference.IsForward, _nodeid_str(reference.NodeId))
+            for reference in node.references
+        )
+        digest.update(repr((
+            node_id, int(node.node_class), _browsename_str(node.browsename), _text(node.displayname), references
+        )).encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def _read_attributes(browser: ServerBrowser, nodes: List[_BrowsedNode]) -> None:
+    items = []
+    for node in nodes:
+        for attribute in (_A.Description,) + NODE_CLASS_ATTRIBUTES.get(node.node_class, ()):
+            items.append((node, attribute))
+    results = await browser.read([(node.node_id, attribute) for node, attribute in items])
+    for (node, attribute), result in zip(items, results):
+        if result.StatusCode.is_good():
+            node.attributes[attribute] = result.Value.Value if result.Value is not None else None
+
+
+def _hierarchical_reftypes(nodes: Dict[str, _BrowsedNode], known: Iterable[str] = ()) -> Set[str]:
+    """
+    Returns the NodeIds of HierarchicalReferences and all of its subtypes found in ``nodes``.
+
+    :param known: NodeIds of hierarchical reference types known from an earlier browse
+    """
+    result = set()
+    pending = [_nodeid_str(ua.NodeId(ua.ObjectIds.HierarchicalReferences)), *known]
+    while pending:
+        node_id = pending.pop()
+        if node_id in result:
+            continue
+        result.add(node_id)
+        node = nodes.get(node_id)
+        if node is None or node.references is None:
+            continue
+        for reference in node.references:
+            if reference.IsForward and reference.ReferenceTypeId == ua.NodeId(ua.ObjectIds.HasSubtype):
+                pending.append(_nodeid_str(reference.NodeId))
+    return result
+
+
+def _definitions(definition: Any) -> Tuple[List[Tuple[Any, ...]], str]:
+    """Converts a DataTypeDefinition into the definitions and the struct type of a nodeset record."""
+    if isinstance(definition, ua.StructureDefinition):
+        struct_type = ""
+        if definition.StructureType == ua.StructureType.Union:
+            struct_type = "IsUnion"
+        elif definition.StructureType == ua.StructureType.StructureWithOptionalFields:
+            struct_type = "IsOptional"
+        fields = [
+            (field.Name, _nodeid_str(field.DataType), field.ValueRank, 0, _text(field.Description))
+            for field in definition.Fields or []
+        ]
+        return fields, struct_type
+    if isinstance(definition, ua.EnumDefinition):
+        fields = [(field.Name, "i=24", -1, field.Value, _text(field.Description)) for field in definition.Fields or []]
+        return fields, ""
+    return [], ""
+
+
+def _build_records(nodes: Dict[str, _BrowsedNode], imported: List[str], imported_set: Set[str],
+                   hierarchical: Set[str]) -> List[UANodeRecord]:
+    ua_nodes = []
+    for node_id in imported:
+        node = nodes[node_id]
+        attributes = node.attributes
+        record = UANodeRecord.__new__(UANodeRecord)
+        record.nodetype = NODE_CLASS_NAMES.get(node.node_class, "UAObject")
+        record.nodeid = node_id
+        record.browsename = _browsename_str(node.browsename)
+        record.displayname = _text(node.displayname)
+        record.symname = None
+        record.parent = None
+        record.parentlink = None
+        record.desc = _text(attributes.get(_A.Description))
+        record.typedef = None
+        record.refs = []
+
+        for reference in node.references:
+            reftype = _reftype_str(reference.ReferenceTypeId)
+            target = _nodeid_str(reference.NodeId)
+            is_hierarchical = _nodeid_str(reference.ReferenceTypeId) in hierarchical
+            # References between two imported nodes are kept on one side only
+            if is_hierarchical:
+                if reference.IsForward and target in imported_set:
+                    continue
+            elif not reference.IsForward and target in imported_set:
+                continue
+            record.refs.append(UAReference(reftype, reference.IsForward, target))
+            if reference.IsForward and reftype == "HasTypeDefinition":
+                record.typedef = target
+            elif not reference.IsForward and is_hierarchical and record.parent is None:
+                record.parent, record.parentlink = target, reftype
+
+        data_type = attributes.get(_A.DataType)
+        record.datatype = _nodeid_str(data_type) if isinstance(data_type, ua.NodeId) else None
+        record.rank = attributes.get(_A.ValueRank, -1)
+        record.valuetype = None
+        record.dimensions = attributes.get(_A.ArrayDimensions) or None
+        record.eventnotifier = attributes.get(_A.EventNotifier, 0)
+        record.accesslevel = attributes.get(_A.AccessLevel)
+        record.useraccesslevel = attributes.get(_A.UserAccessLevel)
+        record.minsample = attributes.get(_A.MinimumSamplingInterval)
+        record.historizing = bool(attributes.get(_A.Historizing, False))
+        record.inversename = _text(attributes.get(_A.InverseName))
+        record.abstract = bool(attributes.get(_A.IsAbstract, False))
+        record.symmetric = bool(attributes.get(_A.Symmetric, False))
+        record.definitions, record.struct_type = _definitions(attributes.get(_A.DataTypeDefinition))
+        ua_nodes.append(record)
+    return ua_nodes
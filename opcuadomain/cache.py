@@ -0,0 +1,177 @@
+"""
+Persistent on-disk cache for parsed nodesets.
+
+Parsing a large nodeset like ``Opc.Ua.NodeSet2.xml`` is expensive, so the parse result
+(namespaces, aliases and nodes) gets stored in a binary cache file.
+Entries are keyed by the content hash of the nodeset file and the parser version, so a changed file
+or an updated parser never hits an old entry.
+"""
+import hashlib
+import os
+import pickle
+from typing import Any, List, Optional, Tuple
+
+from asyncua import __version__ as asyncua_version
+from sphinx.application import Sphinx
+
+from opcuadomain.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Increase, if the structure of the cached data changes
+CACHE_FORMAT = 3
+PARSER_VERSION = f"asyncua-{asyncua_version}-{CACHE_FORMAT}"
+
+CACHE_SUFFIX = ".nodeset.pickle"
+
+NodesetData = Tuple[List[str], dict, List[Any]]
+
+
+def file_hash(path: str) -> str:
+    """Returns the sha256 hex digest of the content of the given file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class NodesetCache:
+    """
+    Cache directory for parsed nodesets.
+
+    The file name of an entry is ``<path key>-<content key><CACHE_SUFFIX>``.
+    The path key identifies the source file, so all outdated entries of a file can be removed when
+    a new version gets stored. The content key is built from the file hash and the parser version.
+
+    If the overall size of the cache exceeds ``max_size`` bytes, the least recently used entries get
+    removed.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def _path_key(path: str) -> str:
+        return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def _content_key(content_hash: str) -> str:
+        return hashlib.sha1(f"{content_hash}-{PARSER_VERSION}".encode()).hexdigest()[:20]
+
+    def _entry_path(self, path: str, content_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._path_key(path)}-{content_key}{CACHE_SUFFIX}")
+
+    def load(self, path: str, content_hash: Optional[str] = None) -> Optional[NodesetData]:
+        """
+        Returns the cached parse result for the nodeset file ``path`` or ``None``, if there is no
+        valid entry.
+
+        :param content_hash: :func:`file_hash` of the file, if already known
+        """
+        content_key = self._content_key(content_hash or file_hash(path))
+        entry_path = self._entry_path(path, content_key)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            with open(entry_path, "rb") as f:
+                cache_format, entry_key, data = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load nodeset cache entry {entry_path}: {e}")
+            self._remove(entry_path)
+            return None
+
+        if cache_format != CACHE_FORMAT or entry_key != content_key:
+            self._remove(entry_path)
+            return None
+
+        # Touch the entry, so that the eviction knows it is still used
+        os.utime(entry_path)
+        logger.info(f"Loaded nodeset {path} from cache.")
+        return data
+
+    def store(self, path: str, data: NodesetData, content_hash: Optional[str] = None) -> None:
+        """
+        Stores the parse result of the nodeset file ``path`` and drops all outdated entries of it.
+
+        :param content_hash: :func:`file_hash` of the file, if already known
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        content_key = self._content_key(content_hash or file_hash(path))
+        entry_path = self._entry_path(path, content_key)
+
+        self.invalidate(path)
+
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((CACHE_FORMAT, content_key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+        self._evict()
+
+    def invalidate(self, path: str) -> None:
+        """Removes all cache entries of the nodeset file ``path``."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        prefix = f"{self._path_key(path)}-"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(CACHE_SUFFIX):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def clear(self) -> None:
+        """Removes all entries of the cache."""
+        for entry_path, _size, _mtime in self._entries():
+            self._remove(entry_path)
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((entry_path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        size = sum(entry[1] for entry in entries)
+        # Oldest entries first
+        for entry_path, entry_size, _mtime in sorted(entries, key=lambda entry: entry[2]):
+            if size <= self.max_size:
+                break
+            logger.info(f"Evicting nodeset cache entry {entry_path}.")
+            self._remove(entry_path)
+            size -= entry_size
+
+    @staticmethod
+    def _remove(entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+
+def get_nodeset_cache(app: Sphinx) -> Optional[NodesetCache]:
+    """
+    Returns the nodeset cache configured by ``opcua_nodeset_cache``, ``opcua_nodeset_cache_dir`` and
+    ``opcua_nodeset_cache_max_size``, or ``None`` if caching is disabled.
+    """
+    if not app.config.opcua_nodeset_cache:
+        return None
+
+    cache_dir = app.config.opcua_nodeset_cache_dir
+    if not cache_dir:
+        cache_dir = os.path.join(app.doctreedir, "opcua_nodesets")
+    elif not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(app.confdir, cache_dir)
+
+    return NodesetCache(cache_dir, app.config.opcua_nodeset_cache_max_size)
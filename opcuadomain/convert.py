@@ -0,0 +1,56 @@
+"""
+Converts nodeset files into a memory-mapped snapshot, see :mod:`opcuadomain.snapshot`.
+
+Several nodesets get merged into one snapshot in the given order, the same way as
+``.. opcua:uaimport::`` merges them. The snapshot can then be imported instead of the nodesets::
+
+    python -m opcuadomain.convert Opc.Ua.NodeSet2.xml Opc.Ua.Di.NodeSet2.xml -o model.uasnap
+
+.. code-block:: rst
+
+    .. opcua:uaimport:: model.uasnap
+"""
+import argparse
+from typing import Dict, List, Optional
+
+from opcuadomain.nodeset import read_nodesets
+from opcuadomain.nodestore import NamespaceRemapper, build_namespace_table
+from opcuadomain.records import UANodeRecord
+from opcuadomain.snapshot import SNAPSHOT_SUFFIX, write_snapshot
+
+
+def convert_nodesets(paths: List[str], snapshot_path: str, max_workers: Optional[int] = None) -> int:
+    """
+    Merges the given nodeset files and writes them into the snapshot file ``snapshot_path``.
+
+    :param paths: nodeset files in import order
+    :param snapshot_path: path of the written snapshot
+    :param max_workers: maximum amount of processes used for parsing, see :func:`~opcuadomain.nodeset.read_nodesets`
+    :return: amount of written nodes
+    """
+    namespaces: List[str] = []
+    aliases: Dict[str, str] = {}
+    ua_nodes: List[UANodeRecord] = []
+    for ua_namespaces, ua_aliases, nodeset_nodes in read_nodesets(paths, max_workers):
+        remapper = NamespaceRemapper(build_namespace_table(namespaces, ua_namespaces))
+        for alias, target in ua_aliases.items():
+            aliases.setdefault(alias, remapper.nodeid(target))
+        ua_nodes.extend(remapper.node(ua_node) for ua_node in nodeset_nodes)
+
+    write_snapshot(snapshot_path, namespaces, aliases, ua_nodes)
+    return len(ua_nodes)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Converts nodeset files into a memory-mapped snapshot.")
+    parser.add_argument("nodesets", nargs="+", help="nodeset files, merged in the given order")
+    parser.add_argument("-o", "--output", required=True, help=f"snapshot file, normally with suffix {SNAPSHOT_SUFFIX}")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="processes used for parsing, 0 uses the cpu count")
+    args = parser.parse_args(argv)
+
+    count = convert_nodesets(args.nodesets, args.output, args.jobs)
+    print(f"Wrote {count} nodes to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,41 +3,203 @@ Contains debug features to track down
 runtime and other problems with Sphinx-Needs
 """
 
+import heapq
 import inspect
 import json
+import math
 import os.path
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
-from pathlib import Path
 from timeit import default_timer as timer  # Used for timing measurements
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 from jinja2 import Environment, PackageLoader, select_autoescape
 from sphinx.application import Sphinx
 
-TIME_MEASUREMENTS: Dict[str, Any] = {}  # Stores the timing results
-EXECUTE_TIME_MEASUREMENTS = False  # Will be used to de/activate measurements. Set during a Sphinx Event
+TIME_MEASUREMENTS: Dict[str, "TimeHistogram"] = {}  # Stores the timing results
+CACHE_MEASUREMENTS: Dict[str, Dict[str, int]] = {}  # Stores the hit/miss counters of caches
+PHASE_MEASUREMENTS: Dict[str, Dict[str, Any]] = {}  # Stores duration and memory usage of the build phases
+EXECUTE_TIME_MEASUREMENTS = False  # De/activates measurements. Set from opcua_time_measurements by init_measurements
 
-START_TIME = 0
+START_TIME = 0.0
+
+# Current build phase as name, start time and tracemalloc snapshot at the start, None if phases are not measured
+_PHASE: "Tuple[str, float, tracemalloc.Snapshot | None] | None" = None
+
+SLOWEST_CALLS = 20  # Amount of slowest calls kept per measured function with span_args
+MEMORY_TOP_SITES = 10  # Amount of allocation sites reported per build phase
+
+# Runtimes are counted in log-scale buckets: HISTOGRAM_SUB_BUCKETS per power of two from
+# 2**HISTOGRAM_MIN_EXPONENT (~60ns) to 2**HISTOGRAM_MAX_EXPONENT (~4.5h) seconds. Percentiles are
+# accurate to the bucket width, 1/16 to 1/8 of the value. Runtimes of 0, given by coarse timers, count
+# into the lowest bucket.
+HISTOGRAM_SUB_BUCKETS = 8
+HISTOGRAM_MIN_EXPONENT = -23
+HISTOGRAM_MAX_EXPONENT = 14
+HISTOGRAM_BUCKETS = (HISTOGRAM_MAX_EXPONENT - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_SUB_BUCKETS
+
+TRACE_EVENTS: "Deque[Dict[str, Any]] | None" = None  # Ring buffer of trace events, None if tracing is off
+TRACE_START = 0.0  # Timer value of the trace start, trace timestamps are relative to it
+TRACE_RECORDED = 0  # Amount of recorded trace events, including the ones dropped by the ring buffer
+_OPEN_SPANS: Dict[str, Tuple[float, str, str, Dict[str, Any]]] = {}  # Spans started by Sphinx events
+
+
+class TimeHistogram:
+    """
+    Runtimes of a measured function as histogram with fixed log-scale buckets.
+
+    Adding a runtime is O(1) and needs no allocation, percentiles and the source location of the function
+    are only determined for the report.
+
+    If ``span_args`` is given, the :data:`SLOWEST_CALLS` slowest calls are kept with the values returned by
+    ``span_args``, like the NodeId of the processed node.
+    """
+
+    __slots__ = (
+        "name", "category", "source", "func", "span_args", "amount", "overall", "min", "max", "max_params",
+        "buckets", "slowest",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        category: "str | None",
+        source: str,
+        func: Callable[..., Any],
+        span_args: "Callable[..., Dict[str, Any]] | None" = None,
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.source = source
+        self.func = func
+        self.span_args = span_args
+        self.amount = 0
+        self.overall = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.max_params: Dict[str, str] = {"args": "", "kwargs": ""}
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        # Min-heap of runtime, amount at the call (as tie breaker) and span args
+        self.slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+
+    def add(self, runtime: float, args: Any, kwargs: Dict[str, Any]) -> None:
+        """
+        Counts a runtime. For a new maximum, the parameters of the call are stored as shortened strings, to make
+        it easier to reproduce the maximum case.
+        """
+        self.amount += 1
+        self.overall += runtime
+        if runtime < self.min:
+            self.min = runtime
+        if runtime > self.max:
+            self.max = runtime
+            self.max_params = {
+                "args": str([str(arg)[:80] for arg in args]),
+                "kwargs": str({key: str(value)[:80] for key, value in kwargs.items()}),
+            }
+        if runtime <= 0:
+            # frexp(0.0) is (0.0, 0), which would count into the bucket of 2**-1 seconds
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(runtime)
+            index = (exponent - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_SUB_BUCKETS
+            index += int((mantissa - 0.5) * 2 * HISTOGRAM_SUB_BUCKETS)
+        self.buckets[min(max(index, 0), HISTOGRAM_BUCKETS - 1)] += 1
+
+        if self.span_args is not None:
+            if len(self.slowest) < SLOWEST_CALLS:
+                heapq.heappush(self.slowest, (runtime, self.amount, self.span_args(*args, **kwargs)))
+            elif runtime > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (runtime, self.amount, self.span_args(*args, **kwargs)))
+
+    @staticmethod
+    def bucket_bound(index: int) -> float:
+        """Returns the upper bound of a bucket in seconds."""
+        exponent, sub_bucket = divmod(index, HISTOGRAM_SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2 * HISTOGRAM_SUB_BUCKETS), exponent + HISTOGRAM_MIN_EXPONENT)
+
+    @property
+    def avg(self) -> float:
+        return self.overall / self.amount if self.amount else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the runtime, which ``percent`` of the executions did not exceed, as upper bound of its bucket.
+
+        :param percent: percentile between 0 and 100
+        """
+        rank = max(1, math.ceil(self.amount * percent / 100))
+        count = 0
+        for index, bucket in enumerate(self.buckets):
+            count += bucket
+            if count >= rank:
+                return min(max(self.bucket_bound(index), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the results including percentiles and source location of the function."""
+        try:
+            file = inspect.getfile(self.func)
+            line = inspect.getsourcelines(self.func)[1]
+        except (OSError, TypeError):
+            file, line = None, None
+        return {
+            "name": self.name,
+            "category": self.category,
+            "source": self.source,
+            "doc": self.func.__doc__,
+            "file": file,
+            "line": line,
+            "amount": self.amount,
+            "overall": self.overall,
+            "avg": self.avg,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "min_max_spread": self.max / self.min * 100 if self.min else None,
+            "max_params": self.max_params,
+            "histogram": [[self.bucket_bound(index), count] for index, count in enumerate(self.buckets) if count],
+            "slowest": [dict(args, runtime=runtime) for runtime, _, args in sorted(self.slowest, reverse=True)],
+        }
+
+
+def timing_results() -> Dict[str, Dict[str, Any]]:
+    """Returns the results of all measured functions by measurement id."""
+    return {mt_id: histogram.to_dict() for mt_id, histogram in TIME_MEASUREMENTS.items()}
 
 
 def measure_time(
-    category: "str | None" = None, source: str = "internal", name: "str | None" = None, func: "object | None" = None
+    category: "str | None" = None,
+    source: str = "internal",
+    name: "str | None" = None,
+    func: "object | None" = None,
+    span_args: "Callable[..., Dict[str, Any]] | None" = None,
 ) -> Callable[..., Callable[..., Any]]:
     """
     Measures the needed execution time of a specific function.
 
-    It measures:
+    The runtimes are counted in a :class:`TimeHistogram`, which gives:
 
     * Amount of executions
     * Overall time consumed
     * Average time of an execution as `avg`
     * Minimum time of an execution as `min`
     * Maximum time of an execution as `max`
+    * Percentiles `p50`, `p90` and `p99`
 
     For `max` also the used function parameters are stored as string values, to make
     it easier to reproduce the maximum case.
 
+    Measurements are only done, if ``opcua_time_measurements`` is set.
+
+    If tracing is active, see :func:`start_tracing`, each execution is additionally recorded as span.
+
     Usage as decorator::
 
         from sphinx_needs.utils import measure_time
@@ -58,9 +220,15 @@ def measure_time(
     :param source: Should be "internal" or "user". Used to easily structure function written by user.
     :param name: Name to use for the measured. If not given, the function name is used.
     :param func: Can contain a func, which shall get decorated. Not used if ``measure_time`` is used as decorator.
+    :param span_args: Function called with the arguments of the measured function, returns the arguments
+                      shown for its trace spans and its slowest calls, like the NodeId of the processed node.
+                      Only called while tracing or for calls slower than the kept slowest ones.
     """
 
     def inner(func: Any) -> Callable[..., Any]:
+        mt_name = func.__name__ if name is None else name
+        mt_id = f"{category}_{mt_name}"
+
         @wraps(func)
         def wrapper(*args: List[object], **kwargs: Dict[object, object]) -> Any:
             """
@@ -69,7 +237,7 @@ def measure_time(
             :param args: Arguments for the original function
             :param kwargs: Keyword arguments for the original function
             """
-            if not EXECUTE_TIME_MEASUREMENTS:
+            if not EXECUTE_TIME_MEASUREMENTS and TRACE_EVENTS is None:
                 return func(*args, **kwargs)
 
             start = timer()
@@ -77,48 +245,15 @@ def measure_time(
             result = func(*args, **kwargs)
             end = timer()
 
-            runtime = end - start
-
-            if name is None:
-                mt_name = func.__name__
-            else:
-                mt_name = name
-
-            mt_id = f"{category}_{func.__name__}"
-
-            if mt_id not in TIME_MEASUREMENTS:
-                TIME_MEASUREMENTS[mt_id] = {
-                    "name": mt_name,
-                    "category": category,
-                    "source": source,
-                    "doc": func.__doc__,
-                    "file": inspect.getfile(func),
-                    "line": inspect.getsourcelines(func)[1],
-                    "amount": 0,
-                    "overall": 0,
-                    "avg": None,
-                    "min": None,
-                    "max": None,
-                    "min_max_spread": None,
-                    "max_params": {"args": [], "kwargs": {}},
-                }
-
-            runtime_dict = TIME_MEASUREMENTS[mt_id]
-
-            runtime_dict["amount"] += 1
-            runtime_dict["overall"] += runtime
-
-            if runtime_dict["min"] is None or runtime < runtime_dict["min"]:
-                runtime_dict["min"] = runtime
-
-            if runtime_dict["max"] is None or runtime > runtime_dict["max"]:
-                runtime_dict["max"] = runtime
-                runtime_dict["max_params"] = {  # Store parameters as a shorten string
-                    "args": str([str(arg)[:80] for arg in args]),
-                    "kwargs": str({key: str(value)[:80] for key, value in kwargs.items()}),
-                }
-            runtime_dict["min_max_spread"] = runtime_dict["max"] / runtime_dict["min"] * 100
-            runtime_dict["avg"] = runtime_dict["overall"] / runtime_dict["amount"]
+            if TRACE_EVENTS is not None:
+                add_trace_span(category or "", mt_name, start, end, span_args(*args, **kwargs) if span_args else None)
+            if not EXECUTE_TIME_MEASUREMENTS:
+                return result
+
+            histogram = TIME_MEASUREMENTS.get(mt_id)
+            if histogram is None:
+                histogram = TIME_MEASUREMENTS[mt_id] = TimeHistogram(mt_name, category, source, func, span_args)
+            histogram.add(end - start, args, kwargs)
             return result
 
         return wrapper
@@ -130,45 +265,360 @@ def measure_time(
     return inner
 
 
-def print_timing_results() -> None:
-    for value in TIME_MEASUREMENTS.values():
-        print(value["name"])
-        print(f' amount:  {value["amount"]}')
-        print(f' overall: {value["overall"]:2f}')
-        print(f' avg:     {value["avg"]:2f}')
-        print(f' max:     {value["max"]:2f}')
-        print(f' min:     {value["min"]:2f} \n')
+def start_tracing(max_events: int) -> None:
+    """
+    Starts recording trace spans of all functions measured by :func:`measure_time` and of the spans
+    given by :func:`trace_span`.
 
+    The spans are kept in a ring buffer, if more than ``max_events`` get recorded, the oldest are dropped.
+    Spans of parallel reads in worker processes are not recorded.
+
+    :param max_events: size of the ring buffer
+    """
+    global TRACE_EVENTS, TRACE_START, TRACE_RECORDED
+    TRACE_EVENTS = deque(maxlen=max_events)
+    TRACE_START = timer()
+    TRACE_RECORDED = 0
+    _OPEN_SPANS.clear()
+
+
+def stop_tracing() -> None:
+    """Stops recording trace spans and drops the recorded ones."""
+    global TRACE_EVENTS
+    TRACE_EVENTS = None
+    _OPEN_SPANS.clear()
+
+
+def add_trace_span(category: str, name: str, start: float, end: float, args: "Dict[str, Any] | None" = None) -> None:
+    """
+    Records a span as Chrome trace event of phase ``X`` (complete event). Does nothing, if tracing is off.
+
+    :param category: category of the span, used to filter spans in the trace viewer
+    :param name: name of the span
+    :param start: timer value at the begin of the span
+    :param end: timer value at the end of the span
+    :param args: additional values shown for the span
+    """
+    global TRACE_RECORDED
+    if TRACE_EVENTS is None:
+        return
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": (start - TRACE_START) * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+    }
+    if args:
+        event["args"] = args
+    TRACE_EVENTS.append(event)
+    TRACE_RECORDED += 1
+
+
+@contextmanager
+def trace_span(category: str, name: str, args: "Dict[str, Any] | None" = None) -> Iterator[None]:
+    """
+    Records the execution of the ``with`` block as trace span.
+
+    Usage::
+
+        with trace_span("import", "merge", {"nodeset": path}):
+            # does something
+    """
+    if TRACE_EVENTS is None:
+        yield
+        return
+    start = timer()
+    try:
+        yield
+    finally:
+        add_trace_span(category, name, start, timer(), args)
+
+
+def begin_span(key: str, category: str, name: str, args: "Dict[str, Any] | None" = None) -> None:
+    """
+    Starts a span, which gets ended by :func:`end_span` with the same key. Used for spans between two Sphinx
+    events, which can not be wrapped by :func:`trace_span`.
+    """
+    if TRACE_EVENTS is not None:
+        _OPEN_SPANS[key] = (timer(), category, name, args or {})
+
+
+def end_span(key: str) -> None:
+    """Ends the span started by :func:`begin_span` with the given key, if there is one."""
+    span = _OPEN_SPANS.pop(key, None)
+    if span is not None:
+        start, category, name, args = span
+        add_trace_span(category, name, start, timer(), args)
+
+
+def store_trace(path: str, build_data: Dict[str, Any]) -> None:
+    """
+    Stores the recorded spans as Chrome trace event JSON, which can be opened by Perfetto
+    (https://ui.perfetto.dev) or ``chrome://tracing``.
+
+    :param path: path of the JSON file
+    :param build_data: information about the build, stored as metadata of the trace
+    """
+    if TRACE_EVENTS is None:
+        return
+    metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "sphinx-build"}}]
+    data = {
+        "traceEvents": metadata + list(TRACE_EVENTS),
+        "displayTimeUnit": "ms",
+        "otherData": dict(build_data, recorded_events=TRACE_RECORDED, dropped_events=TRACE_RECORDED - len(TRACE_EVENTS)),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    print(f"Trace of {len(TRACE_EVENTS)} spans stored under {path}")
+
+
+def init_measurements(app: Sphinx, config: Any) -> None:
+    """
+    Activates the time measurements, if ``opcua_time_measurements`` is set, the memory measurements, if
+    ``opcua_memory_measurements`` is set, and starts tracing, if ``opcua_trace`` is set.
+
+    If any of them is active, the build phases get measured. The first phase lasts until the builder is ready.
+    """
+    global EXECUTE_TIME_MEASUREMENTS, START_TIME, _PHASE
+    EXECUTE_TIME_MEASUREMENTS = config.opcua_time_measurements
+    START_TIME = timer()
+    TIME_MEASUREMENTS.clear()
+    PHASE_MEASUREMENTS.clear()
+    # Caches keep references to their counter dicts, so only the values get reset
+    for stats in CACHE_MEASUREMENTS.values():
+        stats.update(dict.fromkeys(stats, 0))
+    _PHASE = None
+    if config.opcua_memory_measurements and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if config.opcua_trace:
+        start_tracing(config.opcua_trace_max_events)
+    if EXECUTE_TIME_MEASUREMENTS or config.opcua_memory_measurements or config.opcua_trace:
+        _start_phase("init")
+
+
+def _start_phase(name: str) -> None:
+    global _PHASE
+    snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot()
+    _PHASE = (name, timer(), snapshot)
+
+
+def _end_phase() -> None:
+    """
+    Ends the current build phase and stores its duration. With ``tracemalloc`` running, the peak of the
+    traced memory and the allocation sites, which grew most during the phase, are stored, too.
+    """
+    global _PHASE
+    if _PHASE is None:
+        return
+    end = timer()
+    phase, start, snapshot = _PHASE
+    _PHASE = None
+    result = PHASE_MEASUREMENTS.setdefault(phase, {"duration": 0.0})
+    result["duration"] += end - start
+    add_trace_span("phase", phase, start, end)
+    if snapshot is not None:
+        result.update(_memory_usage(snapshot))
+
+
+def _next_phase(name: str) -> None:
+    """Ends the current build phase and starts the next one, if phases are measured."""
+    if _PHASE is not None:
+        _end_phase()
+        _start_phase(name)
+
+
+def _memory_usage(start_snapshot: tracemalloc.Snapshot) -> Dict[str, Any]:
+    """Returns the traced memory and the allocation sites, which grew most since ``start_snapshot``."""
+    current, peak = tracemalloc.get_traced_memory()
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    statistics = tracemalloc.take_snapshot().filter_traces(ignored).compare_to(
+        start_snapshot.filter_traces(ignored), "lineno"
+    )
+    statistics.sort(key=lambda statistic: statistic.size_diff, reverse=True)
+    return {
+        "memory_current": current,
+        "memory_peak": peak,
+        "allocation_sites": [
+            {
+                "file": statistic.traceback[0].filename,
+                "line": statistic.traceback[0].lineno,
+                "size_diff": statistic.size_diff,
+                "count_diff": statistic.count_diff,
+            }
+            for statistic in statistics[:MEMORY_TOP_SITES]
+            if statistic.size_diff > 0
+        ],
+    }
+
+
+def trace_builder_inited(app: Sphinx) -> None:
+    _next_phase("read")
+
+
+def trace_source_read(app: Sphinx, docname: str, _source: List[str]) -> None:
+    begin_span(f"read:{docname}", "read", docname, {"docname": docname})
+
+
+def trace_doctree_read(app: Sphinx, _doctree: Any) -> None:
+    end_span(f"read:{app.env.docname}")
+
+
+def trace_env_updated(app: Sphinx, env: Any) -> None:
+    """
+    Ends the phase ``read``. If documents were read, Sphinx pickles the environment next, which includes
+    writing the sidecar files of the domain. Otherwise, it continues with writing the output.
+    """
+    _next_phase("pickle" if getattr(env, "opcua_docs_read", False) else "write")
+
+
+def trace_consistency(app: Sphinx) -> None:
+    """Starts the phase ``consistency``, called by the consistency checks of the domain."""
+    _next_phase("consistency")
+
+
+def trace_env_check_consistency(app: Sphinx, _env: Any) -> None:
+    # Runs after all other handlers, the consistency checks end with them
+    _next_phase("write")
 
-def store_timing_results_json(outdir: str, build_data: Dict[str, Any]) -> None:
-    json_result_path = os.path.join(outdir, "debug_measurement.json")
 
-    data = {"build": build_data, "measurements": TIME_MEASUREMENTS}
+def process_trace(app: Sphinx, _exception: Optional[Exception]) -> None:
+    """Ends the last phase and stores the trace as ``opcua_trace.json`` in the output directory."""
+    if TRACE_EVENTS is None:
+        return
+    _end_phase()
+    build_data = {
+        "project": app.config["project"],
+        "builder": app.builder.name,
+        "timestamp": datetime.now().isoformat(),
+        "duration": timer() - TRACE_START,
+    }
+    store_trace(os.path.join(app.outdir, "opcua_trace.json"), build_data)
+    stop_tracing()
+
+
+def cache_counters(name: str, *counters: str) -> Dict[str, int]:
+    """
+    Returns the counter dict of the cache ``name``, which gets reported together with the timing results.
+
+    Caches increase the counters directly, so counting is cheap and independent of
+    ``EXECUTE_TIME_MEASUREMENTS``. All caches with the same name share their counters.
+
+    Usage::
+
+        stats = cache_counters("my_cache")
+        stats["hits"] += 1
+
+    :param name: Name of the cache
+    :param counters: Additional counters besides ``hits`` and ``misses``
+    :return: dict of counter name -> value
+    """
+    stats = CACHE_MEASUREMENTS.setdefault(name, {"hits": 0, "misses": 0})
+    for counter in counters:
+        stats.setdefault(counter, 0)
+    return stats
+
+
+def report_data(build_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the data of the measurement report: build phases, all measured functions, the slowest
+    documented nodes, the costs of the layout functions and the cache counters.
+
+    :param build_data: information about the build
+    """
+    measurements = timing_results()
+    slowest_nodes = [
+        dict(call, function=result["name"])
+        for result in measurements.values()
+        for call in result["slowest"]
+        if "nodeid" in call
+    ]
+    slowest_nodes.sort(key=lambda call: call["runtime"], reverse=True)
+    caches = {}
+    for cache_name, stats in CACHE_MEASUREMENTS.items():
+        lookups = stats["hits"] + stats["misses"]
+        caches[cache_name] = dict(stats, hit_rate=stats["hits"] / lookups if lookups else None)
+    return {
+        "build": build_data,
+        "phases": PHASE_MEASUREMENTS,
+        "measurements": measurements,
+        "slowest_nodes": slowest_nodes[:SLOWEST_CALLS],
+        "layout_functions": sorted(
+            (result for result in measurements.values() if result["category"] == "layout_function"),
+            key=lambda result: result["overall"],
+            reverse=True,
+        ),
+        "caches": caches,
+    }
+
+
+def print_timing_results() -> None:
+    for phase, result in PHASE_MEASUREMENTS.items():
+        memory = f', peak memory: {result["memory_peak"] / 1024 ** 2:.1f} MB' if "memory_peak" in result else ""
+        print(f'phase {phase}: {result["duration"]:2f}{memory}')
+    print()
+
+    for histogram in TIME_MEASUREMENTS.values():
+        print(histogram.name)
+        print(f" amount:  {histogram.amount}")
+        print(f" overall: {histogram.overall:2f}")
+        print(f" avg:     {histogram.avg:2f}")
+        print(f" p50:     {histogram.percentile(50):2f}")
+        print(f" p90:     {histogram.percentile(90):2f}")
+        print(f" p99:     {histogram.percentile(99):2f}")
+        print(f" max:     {histogram.max:2f}")
+        print(f" min:     {histogram.min:2f} \n")
+
+    for cache_name, stats in CACHE_MEASUREMENTS.items():
+        print(cache_name)
+        for counter, value in stats.items():
+            print(f" {counter + ':':<8} {value}")
+        lookups = stats["hits"] + stats["misses"]
+        if lookups:
+            print(f' hit rate: {stats["hits"] / lookups:.1%} \n')
+
+
+def store_timing_results_json(outdir: str, data: Dict[str, Any]) -> None:
+    json_result_path = os.path.join(outdir, "debug_measurement.json")
 
     with open(json_result_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
     print(f"Timing measurement results (JSON) stored under {json_result_path}")
 
 
-def store_timing_results_html(outdir: str, build_data: Dict[str, Any]) -> None:
-    jinja_env = Environment(loader=PackageLoader("sphinx_needs"), autoescape=select_autoescape())
-    template = jinja_env.get_template("time_measurements.html")
-    out_file = Path(outdir) / "debug_measurement.html"
+def store_timing_results_html(outdir: str, data: Dict[str, Any]) -> None:
+    jinja_env = Environment(loader=PackageLoader("opcuadomain", "debug_templates"), autoescape=select_autoescape())
+    template = jinja_env.get_template("measurements.html")
+    out_file = os.path.join(outdir, "debug_measurement.html")
     with open(out_file, "w", encoding="utf-8") as f:
-        f.write(template.render(data=TIME_MEASUREMENTS, build_data=build_data))
+        f.write(template.render(data=data))
     print(f"Timing measurement report (HTML) stored under {out_file}")
 
 
 def process_timing(app: Sphinx, _exception: Optional[Exception]) -> None:
-    if EXECUTE_TIME_MEASUREMENTS:
+    """
+    Ends the last phase and stores the measurement report as ``debug_measurement.json`` and
+    ``debug_measurement.html`` in the output directory.
+    """
+    if EXECUTE_TIME_MEASUREMENTS or app.config.opcua_memory_measurements:
+        _end_phase()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
         build_data = {
             "project": app.config["project"],
+            "builder": app.builder.name,
             "start": START_TIME,
             "end": timer(),
             "duration": timer() - START_TIME,
             "timestamp": datetime.now().isoformat(),
         }
+        data = report_data(build_data)
 
         print_timing_results()
-        store_timing_results_json(app.outdir, build_data)
-        store_timing_results_html(app.outdir, build_data)
+        store_timing_results_json(app.outdir, data)
+        store_timing_results_html(app.outdir, data)
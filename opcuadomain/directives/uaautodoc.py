@@ -0,0 +1,373 @@
+import math
+import os
+import re
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from docutils import nodes
+from docutils.parsers.rst import directives
+from docutils.statemachine import StringList
+
+from sphinx.application import Sphinx
+from sphinx.util.docutils import SphinxDirective
+
+from opcuadomain.browse import is_server_url
+from opcuadomain.directives.uaimport import find_import_paths, load_nodesets
+from opcuadomain.logging import get_logger
+from opcuadomain.nodestore import NamespaceRemapper, UANodeStore, build_namespace_table, find_namespace_index
+from opcuadomain.records import UANodeRecord
+from opcuadomain.uanode import add_uanode
+from opcuadomain.utils import add_doc
+
+logger = get_logger(__name__)
+
+
+class UAAutodocDirective(SphinxDirective):
+    """
+    Documents all nodes of a namespace, NodeClass or subtree.
+
+    The optional argument is the namespace uri or index. Without any filter all nodes of the model
+    get documented.
+
+    .. code-block:: rst
+
+        .. opcua:uaautodoc:: http://www.escad.de/WDS/
+           :nodeclass: UAVariable, UAObject
+           :subtree: ns=2;i=5001
+           :pagesize: 100
+
+    The nodes are taken from the node store in a single pass and documented one after the other.
+    Only the nodes of the nodesets imported by the same document are taken into account, and a
+    namespace index refers to the namespace array of these nodesets. So the result does not depend
+    on the nodesets imported by other documents.
+
+    If more nodes match than fit on a page, the nodes get split across generated pages and the
+    directive itself only creates a toctree to these pages. The pages get generated before
+    reading, see :func:`generate_autodoc_pages`. This needs an ``uaimport`` in the same document.
+
+    Sphinx reads documents from the source directory only, so the pages get written into the
+    directory ``opcua_autodoc_dir`` (default ``opcua_autodoc``) of the source directory. It should be
+    ignored by the version control and must not be matched by ``exclude_patterns``.
+    """
+
+    has_content = False
+
+    required_arguments = 0
+    optional_arguments = 1
+
+    option_spec = {
+        "nodeclass": directives.unchanged_required,
+        "subtree": directives.unchanged_required,
+        "pagesize": directives.positive_int,
+        "page": directives.positive_int,
+        "title": directives.unchanged_required,
+        "layout": directives.unchanged_required,
+        "style": directives.unchanged_required,
+    }
+
+    final_argument_whitespace = False
+
+    def run(self) -> Sequence[nodes.Node]:
+        env = self.env
+        opcua = env.get_domain('opcua')
+
+        # Index of the directive inside the document, used to name the generated pages
+        autodoc_index = env.temp_data.get('opcua_autodoc_index', 0)
+        env.temp_data['opcua_autodoc_index'] = autodoc_index + 1
+
+        namespace = self.arguments[0] if self.arguments else None
+        node_classes = parse_node_classes(self.options.get("nodeclass"))
+        root_id = self.options.get("subtree")
+        page_size = self.options.get("pagesize", env.config.opcua_autodoc_pagesize)
+
+        # The same nodes as counted by generate_autodoc_pages(), independent of other documents
+        sources = find_import_paths(env.app, env, env.docname) or None
+        namespaces = opcua.data['UANamespaces'] if sources is None else opcua.get_source_namespaces(sources)
+        if namespace is not None and find_namespace_index(namespaces, namespace) is None:
+            logger.warning(f"Unknown namespace {namespace} in {self.name}.", location=(self.env.docname, self.lineno))
+            return []
+
+        def select() -> Iterator[UANodeRecord]:
+            return opcua.select_uanodes(namespace, node_classes, root_id, sources)
+
+        if "page" in self.options:
+            # Generated page: document the nodes of this page only
+            start = (self.options["page"] - 1) * page_size
+            return self.document_nodes(islice(select(), start, start + page_size))
+
+        count = sum(1 for _ua_node in select())
+        if count <= page_size:
+            return self.document_nodes(select())
+        if sources is None:
+            logger.warning(
+                f"{count} nodes do not fit on a page, but {self.name} can only split nodesets imported by "
+                f"the same document into pages. All nodes get documented here.",
+                location=(self.env.docname, self.lineno),
+            )
+            return self.document_nodes(select())
+
+        page_docnames = [
+            autodoc_page_docname(env.config.opcua_autodoc_dir, self.env.docname, autodoc_index, page)
+            for page in range(1, math.ceil(count / page_size) + 1)
+        ]
+        toctree = StringList()
+        toctree.append(".. toctree::", self.env.docname, self.lineno)
+        toctree.append("   :maxdepth: 1", self.env.docname, self.lineno)
+        toctree.append("", self.env.docname, self.lineno)
+        for page_docname in page_docnames:
+            toctree.append(f"   /{page_docname}", self.env.docname, self.lineno)
+
+        node = nodes.Element()
+        self.state.nested_parse(toctree, self.content_offset, node)
+        return node.children
+
+    def document_nodes(self, ua_nodes: Iterator[UANodeRecord]) -> List[nodes.Node]:
+        env = self.env
+        result_nodes = []
+        for ua_node in ua_nodes:
+            result_nodes += add_uanode(
+                env.app,
+                self.state,
+                ua_node,
+                env.docname,
+                self.lineno,
+                style=self.options.get("style"),
+                layout=self.options.get("layout", ""),
+            )
+        add_doc(env, env.docname)
+        return result_nodes
+
+
+def parse_node_classes(value: Optional[str]) -> Optional[List[str]]:
+    """Splits a list of NodeClasses like ``Variable, UAObject`` into ``['UAVariable', 'UAObject']``."""
+    if not value:
+        return None
+    return [name if name.startswith("UA") else f"UA{name}" for name in re.split(r"[,\s]+", value.strip()) if name]
+
+
+def autodoc_page_docname(autodoc_dir: str, docname: str, autodoc_index: int, page: int) -> str:
+    """Returns the docname of a page generated for the ``autodoc_index``-th autodoc directive of ``docname``."""
+    return f"{autodoc_dir}/{docname.replace('/', '.')}-{autodoc_index}-{page}"
+
+
+uaautodoc_pattern = re.compile(r"^([ \t]*)\.\. opcua:(uaautodoc|uanamespace)::(.*)$")
+option_pattern = re.compile(r"^:([\w-]+):(.*)$")
+
+
+def find_autodoc_directives(lines: List[str]) -> List[Tuple[str, str, Dict[str, str]]]:
+    """
+    Scans the lines of a document for autodoc directives.
+
+    :return: list of (directive name, argument, options as strings)
+    """
+    found = []
+    for index, line in enumerate(lines):
+        m = uaautodoc_pattern.match(line)
+        if m is None:
+            continue
+        indent = len(m.group(1))
+        options = {}
+        for next_line in lines[index + 1:]:
+            stripped = next_line.strip()
+            if not stripped or len(next_line) - len(next_line.lstrip()) <= indent:
+                break
+            option = option_pattern.match(stripped)
+            if option:
+                options[option.group(1)] = option.group(2).strip()
+        found.append((m.group(2), m.group(3).strip(), options))
+    return found
+
+
+def _build_model(app: Sphinx, paths: List[str]) -> Tuple[List[str], UANodeStore]:
+    namespaces: List[str] = []
+    store = UANodeStore()
+    nodesets = load_nodesets(app, paths)
+    for path in paths:
+        ua_namespaces, _ua_aliases, ua_nodes = nodesets[path]
+        remapper = NamespaceRemapper(build_namespace_table(namespaces, ua_namespaces))
+        store.add_remapped(path, ua_nodes, remapper)
+    return namespaces, store
+
+
+# First line of generated pages, only files starting with it get deleted from the autodoc directory
+AUTODOC_MARKER = ".. This page got generated by opcuadomain for an autodoc directive, changes get overwritten."
+
+
+def _page_source(app: Sphinx, name: str, argument: str, options: Dict[str, str], paths: List[str],
+                 page: int, pages: int) -> str:
+    title = options.get("title")
+    if not title:
+        title = f"Nodes of {argument}" if argument else "Nodes"
+    title = f"{title} ({page}/{pages})"
+
+    lines = [AUTODOC_MARKER, "", title, "=" * len(title), ""]
+    if paths:
+        imports = " ".join(
+            path if is_server_url(path) else "/" + os.path.relpath(path, app.srcdir).replace(os.sep, "/")
+            for path in paths
+        )
+        lines += [f".. opcua:uaimport:: {imports}", ""]
+    lines.append(f".. opcua:{name}:: {argument}".rstrip())
+    for option, value in options.items():
+        if option != "page":
+            lines.append(f"   :{option}: {value}".rstrip())
+    lines.append(f"   :page: {page}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _source_state(app: Sphinx, paths: List[str]) -> tuple:
+    """
+    Returns the state of the imported nodesets, which changes whenever their nodes may have changed.
+
+    Files are identified by their modification time and size, servers by the token of the snapshot
+    imported by the last build.
+    """
+    sources = app.env.get_domain('opcua').data['UASources']
+    state = []
+    for path in paths:
+        if is_server_url(path):
+            state.append((path, sources.get(path, (None, None))[1]))
+        else:
+            stat = os.stat(path)
+            state.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(state)
+
+
+def generate_autodoc_pages(app: Sphinx) -> None:
+    """
+    Generates the pages for all autodoc directives, whose nodes do not fit on a single page.
+
+    The pages get written to ``opcua_autodoc_dir`` inside the source directory, as Sphinx does not
+    read documents from other directories. They only contain an ``uaimport`` and an autodoc directive
+    for a single page, the nodes are documented while reading. Pages get only written if their content
+    has changed, so that unchanged pages are not read again. Generated pages of removed directives
+    and of a former ``opcua_autodoc_dir`` get deleted, other files of the directory are kept.
+    The directory itself is not scanned for autodoc directives.
+
+    A warning is given if ``opcua_autodoc_dir`` is outside of the source directory or the pages are
+    excluded by ``exclude_patterns``, as their documents would not be found.
+
+    If neither the autodoc directives nor their imported nodesets have changed since the last build,
+    the nodesets are not loaded and the pages are kept as they are.
+    """
+    env = app.env
+    opcua = env.get_domain('opcua')
+    autodoc_dir = app.config.opcua_autodoc_dir
+    autodoc_path = os.path.normpath(os.path.join(app.srcdir, autodoc_dir))
+    if os.path.isabs(autodoc_dir) or not autodoc_path.startswith(os.path.join(os.path.normpath(app.srcdir), "")):
+        logger.warning(f"opcua_autodoc_dir {autodoc_dir} must be a directory inside the source directory.")
+        return
+    env.find_files(app.config, app.builder)
+
+    directives_found = []
+    for docname in sorted(env.found_docs):
+        if docname.startswith(f"{autodoc_dir}/"):
+            continue
+        try:
+            with open(env.doc2path(docname), encoding=app.config.source_encoding) as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        found = find_autodoc_directives(lines)
+        if any("page" not in options for _name, _argument, options in found):
+            directives_found.append((docname, found, find_import_paths(app, env, docname)))
+
+    state_key = (
+        autodoc_dir,
+        app.config.opcua_autodoc_pagesize,
+        tuple(
+            (docname, repr(found), _source_state(app, paths)) for docname, found, paths in directives_found
+        ),
+    )
+    autodoc_state = opcua.data['UAAutodoc']
+    if autodoc_state.get("key") == state_key and all(
+        os.path.exists(env.doc2path(page_docname)) for page_docname in autodoc_state.get("pages", [])
+    ):
+        logger.verbose("Autodoc directives and their nodesets are unchanged, pages are up to date.")
+        return
+
+    models: Dict[Tuple[str, ...], Tuple[List[str], UANodeStore]] = {}
+    page_sources: Dict[str, str] = {}
+    for docname, found, paths in directives_found:
+        for autodoc_index, (name, argument, options) in enumerate(found):
+            if "page" in options:
+                continue
+            if tuple(paths) not in models:
+                models[tuple(paths)] = _build_model(app, paths)
+            namespaces, store = models[tuple(paths)]
+
+            namespace_index = None
+            if argument:
+                namespace_index = find_namespace_index(namespaces, argument)
+                if namespace_index is None:
+                    continue
+            count = sum(
+                1 for _ua_node in store.select(
+                    namespace_index, parse_node_classes(options.get("nodeclass")), options.get("subtree"), paths
+                )
+            )
+            page_size = int(options.get("pagesize") or app.config.opcua_autodoc_pagesize)
+            pages = math.ceil(count / page_size)
+            if pages <= 1:
+                continue
+            for page in range(1, pages + 1):
+                page_docname = autodoc_page_docname(autodoc_dir, docname, autodoc_index, page)
+                page_sources[page_docname] = _page_source(app, name, argument, options, paths, page, pages)
+
+    _write_pages(app, page_sources, autodoc_state.get("pages", []))
+    opcua.data['UAAutodoc'] = {"key": state_key, "pages": sorted(page_sources)}
+
+    if page_sources:
+        env.find_files(app.config, app.builder)
+        excluded = sorted(page_docname for page_docname in page_sources if page_docname not in env.found_docs)
+        if excluded:
+            logger.warning(
+                f"{len(excluded)} generated autodoc pages are excluded from the build, like {excluded[0]}. "
+                f"Remove {autodoc_dir} from exclude_patterns."
+            )
+
+
+def _write_pages(app: Sphinx, page_sources: Dict[str, str], former_pages: List[str]) -> None:
+    autodoc_dir = app.config.opcua_autodoc_dir
+    suffix = next(iter(app.config.source_suffix), ".rst")
+
+    # Pages of the last build, which may be located in a former autodoc directory
+    for page_docname in former_pages:
+        path = os.path.join(app.srcdir, page_docname + suffix)
+        if page_docname not in page_sources and _is_generated(path):
+            os.remove(path)
+            logger.info(f"Removed outdated autodoc page {page_docname}.")
+    page_paths = set()
+    for page_docname, source in page_sources.items():
+        path = os.path.join(app.srcdir, page_docname + suffix)
+        page_paths.add(os.path.normpath(path))
+        try:
+            with open(path, encoding="utf-8") as f:
+                if f.read() == source:
+                    continue
+        except OSError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        logger.info(f"Generated autodoc page {page_docname}.")
+
+    autodoc_path = os.path.join(app.srcdir, autodoc_dir)
+    if not os.path.isdir(autodoc_path):
+        return
+    for file_name in os.listdir(autodoc_path):
+        path = os.path.normpath(os.path.join(autodoc_path, file_name))
+        if not file_name.endswith(suffix) or path in page_paths or not _is_generated(path):
+            continue
+        os.remove(path)
+        logger.info(f"Removed outdated autodoc page {file_name}.")
+
+
+def _is_generated(path: str) -> bool:
+    """Checks if the file at ``path`` is a page generated by :func:`generate_autodoc_pages`."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().rstrip("\n") == AUTODOC_MARKER
+    except (OSError, UnicodeDecodeError):
+        return False
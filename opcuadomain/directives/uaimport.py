@@ -1,23 +1,50 @@
 import os
+import re
 
-from typing import Sequence, cast
-from urllib.parse import urlparse
+from typing import Dict, List, Optional, Sequence, Set, cast
 
 from asyncua import ua
 #from opcua.common.xmlimporter import XmlImporter
-from asyncua.common.xmlparser import XMLParser, NodeData, Field
+from asyncua.common.xmlparser import NodeData, Field
 
 from docutils import nodes
 from docutils.parsers.rst import Directive, directives
 
+from sphinx.application import Sphinx
 from sphinx.environment import BuildEnvironment
 
+from opcuadomain.browse import is_server_url
+from opcuadomain.cache import NodesetData, file_hash, get_nodeset_cache
+from opcuadomain.debug import measure_time, trace_span
 from opcuadomain.logging import get_logger
+from opcuadomain.nodeset import read_nodesets
+from opcuadomain.servercache import get_server_cache
+from opcuadomain.snapshot import SnapshotError, UASnapshot, is_snapshot
 
 logger = get_logger(__name__)
 
-
 class UAImportDirective(Directive):
+    """
+    Imports one or more nodesets into the node model of the domain.
+
+    Several nodesets can be given separated by whitespace, also on continuation lines. They get
+    merged with all nodesets imported before, namespace indices are translated into the namespace
+    array of the merged model.
+
+    .. code-block:: rst
+
+        .. opcua:uaimport:: nodesets/Opc.Ua.NodeSet2.xml nodesets/Opc.Ua.Di.NodeSet2.xml
+
+    Instead of nodeset files, snapshots created by :mod:`opcuadomain.convert` can be imported. They
+    get memory-mapped and nodes are only loaded when they are looked up.
+
+    The model can also be browsed from a running server, given by its url::
+
+        .. opcua:uaimport:: opc.tcp://localhost:4840
+
+    The browsed model is stored as snapshot and only checked for changes on later builds, see
+    :mod:`opcuadomain.servercache`.
+    """
     has_content = False
 
     required_arguments = 1
@@ -25,55 +52,53 @@ class UAImportDirective(Directive):
 
     option_spec = {}
 
-    final_argument_whitespace = False
+    # The paths are taken as one argument and split here, so there is no limit on their number
+    final_argument_whitespace = True
 
+    @measure_time("import", name="UAImportDirective.run", span_args=lambda self: {"docname": self.docname, "nodesets": self.import_paths})
     def run(self) -> Sequence[nodes.Node]:
 
-        opcua_import_path = self.arguments[0]
-
-        ua_nodes = []
+        abs_opcua_import_paths = []
 
-        # check if given arguemnt is a url to a opc server
-        url = urlparse(opcua_import_path)
-        if url.scheme and url.netloc:
-            logger.info(f"Browse nodeset from {opcua_import_path}." )
+        for opcua_import_path in self.import_paths:
 
-            raise NotImplementedError(f"Browsing a opc-server is not implemented yet. {opcua_import_path}")
+            # check if given arguemnt is a url to a opc server
+            if is_server_url(opcua_import_path):
+                logger.info(f"Browse nodeset from {opcua_import_path}." )
+                abs_opcua_import_paths.append(opcua_import_path)
+                continue
 
-        else:
             logger.info(f"Import nodeset from {opcua_import_path}." )
 
-            if not os.path.isabs(opcua_import_path):
-                curr_dir = os.path.dirname(self.docname)
-                abs_opcua_import_path = os.path.join(self.env.app.srcdir, curr_dir, opcua_import_path)
-            else:
-                abs_opcua_import_path = os.path.join(self.env.app.srcdir, opcua_import_path[1:])
+            abs_opcua_import_path = resolve_import_path(self.env.app, self.docname, opcua_import_path)
 
             if not os.path.exists(abs_opcua_import_path):
                 raise ReferenceError(f"Could not load nodeset file {abs_opcua_import_path}")
-            
-            parser = XMLParser()
-
-            parser.parse_sync(abs_opcua_import_path)
 
+            abs_opcua_import_paths.append(abs_opcua_import_path)
 
-            opcua = self.env.get_domain('opcua')
+        opcua = self.env.get_domain('opcua')
 
-            ua_namespaces = parser.get_used_namespaces()
-            
-            #for ns in ua_namespaces:
-            #    opcua.add_namespace(ns)
-            
-            ua_aliases = parser.get_aliases()
+        # Nodesets preloaded before the documents got read are already part of the model
+        missing_paths = [path for path in abs_opcua_import_paths if not opcua.is_preloaded(path)]
+        hashes: Dict[str, str] = {}
+        nodesets = load_nodesets(self.env.app, missing_paths, hashes)
 
-            ua_nodes = parser.get_node_datas()
+        # Merge in the given order, so that the namespace array of the model is deterministic
+        for abs_opcua_import_path in abs_opcua_import_paths:
+            if abs_opcua_import_path in nodesets:
+                merge_nodeset(
+                    opcua, abs_opcua_import_path, nodesets[abs_opcua_import_path],
+                    content_hash=hashes.get(abs_opcua_import_path)
+                )
+            opcua.note_import(abs_opcua_import_path, self.docname)
 
-            opcua.data['UANodes'] = ua_nodes
-            opcua.data['UAAliases'] = ua_aliases
-            opcua.data['UANamespaces'] = ua_namespaces
-            
         return []
-    
+
+    @property
+    def import_paths(self) -> List[str]:
+        return self.arguments[0].split()
+
     @property
     def env(self) -> BuildEnvironment:
         return cast(BuildEnvironment, self.state.document.settings.env)
@@ -81,9 +106,214 @@ class UAImportDirective(Directive):
     @property
     def docname(self) -> str:
         return self.env.docname
-    
 
 
+def resolve_import_path(app: Sphinx, docname: str, opcua_import_path: str) -> str:
+    """
+    Returns the absolute path of a nodeset given as argument of ``uaimport`` in ``docname``.
+
+    The path is normalized, as it identifies the nodeset in the model. So a nodeset imported by
+    different documents through different relative paths is only imported once.
+    """
+    if not os.path.isabs(opcua_import_path):
+        curr_dir = os.path.dirname(docname)
+        return os.path.normpath(os.path.join(app.srcdir, curr_dir, opcua_import_path))
+    return os.path.normpath(os.path.join(app.srcdir, opcua_import_path[1:]))
+
+
+@measure_time("import")
+def load_nodesets(app: Sphinx, paths: List[str], hashes: Optional[Dict[str, str]] = None) -> Dict[str, NodesetData]:
+    """
+    Loads the given nodeset files from the nodeset cache or parses them.
+
+    Snapshot files are memory-mapped instead, their nodes are given as
+    :class:`~opcuadomain.snapshot.UASnapshot`. Server urls get loaded from the server cache, see
+    :mod:`opcuadomain.servercache`.
+
+    :param hashes: dict of path -> :func:`~opcuadomain.cache.file_hash` of the nodeset files. Given
+        hashes get reused, computed ones get added, so that each file is only hashed once.
+    :return: dict of path -> namespaces, aliases and nodes of the nodeset
+    """
+    cache = get_nodeset_cache(app)
+    hashes = {} if hashes is None else hashes
+
+    nodesets = {}
+    missing_paths = []
+    server_urls = []
+    for path in paths:
+        if is_server_url(path):
+            server_urls.append(path)
+            continue
+        if is_snapshot(path):
+            snapshot = UASnapshot(path)
+            nodesets[path] = (snapshot.namespaces, snapshot.aliases, snapshot)
+            continue
+        if cache and path not in hashes:
+            hashes[path] = file_hash(path)
+        cached = cache.load(path, hashes[path]) if cache else None
+        if cached is not None:
+            nodesets[path] = cached
+        else:
+            missing_paths.append(path)
+
+    # Files which are not cached are independent of each other and can be parsed in parallel
+    parsed = read_nodesets(missing_paths, app.config.opcua_import_workers)
+    for path, nodeset in zip(missing_paths, parsed):
+        if cache:
+            cache.store(path, nodeset, hashes[path])
+        nodesets[path] = nodeset
+
+    if server_urls:
+        nodesets.update(zip(server_urls, get_server_cache(app).load(server_urls)))
+
+    return nodesets
+
+
+def merge_nodeset(
+    opcua, path: str, nodeset: NodesetData, preloaded: bool = False, content_hash: Optional[str] = None
+) -> None:
+    """
+    Merges a loaded nodeset into the model of the domain ``opcua``, traced as ``merge`` span.
+    """
+    ua_namespaces, ua_aliases, ua_nodes = nodeset
+    with trace_span("import", "merge", {"nodeset": path}):
+        opcua.add_nodeset(
+            path, ua_namespaces, ua_aliases, ua_nodes, preloaded=preloaded, content_hash=content_hash
+        )
+
+
+uaimport_pattern = re.compile(r"^([ \t]*)\.\. opcua:uaimport::(.*)$")
+
+
+def find_import_paths(app: Sphinx, env: BuildEnvironment, docname: str) -> List[str]:
+    """
+    Scans the source of a document for ``uaimport`` directives and returns the absolute paths of
+    all imported nodeset files and the urls of all browsed servers.
+    """
+    try:
+        with open(env.doc2path(docname), encoding=app.config.source_encoding) as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    paths = []
+    for index, line in enumerate(lines):
+        m = uaimport_pattern.match(line)
+        if m is None:
+            continue
+        indent = len(m.group(1))
+        arguments = m.group(2).split()
+        # Arguments may be continued on the following, deeper indented lines
+        for next_line in lines[index + 1:]:
+            stripped = next_line.strip()
+            if not stripped or stripped.startswith(":") or len(next_line) - len(next_line.lstrip()) <= indent:
+                break
+            arguments += stripped.split()
+
+        for argument in arguments:
+            if is_server_url(argument):
+                paths.append(argument)
+                continue
+            path = resolve_import_path(app, docname, argument)
+            if os.path.exists(path):
+                paths.append(path)
+    return paths
+
+
+def preload_nodesets(app: Sphinx, env: BuildEnvironment, docnames: List[str]) -> None:
+    """
+    Imports the nodesets of all documents, which are going to be read, before reading starts.
+
+    For parallel builds the documents get read in forked worker processes. Without preloading,
+    only the worker reading the document with the ``uaimport`` directive would know the model.
+    """
+    paths = []
+    for docname in docnames:
+        for path in find_import_paths(app, env, docname):
+            if path not in paths:
+                paths.append(path)
+
+    if not paths:
+        return
+
+    opcua = env.get_domain('opcua')
+    hashes: Dict[str, str] = {}
+    nodesets = load_nodesets(app, paths, hashes)
+    for path in paths:
+        merge_nodeset(opcua, path, nodesets[path], preloaded=True, content_hash=hashes.get(path))
+
+
+def find_outdated_docs(
+    app: Sphinx, env: BuildEnvironment, added: Set[str], changed: Set[str], removed: Set[str]
+) -> List[str]:
+    """
+    Updates the model for changed nodesets and returns the documents rendering changed nodes.
+
+    A nodeset counts as changed if its content hash differs from the one at import time. A server
+    counts as changed if the server cache provides another snapshot than at import time. Its nodes get
+    replaced in the model, and the old and new nodes are compared by their content hashes. Only the
+    documents which render added, removed or changed nodes get read again, see
+    :meth:`~opcuadomain.opcua.OpcuaDomain.note_dependencies`.
+    """
+    opcua = env.get_domain('opcua')
+    store = opcua.data['UANodes']
+
+    changed_paths = []
+    hashes: Dict[str, str] = {}
+    for path, (mtime, content_hash) in list(opcua.data['UASources'].items()):
+        if is_server_url(path):
+            (nodeset,) = get_server_cache(app).load([path])
+            if getattr(nodeset[2], "token", None) != content_hash:
+                changed_paths.append(path)
+            continue
+        if not os.path.exists(path):
+            continue
+        current_mtime = os.path.getmtime(path)
+        if current_mtime == mtime:
+            continue
+        hashes[path] = file_hash(path)
+        if hashes[path] == content_hash:
+            opcua.data['UASources'][path] = (current_mtime, content_hash)
+            continue
+        changed_paths.append(path)
+
+    if not changed_paths:
+        return []
+
+    changed_node_ids: Set[str] = set()
+    nodesets = load_nodesets(app, changed_paths, hashes)
+    for path in changed_paths:
+        try:
+            old_nodes = {ua_node.nodeid: (ua_node.content_hash(), ua_node.parent) for ua_node in store.source_nodes(path)}
+        except SnapshotError:
+            # The replaced snapshot is gone, so all of its nodes count as changed
+            old_nodes = {}
+        merge_nodeset(opcua, path, nodesets[path], content_hash=hashes.get(path))
+        new_nodes = {ua_node.nodeid: (ua_node.content_hash(), ua_node.parent) for ua_node in store.source_nodes(path)}
 
+        changed_in_path = {
+            node_id for node_id in old_nodes.keys() | new_nodes.keys()
+            if old_nodes.get(node_id) != new_nodes.get(node_id)
+        }
+        logger.info(f"Nodeset {path} changed, {len(changed_in_path)} changed nodes.")
+        changed_node_ids |= changed_in_path
+        # The parents list their children, which may only reference the parent, like browsed nodes
+        for node_id in changed_in_path:
+            for _hash, parent in (old_nodes.get(node_id, (None, None)), new_nodes.get(node_id, (None, None))):
+                if parent:
+                    changed_node_ids.add(parent)
 
+    outdated = [
+        docname for docname in opcua.find_dependent_docs(changed_node_ids)
+        if docname not in changed and docname not in removed
+    ]
+    if outdated:
+        logger.info(f"{len(outdated)} documents render changed nodes.")
 
+    # Sphinx stores the environment only if a document was read. The importing documents get read
+    # again, so the updated model is stored even if no document renders a changed node.
+    for path in changed_paths:
+        for docname in opcua.data['UAImports'].get(path, []):
+            if docname not in outdated and docname not in changed and docname not in removed:
+                outdated.append(docname)
+    return outdated
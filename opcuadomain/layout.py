@@ -7,7 +7,7 @@ import os
 import re
 import uuid
 from contextlib import suppress
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
@@ -16,14 +16,13 @@ from docutils.frontend import OptionParser
 from docutils.parsers.rst import Parser, languages
 from docutils.parsers.rst.states import Inliner, Struct
 from docutils.utils import new_document
-from jinja2 import BaseLoader, Environment
 from sphinx.application import Sphinx
 from sphinx.environment.collectors.asset import DownloadFileCollector, ImageCollector
 
 from asyncua.common.xmlparser import RefStruct
 
-#from sphinx_needs.debug import measure_time
-from opcuadomain.utils import INTERNALS, match_string_link, unwrap
+from opcuadomain.debug import measure_time
+from opcuadomain.utils import INTERNALS, get_string_links, match_string_link, unwrap
 
 def create_need(need_id: str, app: Sphinx, layout=None, style=None, docname: Optional[str] = None) -> nodes.container:
     """
@@ -116,6 +115,11 @@ def replace_pending_xref_refdoc(node, new_refdoc: str) -> None:
 
 
 
+def _need_span(layout, node, *args, fromdocname: Optional[str] = None, **kwargs) -> dict:
+    return {"nodeid": node["ids"][0], "layout": layout, "docname": fromdocname}
+
+
+@measure_time("layout", span_args=_need_span)
 def build_need(layout, node, ua_node, app: Sphinx, style=None, fromdocname: Optional[str] = None) -> None:
     """
     Builds a need based on a given layout for a given need-node.
@@ -173,11 +177,144 @@ def build_need(layout, node, ua_node, app: Sphinx, style=None, fromdocname: Opti
     node.parent.replace(node, node_container)
 
 
+class LayoutParserState:
+    """
+    Docutils objects needed to parse rst snippets of layouts.
+
+    Building the settings by ``OptionParser`` and the customizations of the ``Inliner`` is expensive, so
+    they are shared by all layout handlers. Documents collect ids, messages and substitutions while
+    parsing, so each handler gets its own document by :meth:`new_document`.
+    """
+
+    def __init__(self) -> None:
+        self.settings = OptionParser(components=(Parser,)).get_default_values()
+        self.language = languages.get_language(self.settings.language_code)
+        self.inliner = Inliner()
+        self.inliner.init_customizations(self.settings)
+
+    def new_document(self) -> Tuple[nodes.document, Struct]:
+        """
+        Returns a new dummy document and the memo to parse into it.
+        """
+        document = new_document("dummy", self.settings)
+        memo = Struct(
+            document=document,
+            reporter=document.reporter,
+            language=self.language,
+            title_styles=[],
+            section_level=0,
+            section_bubble_up_kludge=False,
+            inliner=None,
+        )
+        return document, memo
+
+
+_parser_state: Optional[LayoutParserState] = None
+
+
+def get_parser_state() -> LayoutParserState:
+    """Returns the process wide :class:`LayoutParserState`."""
+    global _parser_state
+    if _parser_state is None:
+        _parser_state = LayoutParserState()
+    return _parser_state
+
+
+# Compiled layout lines: layout name -> section -> (lines, line plans)
+LAYOUT_PLANS: Dict[str, Dict[str, Tuple[Tuple[str, ...], List[list]]]] = {}
+
+# Resolved grids: handler class -> grid name -> (grid method, configs)
+GRID_FUNCS: Dict[type, Dict[str, Tuple[Callable, dict]]] = {}
+
+PLAN_ELEMENT = 0
+PLAN_TEXT = 1
+
+
+def compile_grids(handler_class: type) -> Dict[str, Tuple[Callable, dict]]:
+    """
+    Resolves the method names of ``handler_class.grids`` to the grid methods.
+
+    The grids get resolved only once per handler class, so a misspelled method name fails on the first
+    layout, instead of when the grid gets rendered.
+
+    :param handler_class: :class:`LayoutHandler` or a subclass of it
+    :return: dict of grid name -> grid method and its configs
+    """
+    grid_funcs = GRID_FUNCS.get(handler_class)
+    if grid_funcs is None:
+        grid_funcs = {}
+        for grid_name, grid in handler_class.grids.items():
+            func_name, configs = (grid, {}) if isinstance(grid, str) else (grid["func"], grid["configs"])
+            grid_func = getattr(handler_class, func_name, None)
+            if not callable(grid_func):
+                raise SphinxNeedLayoutException(f"Grid {grid_name} uses unknown method {func_name}")
+            grid_funcs[grid_name] = (grid_func, configs)
+        GRID_FUNCS[handler_class] = grid_funcs
+    return grid_funcs
+
+func_pattern = re.compile(r"(<<[^<>]+>>)|([^<>]+)")
+
+
 class LayoutHandler:
     """
     Cares about the correct layout handling
     """
 
+    # Grid name -> name of the grid method or dict of grid method name and its configs.
+    # The method names get resolved once by compile_grids(), so the table is shared by all handlers.
+    grids = {
+        "simple": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": False},
+        },
+        "detailed": "_grid_detailed",
+        "simple_footer": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": True},
+        },
+        "simple_side_left": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [30, 70], "side_left": "full", "side_right": False, "footer": False},
+        },
+        "simple_side_right": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [70, 30], "side_left": False, "side_right": "full", "footer": False},
+        },
+        "simple_side_left_partial": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [20, 80], "side_left": "part", "side_right": False, "footer": False},
+        },
+        "simple_side_right_partial": {
+            "func": "_grid_simple",
+            "configs": {"colwidths": [80, 20], "side_left": False, "side_right": "part", "footer": False},
+        },
+        "complex": "_grid_complex",
+        "content": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": False},
+        },
+        "content_footer": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": True},
+        },
+        "content_side_left": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [5, 95], "side_left": True, "side_right": False, "footer": False},
+        },
+        "content_side_right": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [95, 5], "side_left": False, "side_right": True, "footer": False},
+        },
+        "content_footer_side_left": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [5, 95], "side_left": True, "side_right": False, "footer": True},
+        },
+        "content_footer_side_right": {
+            "func": "_grid_content",
+            "configs": {"colwidths": [95, 5], "side_left": False, "side_right": True, "footer": True},
+        },
+    }
+
     def __init__(self, app: Sphinx, need, layout, node, style=None, fromdocname: Optional[str] = None) -> None:
         self.app = app
         self.need = need
@@ -219,72 +356,11 @@ class LayoutHandler:
         self.node_table = nodes.table(classes=classes, ids=[self.need["id"]])
         self.node_tbody = nodes.tbody()
 
-        self.grids = {
-            "simple": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": False},
-            },
-            "detailed": self._grid_detailed,
-            "simple_footer": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": True},
-            },
-            "simple_side_left": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [30, 70], "side_left": "full", "side_right": False, "footer": False},
-            },
-            "simple_side_right": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [70, 30], "side_left": False, "side_right": "full", "footer": False},
-            },
-            "simple_side_left_partial": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [20, 80], "side_left": "part", "side_right": False, "footer": False},
-            },
-            "simple_side_right_partial": {
-                "func": self._grid_simple,
-                "configs": {"colwidths": [80, 20], "side_left": False, "side_right": "part", "footer": False},
-            },
-            "complex": self._grid_complex,
-            "content": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": False},
-            },
-            "content_footer": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [100], "side_left": False, "side_right": False, "footer": True},
-            },
-            "content_side_left": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [5, 95], "side_left": True, "side_right": False, "footer": False},
-            },
-            "content_side_right": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [95, 5], "side_left": False, "side_right": True, "footer": False},
-            },
-            "content_footer_side_left": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [5, 95], "side_left": True, "side_right": False, "footer": True},
-            },
-            "content_footer_side_right": {
-                "func": self._grid_content,
-                "configs": {"colwidths": [95, 5], "side_left": False, "side_right": True, "footer": True},
-            },
-        }
-
-        # Dummy Document setup
-        self.doc_settings = OptionParser(components=(Parser,)).get_default_values()
-        self.dummy_doc = new_document("dummy", self.doc_settings)
-        self.doc_language = languages.get_language(self.dummy_doc.settings.language_code)
-        self.doc_memo = Struct(
-            document=self.dummy_doc,
-            reporter=self.dummy_doc.reporter,
-            language=self.doc_language,
-            title_styles=[],
-            section_level=0,
-            section_bubble_up_kludge=False,
-            inliner=None,
-        )
+        # Dummy Document setup, settings and inliner are shared by all handlers
+        self.parser_state = get_parser_state()
+        self.doc_settings = self.parser_state.settings
+        self.doc_language = self.parser_state.language
+        self.dummy_doc, self.doc_memo = self.parser_state.new_document()
 
         self.functions = {
             "meta": self.meta,
@@ -307,15 +383,8 @@ class LayoutHandler:
         # Do not set needs_string_links here and update it.
         # This would lead to deepcopy()-errors, as needs_string_links gets some "pickled" and jinja Environment is
         # too complex for this.
-        self.string_links = {}
-#        for link_name, link_conf in app.config.needs_string_links.items():
-#            self.string_links[link_name] = {
-#                "url_template": Environment(loader=BaseLoader).from_string(link_conf["link_url"]),
-#                "name_template": Environment(loader=BaseLoader).from_string(link_conf["link_name"]),
-#                "regex_compiled": re.compile(link_conf["regex"]),
-#                "options": link_conf["options"],
-#                "name": link_name,
-#            }
+        # The compiled links are shared by all handlers of a build.
+        self.string_link_registry = get_string_links(app)
 
     def get_need_table(self) -> nodes.table:
         if self.layout["grid"] not in self.grids.keys():
@@ -323,11 +392,8 @@ class LayoutHandler:
                 "Unknown layout-grid: {}. Supported are {}".format(self.layout["grid"], ", ".join(self.grids.keys()))
             )
 
-        func = self.grids[self.layout["grid"]]
-        if callable(func):
-            func()
-        else:
-            func["func"](**func["configs"])
+        grid_func, configs = compile_grids(type(self))[self.layout["grid"]]
+        grid_func(self, **configs)
 
         return self.node_table
 
@@ -344,17 +410,113 @@ class LayoutHandler:
 
         lines_container = nodes.line_block(classes=[f"needs_{section}"])
 
-        for line in lines:
+        for line_plan in self._get_section_plan(section, lines):
             # line_block_node = nodes.line_block()
             line_node = nodes.line()
 
-            line_parsed = self._parse(line)
-            line_ready = self._func_replace(line_parsed)
-            line_node += line_ready
+            line_node += self._render_plan(line_plan)
             lines_container.append(line_node)
 
         return lines_container
 
+    def _get_section_plan(self, section: str, lines: List[str]) -> List[list]:
+        """
+        Returns the compiled plans of all lines of a layout section.
+
+        Layouts do not change during a build, so each section gets compiled only once per layout name.
+        If the lines of the section differ from the cached ones, the section gets compiled again.
+        """
+        layout_plans = LAYOUT_PLANS.setdefault(self.layout_name, {})
+        lines_key = tuple(lines)
+        cached = layout_plans.get(section)
+        if cached is None or cached[0] != lines_key:
+            cached = (lines_key, [self._compile_line(line) for line in lines])
+            layout_plans[section] = cached
+        return cached[1]
+
+    def _compile_line(self, line: str) -> list:
+        """
+        Compiles a single layout line into a plan.
+
+        The line gets parsed for inline rst statements and function definitions like ``<<meta("title")>>``
+        get analyzed. The plan is a list of:
+
+        * ``(PLAN_ELEMENT, element, child plans)`` for parsed docutils elements, ``element`` has no children
+        * ``(PLAN_TEXT, tokens)`` for texts. ``tokens`` is a list of ``(text, None)`` for static strings and
+          ``(None, (func_name, func_args, func_kargs, func_def_clean))`` for function calls.
+
+        :param line: layout line
+        :return: plan of the line
+        """
+        return self._compile_nodes(self._parse(line))
+
+    def _compile_nodes(self, section_nodes) -> list:
+        from opcuadomain.functions.functions import (
+            _analyze_func_string,
+        )
+
+        plan = []
+        for node in section_nodes:
+            if not isinstance(node, nodes.Text):
+                element = node.copy()
+                plan.append((PLAN_ELEMENT, element, self._compile_nodes(node.children)))
+                continue
+
+            tokens = []
+            for func_def, text in func_pattern.findall(str(node)):
+                # Check if normal string was detected
+                if len(text) > 0 and len(func_def) == 0:
+                    tokens.append((text, None))
+                # Check if function_definition was detected
+                elif len(text) == 0 and len(func_def) > 1:
+                    func_def_clean = func_def.replace("<<", "").replace(">>", "")
+                    func_name, func_args, func_kargs = _analyze_func_string(func_def_clean, None)
+                    # Unknown functions fail when the layout gets compiled, not for every rendered need
+                    if func_name not in self.functions:
+                        raise SphinxNeedLayoutException(
+                            "Used function {} unknown. Please use {}".format(
+                                func_name, ", ".join(self.functions.keys())
+                            )
+                        )
+                    tokens.append((None, (func_name, func_args, func_kargs, func_def_clean)))
+                else:
+                    raise SphinxNeedLayoutException(
+                        f"Error during layout line parsing. This looks strange: {(func_def, text)}"
+                    )
+            plan.append((PLAN_TEXT, tokens))
+        return plan
+
+    def _render_plan(self, plan: list) -> List[nodes.Node]:
+        """
+        Executes a plan of :meth:`_compile_line` for the current need.
+
+        Static elements get copied and function definitions get replaced with the related docutils nodes.
+
+        :param plan: compiled line plan
+        :return: docutils nodes
+        """
+        return_nodes = []
+        for step in plan:
+            if step[0] == PLAN_ELEMENT:
+                element = step[1].copy()
+                element += self._render_plan(step[2])
+                return_nodes.append(element)
+                continue
+
+            node_line = nodes.inline()
+            for text, func_call in step[1]:
+                if func_call is None:
+                    node_line += nodes.Text(text)
+                    continue
+
+                func_name, func_args, func_kargs, func_def_clean = func_call
+                result = self._call_func(func_name, list(func_args), dict(func_kargs), func_def_clean)
+                if result:
+                    node_line += result
+
+            return_nodes.append(node_line)
+        return return_nodes
+
     def _parse(self, line: str) -> List[nodes.Node]:
         """
         Parses a single line/string for inline rst statements, like strong, emphasis, literal, ...
@@ -362,103 +524,55 @@ class LayoutHandler:
         :param line: string to parse
         :return: nodes
         """
-        inline_parser = Inliner()
-        inline_parser.init_customizations(self.doc_settings)
-        result, message = inline_parser.parse(line, 0, self.doc_memo, self.dummy_doc)
+        result, message = self.parser_state.inliner.parse(line, 0, self.doc_memo, self.dummy_doc)
         if message:
             raise SphinxNeedLayoutException(message)
         return result
 
-    def _func_replace(self, section_nodes):
+    def _call_func(self, func_name: str, func_args: list, func_kargs: dict, func_def_clean: str):
         """
-        Replaces a function definition like ``<<meta(a, ,b)>>`` with the related docutils nodes.
-
-        It takes an already existing docutils-node-tree and searches for Text-nodes containing ``<<..>>``.
-        These nodes get then replaced by the return value (also a node) from the related function.
-
-        :param section_nodes: docutils node (tree)
-        :return: docutils nodes
+        Calls a layout function, after the place holders of its arguments got replaced by the need values.
         """
-        return_nodes = []
-        for node in section_nodes:
-            if not isinstance(node, nodes.Text):
-                for child in node.children:
-                    new_child = self._func_replace([child])
-                    node.replace(child, new_child)
-                return_nodes.append(node)
-            else:
-                node_str = str(node)
-                # func_elements = re.findall(r'<<([a-z_()]*)>>', node_str)
-                node_line = nodes.inline()
-
-                line_elements = re.findall(r"(<<[^<>]+>>)|([^<>]+)", node_str)
-
-                for line_element in line_elements:
-                    text = line_element[1]
-                    func_def = line_element[0]
-                    # Check if normal string was detected
-                    if len(text) > 0 and len(func_def) == 0:
-                        node_line += nodes.Text(text)
-                        result = nodes.Text(text)
-                    # Check if function_definition was detected
-                    elif len(text) == 0 and len(func_def) > 1:
-                        from opcuadomain.functions.functions import (
-                            _analyze_func_string,
-                        )
-
-                        func_def_clean = func_def.replace("<<", "").replace(">>", "")
-                        func_name, func_args, func_kargs = _analyze_func_string(func_def_clean, None)
-
-                        # Replace place holders
-                        # Looks for {{name}}, where name must be an option of need, and replaces it with the
-                        # related need content
-                        for index, arg in enumerate(func_args):
-                            # If argument is not a string, nothing to replace
-                            # (replacement in string-lists is not supported)
-                            if not isinstance(arg, str):
-                                continue
-                            try:
-                                func_args[index] = self._replace_place_holder(arg)
-                            except SphinxNeedLayoutException as e:
-                                raise SphinxNeedLayoutException(
-                                    'Referenced item "{}" in {} not available in need {}'.format(
-                                        e, func_def_clean, self.need["id"]
-                                    )
-                                )
-
-                        for key, karg in func_kargs.items():
-                            # If argument is not a string, nothing to replace
-                            # (replacement in string-lists is not supported)
-                            if not isinstance(karg, str):
-                                continue
-                            try:
-                                func_kargs[key] = self._replace_place_holder(karg)
-                            except SphinxNeedLayoutException as e:
-                                raise SphinxNeedLayoutException(
-                                    'Referenced item "{}" in {} not available in need {}'.format(
-                                        e, func_def_clean, self.need["id"]
-                                    )
-                                )
-
-                        try:
-                            func = self.functions[func_name]
-                        except KeyError:
-                            raise SphinxNeedLayoutException(
-                                "Used function {} unknown. Please use {}".format(
-                                    func_name, ", ".join(self.functions.keys())
-                                )
-                            )
-                        result = func(*func_args, **func_kargs)
+        # Replace place holders
+        # Looks for {{name}}, where name must be an option of need, and replaces it with the
+        # related need content
+        for index, arg in enumerate(func_args):
+            # If argument is not a string, nothing to replace
+            # (replacement in string-lists is not supported)
+            if not isinstance(arg, str):
+                continue
+            try:
+                func_args[index] = self._replace_place_holder(arg)
+            except SphinxNeedLayoutException as e:
+                raise SphinxNeedLayoutException(
+                    'Referenced item "{}" in {} not available in need {}'.format(
+                        e, func_def_clean, self.need["id"]
+                    )
+                )
 
-                        if result:
-                            node_line += result
-                    else:
-                        raise SphinxNeedLayoutException(
-                            f"Error during layout line parsing. This looks strange: {line_element}"
-                        )
+        for key, karg in func_kargs.items():
+            # If argument is not a string, nothing to replace
+            # (replacement in string-lists is not supported)
+            if not isinstance(karg, str):
+                continue
+            try:
+                func_kargs[key] = self._replace_place_holder(karg)
+            except SphinxNeedLayoutException as e:
+                raise SphinxNeedLayoutException(
+                    'Referenced item "{}" in {} not available in need {}'.format(
+                        e, func_def_clean, self.need["id"]
+                    )
+                )
 
-                return_nodes.append(node_line)
-        return return_nodes
+        try:
+            func = self.functions[func_name]
+        except KeyError:
+            raise SphinxNeedLayoutException(
+                "Used function {} unknown. Please use {}".format(
+                    func_name, ", ".join(self.functions.keys())
+                )
+            )
+        return func(*func_args, **func_kargs)
 
     def _replace_place_holder(self, data):
         replace_items = re.findall(r"{{(.*)}}", data)
@@ -471,6 +585,7 @@ class LayoutHandler:
             data = data.replace(replace_string, self.need[item])
         return data
 
+    @measure_time("layout_function")
     def meta(self, name: str, prefix: Optional[str] = None, show_empty: bool = False):
         """
         Returns the specific metadata of a need inside docutils nodes.
@@ -506,18 +621,11 @@ class LayoutHandler:
             # data_node = nodes.inline(classes=["needs_data"])
             # data_node.append(nodes.Text(data)
             # data_container.append(data_node)
-            needs_string_links_option: List[str] = []
-            for v in self.app.config.needs_string_links.values():
-                needs_string_links_option.extend(v["options"])
-
-            if name in needs_string_links_option:
+            if name in self.string_link_registry.options:
                 data = re.split(r",|;", data)
                 data = [i.strip() for i in data if len(i) != 0]
 
-            matching_link_confs = []
-            for link_conf in self.string_links.values():
-                if name in link_conf["options"]:
-                    matching_link_confs.append(link_conf)
+            matching_link_confs = self.string_link_registry.get(name)
 
             data_node = nodes.inline(classes=["needs_data"])
             for index, datum in enumerate(data):
@@ -558,6 +666,7 @@ class LayoutHandler:
 
         return data_container
 
+    @measure_time("layout_function")
     def meta_id(self):
         """
         Returns the current need id as clickable and linked reference.
@@ -585,6 +694,7 @@ class LayoutHandler:
         id_container += id_ref
         return id_container
 
+    @measure_time("layout_function")
     def meta_all(
         self,
         prefix: str = "",
@@ -655,6 +765,7 @@ class LayoutHandler:
 
         return data_container
 
+    @measure_time("layout_function")
     def meta_links(self, name: str, incoming: bool = False):
         """
         Documents the set links of a given link type.
@@ -684,6 +795,7 @@ class LayoutHandler:
         data_container.append(node_links)
         return data_container
 
+    @measure_time("layout_function")
     def meta_links_all(self, prefix: str = "", postfix: str = "", exclude=None):
         """
         Documents all used link types for the current need automatically.
@@ -738,18 +850,11 @@ class LayoutHandler:
             # data_node = nodes.inline(classes=["needs_data"])
             # data_node.append(nodes.Text(data)
             # data_container.append(data_node)
-            needs_string_links_option: List[str] = []
-            for v in self.app.config.needs_string_links.values():
-                needs_string_links_option.extend(v["options"])
-
-            if name in needs_string_links_option:
+            if name in self.string_link_registry.options:
                 data = re.split(r",|;", data)
                 data = [i.strip() for i in data if len(i) != 0]
 
-            matching_link_confs = []
-            for link_conf in self.string_links.values():
-                if name in link_conf["options"]:
-                    matching_link_confs.append(link_conf)
+            matching_link_confs = self.string_link_registry.get(name)
 
             data_node = nodes.inline(classes=["needs_data"])
             for index, datum in enumerate(data):
@@ -822,18 +927,11 @@ class LayoutHandler:
             # data_node = nodes.inline(classes=["needs_data"])
             # data_node.append(nodes.Text(data)
             # data_container.append(data_node)
-            needs_string_links_option: List[str] = []
-            for v in self.app.config.needs_string_links.values():
-                needs_string_links_option.extend(v["options"])
-
-            if name in needs_string_links_option:
+            if name in self.string_link_registry.options:
                 data = re.split(r",|;", data)
                 data = [i.strip() for i in data if len(i) != 0]
 
-            matching_link_confs = []
-            for link_conf in self.string_links.values():
-                if name in link_conf["options"]:
-                    matching_link_confs.append(link_conf)
+            matching_link_confs = self.string_link_registry.get(name)
 
             data_node = nodes.entry(classes=["needs_data"])
             for index, datum in enumerate(data):
@@ -857,6 +955,7 @@ class LayoutHandler:
 
         return row
     
+    @measure_time("layout_function")
     def ua_attributes(
         self,
         prefix: str = "",
@@ -916,6 +1015,7 @@ class LayoutHandler:
 
         return [attr_table]
     
+    @measure_time("layout_function")
     def ua_additional_attributes(
         self,
         prefix: str = "",
@@ -996,6 +1096,7 @@ class LayoutHandler:
 
         return row
     
+    @measure_time("layout_function")
     def ua_hierarchical_references(
         self,
         prefix: str = "",
@@ -1048,6 +1149,7 @@ class LayoutHandler:
 
         return [ref_table]
 
+    @measure_time("layout_function")
     def ua_non_hierarchical_references(
         self,
         prefix: str = "",
@@ -1097,6 +1199,7 @@ class LayoutHandler:
 
         return [ref_table]
 
+    @measure_time("layout_function")
     def image(
         self,
         url,
@@ -1236,6 +1339,7 @@ class LayoutHandler:
         data_container.append(image_node)
         return data_container
 
+    @measure_time("layout_function")
     def link(
         self,
         url: str,
@@ -1289,6 +1393,7 @@ class LayoutHandler:
 
         return data_container
 
+    @measure_time("layout_function")
     def collapse_button(
         self, target: str = "meta", collapsed: str = "Show", visible: str = "Close", initial: bool = False
     ) -> Optional[nodes.inline]:
@@ -1351,6 +1456,7 @@ class LayoutHandler:
 
         return coll_container
 
+    @measure_time("layout_function")
     def permalink(
         self,
         image_url: Optional[str] = None,
@@ -0,0 +1,232 @@
+"""
+Streaming loader for nodeset files.
+
+In contrast to asyncua's ``XMLParser``, the file is not loaded as complete DOM.
+It gets read with ``iterparse``, each node is converted as soon as its element is complete and the
+processed element gets cleared afterwards. So the peak memory is bound by the size of a single node
+instead of the size of the file.
+
+Nodes are emitted as compact :class:`~opcuadomain.records.UANodeRecord` objects. The elements are
+converted by :func:`parse_node`, which follows the rules of asyncua's ``XMLParser``, but does not
+depend on its private methods and skips the parsing of values, as records don't keep them.
+"""
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from opcuadomain.logging import get_logger
+from opcuadomain.records import UANodeRecord, UAReference, intern_str
+
+logger = get_logger(__name__)
+
+# These top level tags don't contain nodes
+NON_NODE_TAGS = ("Aliases", "NamespaceUris", "Extensions", "Models")
+
+_retag = re.compile(r"(\{.*\})?(.*)")
+
+# Values of boolean attributes, which count as true, like asyncua's ``string_to_val``
+TRUE_VALUES = ("True", "true", "on", "On", "1")
+
+
+def _local_tag(elem: ET.Element) -> str:
+    return _retag.match(elem.tag).group(2)
+
+
+def _to_bool(value: str) -> bool:
+    return value in TRUE_VALUES
+
+
+def parse_node(nodetype: str, elem: ET.Element) -> UANodeRecord:
+    """
+    Converts a node element of a nodeset into a record.
+
+    The attributes get the same values as the ones of the ``NodeData`` created by asyncua's ``XMLParser``,
+    only the value of variables is not parsed, just its type is stored as ``valuetype``.
+
+    :param nodetype: tag of the element without namespace, like ``UAVariable``
+    :param elem: the complete node element
+    """
+    record = UANodeRecord.__new__(UANodeRecord)
+    record.nodetype = intern_str(nodetype)
+    attrib = elem.attrib
+    record.nodeid = intern_str(attrib.get("NodeId"))
+    record.browsename = intern_str(attrib.get("BrowseName"))
+    record.displayname = record.browsename
+    record.symname = attrib.get("SymbolicName")
+    record.parent = intern_str(attrib.get("ParentNodeId"))
+    record.parentlink = None
+    record.desc = ""
+    record.typedef = None
+    record.refs = []
+    record.eventnotifier = int(attrib["EventNotifier"]) if "EventNotifier" in attrib else 0
+    record.datatype = intern_str(attrib.get("DataType"))
+    record.rank = int(attrib["ValueRank"]) if "ValueRank" in attrib else -1
+    record.valuetype = None
+    record.dimensions = [int(i) for i in attrib["ArrayDimensions"].split(",")] if "ArrayDimensions" in attrib else None
+    record.accesslevel = int(attrib["AccessLevel"]) if "AccessLevel" in attrib else None
+    record.useraccesslevel = int(attrib["UserAccessLevel"]) if "UserAccessLevel" in attrib else None
+    record.minsample = float(attrib["MinimumSamplingInterval"]) if "MinimumSamplingInterval" in attrib else None
+    record.historizing = _to_bool(attrib["Historizing"]) if "Historizing" in attrib else False
+    record.inversename = ""
+    record.abstract = _to_bool(attrib["IsAbstract"]) if "IsAbstract" in attrib else False
+    record.symmetric = _to_bool(attrib["Symmetric"]) if "Symmetric" in attrib else False
+    record.definitions = []
+    record.struct_type = ""
+
+    for child in elem:
+        tag = _local_tag(child)
+        if tag == "DisplayName":
+            record.displayname = child.text
+        elif tag == "Description":
+            record.desc = child.text
+        elif tag == "References":
+            _parse_refs(child, record)
+        elif tag == "Value":
+            value_elem = child.find(".//")  # should be only one child
+            if value_elem is not None and value_elem.text is not None:
+                record.valuetype = intern_str(_local_tag(value_elem))
+            else:
+                record.valuetype = "Null"
+        elif tag == "InverseName":
+            record.inversename = child.text
+        elif tag == "Definition":
+            if child.attrib.get("IsUnion", False):
+                record.struct_type = "IsUnion"
+            elif child.attrib.get("IsOptional", False):
+                record.struct_type = "IsOptional"
+            record.definitions = [_parse_field(field) for field in child]
+    return record
+
+
+def _parse_field(elem: ET.Element) -> Tuple[object, ...]:
+    """Returns a field of a data type definition as ``(Name, DataType, ValueRank, Value, Description)``."""
+    desc = elem.get("Description", "")
+    for child in elem:
+        if _local_tag(child) == "Description":
+            desc = child.text
+    return (
+        elem.get("Name"),
+        intern_str(elem.get("DataType", "i=24")),  # Default is BaseDataType
+        int(elem.get("ValueRank", -1)),
+        int(elem.get("Value", 0)),
+        desc,
+    )
+
+
+def _parse_refs(elem: ET.Element, record: UANodeRecord) -> None:
+    """
+    Adds the references of a node. Type definition and parent are taken from the references, the parent
+    only if it is not given by the ``ParentNodeId`` attribute.
+    """
+    parent, parentlink = record.parent, None
+
+    for ref in elem:
+        forward = ref.attrib.get("IsForward") not in ("false", "False")
+        reftype = intern_str(ref.attrib["ReferenceType"])
+        target = intern_str(ref.text)
+        record.refs.append(UAReference(reftype, forward, target))
+
+        if reftype == "HasTypeDefinition":
+            record.typedef = target
+        elif not forward:
+            parent, parentlink = target, reftype
+            if record.parent == parent or record.parent != parent and not record.parentlink:
+                record.parentlink = parentlink
+
+    if record.parent and not record.parentlink:
+        # A simple parent attribute without an inverse reference
+        record.parentlink = "HasComponent"
+    if not record.parent:
+        record.parent, record.parentlink = parent, parentlink
+    if not record.parent:
+        logger.debug(f"Could not find parent for node {record.nodeid}")
+
+
+class NodesetReader:
+    """
+    Reads a nodeset file node by node.
+
+    Iterating over the reader yields the nodes, aliases and namespaces get collected on the way.
+    The results of :meth:`get_node_datas`, :meth:`get_aliases` and :meth:`get_used_namespaces` are
+    the same as the ones of the related ``XMLParser`` methods, only the nodes are returned as
+    ``UANodeRecord`` without their value payload.
+
+    Usage::
+
+        reader = NodesetReader(path)
+        store = UANodeStore(reader)
+        aliases = reader.get_aliases()
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.namespaces: List[str] = []
+        self.aliases: Dict[str, str] = {}
+
+    def __iter__(self) -> Iterator[UANodeRecord]:
+        depth = 0
+        root = None
+        for event, elem in ET.iterparse(self.path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                # Children of nodes are handled together with their node element
+                continue
+
+            tag = _local_tag(elem)
+            if tag == "NamespaceUris":
+                self.namespaces = [intern_str(ns_element.text) for ns_element in elem]
+            elif tag == "Aliases":
+                for alias in elem:
+                    self.aliases[intern_str(alias.attrib["Alias"])] = intern_str(alias.text)
+            elif tag not in NON_NODE_TAGS:
+                yield parse_node(tag, elem)
+
+            # Drop the processed element, so that the tree never grows
+            elem.clear()
+            root.clear()
+
+    def get_node_datas(self) -> List[UANodeRecord]:
+        return list(self)
+
+    def get_aliases(self) -> Dict[str, str]:
+        return self.aliases
+
+    def get_used_namespaces(self) -> List[str]:
+        return self.namespaces
+
+
+def read_nodeset(path: str) -> Tuple[List[str], Dict[str, str], List[UANodeRecord]]:
+    """Reads the given nodeset and returns its namespaces, aliases and nodes."""
+    reader = NodesetReader(path)
+    ua_nodes = reader.get_node_datas()
+    return reader.get_used_namespaces(), reader.get_aliases(), ua_nodes
+
+
+def read_nodesets(
+    paths: List[str], max_workers: Optional[int] = None
+) -> List[Tuple[List[str], Dict[str, str], List[UANodeRecord]]]:
+    """
+    Reads several independent nodesets.
+
+    If more than one nodeset is given, they get parsed concurrently in a process pool.
+    The result list has the same order as ``paths``.
+
+    :param paths: list of nodeset files
+    :param max_workers: maximum amount of worker processes. ``None`` or ``0`` uses the cpu count,
+                        ``1`` disables the process pool.
+    :return: list of namespaces, aliases and nodes per nodeset
+    """
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [read_nodeset(path) for path in paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_nodeset, paths))
@@ -0,0 +1,421 @@
+"""
+Indexed storage of the imported OPC UA node model.
+
+The store is built once per import and keeps hash indices for all lookups done by the
+``OpcuaDomain``, so finding a node does not need a walk over the complete nodeset.
+
+Several nodesets can be merged into one store. Their namespace indices get translated into the
+namespace array of the merged model on the way.
+"""
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from opcuadomain.records import UANodeRecord
+from opcuadomain.sidecar import read_sidecar, sidecar_matches, write_sidecar
+from opcuadomain.snapshot import UASnapshot
+
+CORE_NAMESPACE = "http://opcfoundation.org/UA/"
+
+_nodeid_ns_pattern = re.compile(r"ns=(\d+);")
+_browsename_ns_pattern = re.compile(r"(\d+):")
+
+
+def nodeid_namespace(node_id: str) -> int:
+    """Returns the namespace index of a NodeId, ``0`` if it has no ``ns=`` prefix."""
+    m = _nodeid_ns_pattern.match(node_id)
+    return int(m.group(1)) if m else 0
+
+
+def find_namespace_index(namespaces: List[str], namespace: Union[str, int]) -> Optional[int]:
+    """
+    Returns the index of a namespace given as uri or index.
+
+    :param namespaces: namespace uris of the merged model without the core namespace
+    :param namespace: namespace uri or index
+    :return: namespace index or ``None``, if the namespace is unknown
+    """
+    if isinstance(namespace, int):
+        return namespace
+    if namespace.isdigit():
+        return int(namespace)
+    if namespace == CORE_NAMESPACE:
+        return 0
+    if namespace in namespaces:
+        return namespaces.index(namespace) + 1
+    return None
+
+
+def build_namespace_table(namespaces: List[str], local_namespaces: List[str]) -> Dict[int, int]:
+    """
+    Builds the translation table from the namespace indices of a single nodeset to the ones of the
+    merged model.
+
+    ``namespaces`` is the namespace array of the merged model without the core namespace, which has
+    always index 0. Unknown uris of ``local_namespaces`` get appended to it.
+
+    :param namespaces: namespace uris of the merged model, gets extended
+    :param local_namespaces: namespace uris of the nodeset, as given in its ``NamespaceUris``
+    :return: dict of local namespace index -> merged namespace index
+    """
+    table = {0: 0}
+    for local_index, uri in enumerate(local_namespaces, start=1):
+        if uri == CORE_NAMESPACE:
+            table[local_index] = 0
+            continue
+        if uri not in namespaces:
+            namespaces.append(uri)
+        table[local_index] = namespaces.index(uri) + 1
+    return table
+
+
+class NamespaceRemapper:
+    """
+    Translates NodeIds and BrowseNames of a nodeset with a table from :func:`build_namespace_table`.
+    """
+
+    def __init__(self, table: Dict[int, int]) -> None:
+        self.table = table
+        self.identity = all(local_index == index for local_index, index in table.items())
+
+    def _translate(self, value, pattern: re.Pattern, template: str):
+        if self.identity or not isinstance(value, str):
+            return value
+        m = pattern.match(value)
+        if m is None:
+            return value
+        local_index = int(m.group(1))
+        index = self.table.get(local_index, local_index)
+        if index == local_index:
+            return value
+        return template.format(index) + value[m.end():]
+
+    def nodeid(self, value: Optional[str]) -> Optional[str]:
+        return self._translate(value, _nodeid_ns_pattern, "ns={};")
+
+    def browsename(self, value: Optional[str]) -> Optional[str]:
+        return self._translate(value, _browsename_ns_pattern, "{}:")
+
+    def node(self, ua_node: UANodeRecord) -> UANodeRecord:
+        """Translates all NodeIds and the BrowseName of the given node in place."""
+        if self.identity:
+            return ua_node
+        ua_node.nodeid = self.nodeid(ua_node.nodeid)
+        ua_node.browsename = self.browsename(ua_node.browsename)
+        ua_node.parent = self.nodeid(ua_node.parent)
+        ua_node.parentlink = self.nodeid(ua_node.parentlink)
+        ua_node.typedef = self.nodeid(ua_node.typedef)
+        ua_node.datatype = self.nodeid(ua_node.datatype)
+        for ref in ua_node.refs:
+            ref.reftype = self.nodeid(ref.reftype)
+            ref.target = self.nodeid(ref.target)
+        return ua_node
+
+
+class UANodeStore:
+    """
+    Holds the imported nodes together with their lookup indices.
+
+    Indices:
+
+    * ``by_id``: NodeId -> node
+    * ``by_name``: (BrowseName, NodeClass) -> node
+    * ``by_parent``: parent NodeId -> list of child nodes
+    * ``by_target``: target NodeId -> list of ``(source NodeId, ReferenceType, IsForward)`` of all
+      references pointing to the target
+
+    If a key exists several times, the first imported node wins, as it was the case for the
+    former linear search.
+
+    Nodes can be grouped by a source (normally the path of the imported nodeset), so that the nodes
+    of a nodeset can be replaced by a later import of the same nodeset.
+
+    ``derived`` can be used to store data calculated from the complete model, like reference
+    summaries. It gets cleared on each change of the model and is not pickled.
+
+    After :meth:`persist`, the nodes and indices get written into a sidecar file instead of being
+    pickled with the environment. An unpickled store reads them on the first access.
+
+    A source can also be a memory-mapped :class:`~opcuadomain.snapshot.UASnapshot`, see
+    :meth:`add_snapshot`. Its nodes are not copied into the store, lookups fall through to the
+    snapshot indices. Nodes held by the store itself take precedence over the ones of snapshots.
+    """
+
+    # Attributes, which are stored in the sidecar file
+    persisted_attributes = ("nodes", "sources", "snapshots", "by_id", "by_name", "by_parent", "by_target")
+
+    def __init__(self, ua_nodes: Optional[Iterable[UANodeRecord]] = None) -> None:
+        self.nodes: List[UANodeRecord] = []
+        self.sources: Dict[str, List[UANodeRecord]] = {}
+        self.snapshots: Dict[str, UASnapshot] = {}
+        self.derived: Dict[str, Any] = {}
+        self.sidecar_path: Optional[str] = None
+        self.sidecar_token: Optional[str] = None
+        self.dirty = True
+        self._clear_indices()
+
+        if ua_nodes is not None:
+            self.extend(ua_nodes)
+
+    def _clear_indices(self) -> None:
+        self.by_id: Dict[str, UANodeRecord] = {}
+        self.by_name: Dict[Tuple[str, str], UANodeRecord] = {}
+        self.by_parent: Dict[str, List[UANodeRecord]] = {}
+        self.by_target: Dict[str, List[Tuple[str, str, bool]]] = {}
+
+    def add(self, ua_node: UANodeRecord) -> None:
+        """Adds a single node and registers it in all indices."""
+        self.derived.clear()
+        self.dirty = True
+        self.nodes.append(ua_node)
+        self.by_id.setdefault(ua_node.nodeid, ua_node)
+        self.by_name.setdefault((ua_node.browsename, ua_node.nodetype), ua_node)
+        if ua_node.parent:
+            self.by_parent.setdefault(ua_node.parent, []).append(ua_node)
+        for ref in ua_node.refs:
+            self.by_target.setdefault(ref.target, []).append((ua_node.nodeid, ref.reftype, ref.forward))
+
+    def extend(self, ua_nodes: Iterable[UANodeRecord]) -> None:
+        for ua_node in ua_nodes:
+            self.add(ua_node)
+
+    def add_source(self, source: str, ua_nodes: Iterable[UANodeRecord]) -> None:
+        """Adds the nodes of a nodeset. Already existing nodes of the same source get replaced."""
+        self.derived.clear()
+        if self.has_source(source):
+            self.remove_source(source)
+        source_nodes = list(ua_nodes)
+        self.sources[source] = source_nodes
+        self.extend(source_nodes)
+
+    def add_snapshot(self, source: str, snapshot: UASnapshot) -> None:
+        """Adds a snapshot as source. An already existing source with the same name gets replaced."""
+        if self.has_source(source):
+            self.remove_source(source)
+        self.derived.clear()
+        self.dirty = True
+        self.snapshots[source] = snapshot
+
+    def add_remapped(
+        self, source: str, ua_nodes: Union[UASnapshot, Iterable[UANodeRecord]], remapper: NamespaceRemapper
+    ) -> None:
+        """
+        Adds the nodes of a nodeset, translated by ``remapper``.
+
+        Snapshots stay memory-mapped, if their namespace indices do not need a translation.
+        Otherwise their nodes get copied into the store.
+        """
+        if isinstance(ua_nodes, UASnapshot):
+            if remapper.identity:
+                self.add_snapshot(source, ua_nodes)
+                return
+            ua_nodes = ua_nodes.records()
+        self.add_source(source, (remapper.node(ua_node) for ua_node in ua_nodes))
+
+    def has_source(self, source: str) -> bool:
+        """Returns True, if nodes of the given source are part of the store."""
+        return source in self.sources or source in self.snapshots
+
+    def source_nodes(self, source: str) -> Iterable[UANodeRecord]:
+        """Returns the nodes of the given source, an empty list for unknown sources."""
+        if source in self.snapshots:
+            return self.snapshots[source]
+        return self.sources.get(source, [])
+
+    def remove_source(self, source: str) -> None:
+        """Removes all nodes of the given source and rebuilds the indices."""
+        snapshot = self.snapshots.pop(source, None)
+        if snapshot is not None:
+            snapshot.close()
+            self.derived.clear()
+            self.dirty = True
+            return
+
+        source_nodes = self.sources.pop(source, None)
+        if not source_nodes:
+            return
+        removed = {id(ua_node) for ua_node in source_nodes}
+        remaining = [ua_node for ua_node in self.nodes if id(ua_node) not in removed]
+        self.nodes = []
+        self.derived.clear()
+        self.dirty = True
+        self._clear_indices()
+        self.extend(remaining)
+
+    def get(self, node_id: str) -> Optional[UANodeRecord]:
+        """Returns the node with the given NodeId or ``None``."""
+        ua_node = self.by_id.get(node_id)
+        if ua_node is None:
+            for snapshot in self.snapshots.values():
+                ua_node = snapshot.get(node_id)
+                if ua_node is not None:
+                    break
+        return ua_node
+
+    def find(self, browse_name: str, node_type: str) -> Optional[UANodeRecord]:
+        """Returns the node with the given BrowseName and NodeClass or ``None``."""
+        ua_node = self.by_name.get((browse_name, node_type))
+        if ua_node is None:
+            for snapshot in self.snapshots.values():
+                ua_node = snapshot.find(browse_name, node_type)
+                if ua_node is not None:
+                    break
+        return ua_node
+
+    def children(self, parent_id: str) -> List[UANodeRecord]:
+        """Returns all nodes, which have ``parent_id`` set as parent."""
+        result = list(self.by_parent.get(parent_id, ()))
+        for snapshot in self.snapshots.values():
+            result += snapshot.children(parent_id)
+        return result
+
+    def references_to(self, target_id: str) -> List[Tuple[str, str, bool]]:
+        """
+        Returns all references pointing to ``target_id`` as ``(source NodeId, ReferenceType, IsForward)``.
+        """
+        result = list(self.by_target.get(target_id, ()))
+        for snapshot in self.snapshots.values():
+            result += snapshot.references_to(target_id)
+        return result
+
+    def select(
+        self,
+        namespace_index: Optional[int] = None,
+        node_classes: Optional[Iterable[str]] = None,
+        root_id: Optional[str] = None,
+        sources: Optional[Sequence[str]] = None,
+    ) -> Iterator[UANodeRecord]:
+        """
+        Yields all nodes matching the given filters in a single pass over the model.
+
+        :param namespace_index: If given, only nodes of this namespace are yielded
+        :param node_classes: If given, only nodes of these NodeClasses are yielded
+        :param root_id: If given, only the node itself and all its descendants are yielded, parents first
+        :param sources: If given, only nodes of these sources are yielded, source by source in the given
+                        order. A NodeId found in several of them is yielded for its first source only.
+                        A subtree gets walked along the nodes of these sources only.
+        """
+        node_classes = set(node_classes) if node_classes else None
+
+        def matches(node_id: str, node_type: str) -> bool:
+            if node_classes is not None and node_type not in node_classes:
+                return False
+            return namespace_index is None or nodeid_namespace(node_id) == namespace_index
+
+        if sources is not None:
+            yield from self._select_sources(sources, matches, root_id)
+            return
+
+        if root_id is not None:
+            for ua_node in self._walk(root_id):
+                if matches(ua_node.nodeid, ua_node.nodetype):
+                    yield ua_node
+            return
+
+        for ua_node in self.by_id.values():
+            if matches(ua_node.nodeid, ua_node.nodetype):
+                yield ua_node
+
+        # Snapshot nodes are filtered before they get built
+        snapshots = list(self.snapshots.values())
+        for position, snapshot in enumerate(snapshots):
+            for index, node_id, node_type in snapshot.scan():
+                if not matches(node_id, node_type) or node_id in self.by_id:
+                    continue
+                if any(other.index_of(node_id) is not None for other in snapshots[:position]):
+                    continue
+                yield snapshot.node(index)
+
+    def _select_sources(
+        self, sources: Sequence[str], matches: Callable[[str, str], bool], root_id: Optional[str]
+    ) -> Iterator[UANodeRecord]:
+        if root_id is not None:
+            members: Set[str] = set()
+            for source in sources:
+                if source in self.snapshots:
+                    members.update(node_id for _index, node_id, _node_type in self.snapshots[source].scan())
+                else:
+                    members.update(ua_node.nodeid for ua_node in self.sources.get(source, ()))
+            for ua_node in self._walk(root_id, members):
+                if matches(ua_node.nodeid, ua_node.nodetype):
+                    yield ua_node
+            return
+
+        seen: Set[str] = set()
+        for source in sources:
+            snapshot = self.snapshots.get(source)
+            if snapshot is not None:
+                # Snapshot nodes are filtered before they get built
+                for index, node_id, node_type in snapshot.scan():
+                    if node_id not in seen and matches(node_id, node_type):
+                        seen.add(node_id)
+                        yield snapshot.node(index)
+                continue
+            for ua_node in self.sources.get(source, ()):
+                if ua_node.nodeid not in seen and matches(ua_node.nodeid, ua_node.nodetype):
+                    seen.add(ua_node.nodeid)
+                    yield ua_node
+
+    def _walk(self, root_id: str, members: Optional[Set[str]] = None) -> Iterator[UANodeRecord]:
+        root = self.get(root_id)
+        if root is None or (members is not None and root_id not in members):
+            return
+        seen = {root_id}
+        pending = deque([root])
+        while pending:
+            ua_node = pending.popleft()
+            yield ua_node
+            for child in self.children(ua_node.nodeid):
+                if members is not None and child.nodeid not in members:
+                    continue
+                if child.nodeid not in seen:
+                    seen.add(child.nodeid)
+                    pending.append(child)
+
+    def persist(self, path: str) -> None:
+        """Writes the nodes and indices into the sidecar file ``path``, if the model was changed."""
+        if not self.dirty and self.sidecar_path == path:
+            return
+        self.sidecar_token = write_sidecar(path, {name: getattr(self, name) for name in self.persisted_attributes})
+        self.sidecar_path = path
+        self.dirty = False
+
+    def sidecar_valid(self) -> bool:
+        """Checks if the model is loaded or can be read from the sidecar file."""
+        if "nodes" in self.__dict__ or not self.sidecar_path:
+            return True
+        return sidecar_matches(self.sidecar_path, self.sidecar_token)
+
+    def _load(self) -> None:
+        data = read_sidecar(self.sidecar_path, self.sidecar_token)
+        self.__dict__.update(data)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for missing attributes, so for persisted ones of a store not loaded yet
+        if name in UANodeStore.persisted_attributes and self.__dict__.get("sidecar_path"):
+            self._load()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["derived"] = {}
+        if not self.dirty and self.sidecar_path:
+            for name in self.persisted_attributes:
+                state.pop(name, None)
+        else:
+            # Not persisted, e.g. the store of a parallel reader, so the complete model gets pickled
+            for name in self.persisted_attributes:
+                state[name] = getattr(self, name)
+            state["sidecar_path"] = None
+            state["sidecar_token"] = None
+            state["dirty"] = True
+        return state
+
+    def __iter__(self) -> Iterator[UANodeRecord]:
+        yield from self.nodes
+        for snapshot in self.snapshots.values():
+            yield from snapshot
+
+    def __len__(self) -> int:
+        return len(self.nodes) + sum(len(snapshot) for snapshot in self.snapshots.values())
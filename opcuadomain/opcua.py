@@ -1,20 +1,41 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 
+import copy
+import os
 import re
 
 from sphinx.application import Sphinx
 
-from sphinx.domains import Domain, Index
+from sphinx.domains import Domain, Index, ObjType
 from sphinx.roles import XRefRole
 from sphinx.util.nodes import make_refnode
 from sphinx.environment import BuildEnvironment
 
+from opcuadomain.browse import is_server_url
+from opcuadomain.cache import file_hash
+from opcuadomain.debug import (
+    init_measurements,
+    measure_time,
+    process_timing,
+    process_trace,
+    trace_builder_inited,
+    trace_consistency,
+    trace_doctree_read,
+    trace_env_check_consistency,
+    trace_env_updated,
+    trace_source_read,
+)
 from opcuadomain.logging import get_logger
 
 from opcuadomain.defaults import LAYOUTS
+from opcuadomain.nodestore import NamespaceRemapper, UANodeStore, build_namespace_table, find_namespace_index
+from opcuadomain.records import UAReference
+from opcuadomain.resolver import NameResolver
+from opcuadomain.sidecar import SidecarMapping
 
 
-from directives.uaimport import UAImportDirective
+from directives.uaimport import UAImportDirective, find_outdated_docs, preload_nodesets
+from opcuadomain.directives.uaautodoc import UAAutodocDirective, generate_autodoc_pages
 from opcuadomain.directives.uanode import UANodeDirective
 
 from directives.uavariable import UAVariableDirective
@@ -27,17 +48,48 @@ from asyncua.ua.object_ids import ObjectIds, ObjectIdNames
 
 from uanode import process_ua_nodes
 
+logger = get_logger(__name__)
+
+HIERARCHICAL_REF_COLUMNS = (
+    'Forward', 'ReferenceType', 'TargetId', 'NodeClass', 'Name', 'TypeDefinition', 'ModellingRule', 'DataType'
+)
+NON_HIERARCHICAL_REF_COLUMNS = ('Forward', 'ReferenceType', 'Target', 'Target NodeId')
+
+modelling_rule_pattern = re.compile(r'ModellingRule_(.+)')
+
+# role -> NodeClasses, which can be referenced by the role. ``None`` allows all NodeClasses.
+ROLE_NODE_CLASSES = {
+    'ref': None,
+    'var': ('UAVariable',),
+    'obj': ('UAObject',),
+    'type': ('UAObjectType', 'UAVariableType', 'UADataType', 'UAReferenceType'),
+    'method': ('UAMethod',),
+}
+
+
 class OpcuaDomain(Domain):
 
     name = 'opcua'
     label = 'OPC UA Sample'
-
-    roles = {
-        'ref': XRefRole(),
+    # Increase, if the structure of the domain data changes
+    data_version = 5
+
+    object_types = {
+        'UAVariable': ObjType('variable', 'var', 'ref'),
+        'UAObject': ObjType('object', 'obj', 'ref'),
+        'UAObjectType': ObjType('object type', 'type', 'ref'),
+        'UAVariableType': ObjType('variable type', 'type', 'ref'),
+        'UADataType': ObjType('data type', 'type', 'ref'),
+        'UAReferenceType': ObjType('reference type', 'type', 'ref'),
+        'UAMethod': ObjType('method', 'method', 'ref'),
+        'UAView': ObjType('view', 'ref'),
     }
+    roles = {role: XRefRole() for role in ROLE_NODE_CLASSES}
     directives = {
         'uanode': UANodeDirective,
         'uaimport': UAImportDirective,
+        'uaautodoc': UAAutodocDirective,
+        'uanamespace': UAAutodocDirective,
 
     }
     #indices = {
@@ -45,33 +97,138 @@ class OpcuaDomain(Domain):
     #}
     initial_data = {
         'UANamespaces': [],  # name -> object
-        'UAAliases': [],  # object list
-        'UANodes': [],  # name -> object
+        'UAAliases': {},  # alias -> NodeId
+        'UANodes': UANodeStore(),  # indexed node model
+        'UAImports': {},  # nodeset source -> list of importing docnames
+        'UAPreloaded': set(),  # nodeset sources imported before reading, not owned by a document yet
+        'UAObjects': {},  # NodeId -> (docname, anchor) of documented nodes
+        'UADependencies': {},  # docname -> set of NodeIds, which are rendered by the document
+        'UASources': {},  # nodeset source -> (mtime, file hash), server url -> (None, snapshot token)
+        'UASourceNamespaces': {},  # nodeset source -> namespace uris of the nodeset itself
+        'UAAutodoc': {},  # state of the autodoc directives and the generated page docnames
     }
 
     def get_full_qualified_name(self, node):
         return f'UAVariable.{node.arguments[0]}'
 
     def get_objects(self):
-        for uanode in self.data['UANodes']:
-            yield (uanode.browsename, uanode.displayname, uanode.nodetype, "", uanode.nodeid, 0)
+        for docname, anchor, browsename, displayname, nodetype in self.data['UAObjects'].values():
+            yield (browsename, displayname, nodetype, docname, anchor, 1)
+
+    def clear_doc(self, docname):
+        for node_id, obj in list(self.data['UAObjects'].items()):
+            if obj[0] == docname:
+                del self.data['UAObjects'][node_id]
+                self.data['UANodes'].derived.pop('xref_targets', None)
+
+        self.data['UADependencies'].pop(docname, None)
+
+        for source, docnames in list(self.data['UAImports'].items()):
+            if docname in docnames:
+                docnames.remove(docname)
+                # Preloaded nodesets are still needed by the documents, which are going to be read
+                if not docnames and source not in self.data['UAPreloaded']:
+                    self._remove_nodeset(source)
+
+    def check_consistency(self):
+        # Sphinx has no event before its consistency checks, the ones of the domains come first
+        trace_consistency(self.env.app)
+
+    def merge_domaindata(self, docnames, otherdata):
+        for node_id, obj in otherdata['UAObjects'].items():
+            if obj[0] in docnames:
+                self.data['UAObjects'][node_id] = obj
+                self.data['UANodes'].derived.pop('xref_targets', None)
+
+        for docname, node_ids in otherdata['UADependencies'].items():
+            if docname in docnames:
+                self.data['UADependencies'].setdefault(docname, set()).update(node_ids)
+
+        remapper = None
+        other_nodes = otherdata['UANodes']
+        for source, source_docnames in otherdata['UAImports'].items():
+            merged_docnames = [docname for docname in source_docnames if docname in docnames]
+            if not merged_docnames:
+                continue
+
+            if not self.data['UANodes'].has_source(source) and other_nodes.has_source(source):
+                # The nodeset was imported by the parallel reader only, so its namespace indices are
+                # the ones of the reader's model
+                if remapper is None:
+                    remapper = NamespaceRemapper(
+                        build_namespace_table(self.data['UANamespaces'], otherdata['UANamespaces'])
+                    )
+                for alias, target in otherdata['UAAliases'].items():
+                    self.data['UAAliases'].setdefault(alias, remapper.nodeid(target))
+                self.data['UANodes'].add_remapped(
+                    source, other_nodes.snapshots.get(source) or other_nodes.sources[source], remapper
+                )
+                if source in otherdata['UASources']:
+                    self.data['UASources'][source] = otherdata['UASources'][source]
+                if source in otherdata['UASourceNamespaces']:
+                    self.data['UASourceNamespaces'][source] = otherdata['UASourceNamespaces'][source]
+
+            for docname in merged_docnames:
+                self.note_import(source, docname)
+
+    def get_xref_targets(self):
+        """
+        Returns the index of all documented nodes, which can be referenced.
+
+        The index is a tuple of three dicts for DisplayName, BrowseName and NodeId. Each dict maps the
+        name to a list of ``(NodeClass, docname, anchor)``. BrowseNames are registered with and without
+        their namespace prefix.
+        """
+        store = self.data['UANodes']
+        targets = store.derived.get('xref_targets')
+        if targets is None:
+            by_displayname, by_browsename, by_nodeid = {}, {}, {}
+            for node_id, (docname, anchor, browsename, displayname, nodetype) in self.data['UAObjects'].items():
+                entry = (nodetype, docname, anchor)
+                if isinstance(displayname, str):
+                    by_displayname.setdefault(displayname, []).append(entry)
+                by_browsename.setdefault(browsename, []).append(entry)
+                m = re.match(r'\d+:(.+)', browsename)
+                if m:
+                    by_browsename.setdefault(m.group(1), []).append(entry)
+                by_nodeid.setdefault(node_id, []).append(entry)
+            targets = store.derived['xref_targets'] = (by_displayname, by_browsename, by_nodeid)
+        return targets
+
+    def find_xref_target(self, target, node_classes=None):
+        """
+        Find a documented node by DisplayName, BrowseName or NodeId, in this order.
+
+        :param node_classes: If given, only nodes of these NodeClasses are taken into account
+        :return: tuple of (NodeClass, docname, anchor) or None
+        """
+        for index in self.get_xref_targets():
+            for entry in index.get(target, ()):
+                if node_classes is None or entry[0] in node_classes:
+                    return entry
+        return None
 
     def resolve_xref(self, env, fromdocname, builder, typ, target, node,
                      contnode):
-        match = [(docname, anchor)
-                 for name, sig, typ, docname, anchor, prio
-                 in self.get_objects() if sig == target]
-
-        if len(match) > 0:
-            todocname = match[0][0]
-            targ = match[0][1]
-
-            return make_refnode(builder, fromdocname, todocname, targ,
-                                contnode, targ)
-        else:
-            print('Awww, found nothing')
+        entry = self.find_xref_target(target, ROLE_NODE_CLASSES.get(typ))
+        if entry is None:
             return None
-        
+
+        _node_class, todocname, targ = entry
+        return make_refnode(builder, fromdocname, todocname, targ,
+                            contnode, targ)
+
+    def resolve_any_xref(self, env, fromdocname, builder, target, node,
+                         contnode):
+        entry = self.find_xref_target(target)
+        if entry is None:
+            return []
+
+        node_class, todocname, targ = entry
+        role = self.role_for_objtype(node_class) or 'ref'
+        return [(f'{self.name}:{role}',
+                 make_refnode(builder, fromdocname, todocname, targ, contnode, targ))]
+
     def add_uavariable(self, signature, ingredients):
         """Add a new UAVariable to the domain."""
         name = f'UAVariable.{signature}'
@@ -82,63 +239,345 @@ class OpcuaDomain(Domain):
         self.data['UAVariables'].append(
             (name, signature, 'UAVariable', self.env.docname, anchor, 0))
         
-    #def add_namespace(self, namespace):
+    @measure_time("import")
+    def add_nodeset(self, source, namespaces, aliases, ua_nodes, preloaded=False, content_hash=None):
+        """
+        Merges the nodes of an imported nodeset into the node model.
+
+        The namespace indices of the nodeset get translated into the namespace array of the merged
+        model. A nodeset, which was already imported from the same source, gets replaced.
+
+        If ``preloaded`` is set, the nodeset was imported before the documents got read and is kept
+        until the end of the reading phase, even if no document claims it by :meth:`note_import`.
+        ``content_hash`` is the :func:`~opcuadomain.cache.file_hash` of the source, if already known.
+        """
+        remapper = NamespaceRemapper(build_namespace_table(self.data['UANamespaces'], namespaces))
+
+        for alias, target in aliases.items():
+            self.data['UAAliases'].setdefault(alias, remapper.nodeid(target))
+
+        self.data['UANodes'].add_remapped(source, ua_nodes, remapper)
+        self.data['UASourceNamespaces'][source] = list(namespaces)
+
+        self.data['UAImports'].setdefault(source, [])
+        if is_server_url(source):
+            # Cached server models are identified by the token of their snapshot
+            self.data['UASources'][source] = (None, getattr(ua_nodes, "token", None))
+        elif os.path.exists(source):
+            self.data['UASources'][source] = (os.path.getmtime(source), content_hash or file_hash(source))
+        if preloaded:
+            self.data['UAPreloaded'].add(source)
+
+    def is_preloaded(self, source):
+        """Returns True, if the nodeset was imported before the documents got read."""
+        return source in self.data['UAPreloaded'] and self.data['UANodes'].has_source(source)
+
+    def note_import(self, source, docname):
+        """Registers ``docname`` as document, which imports the nodeset ``source``."""
+        docnames = self.data['UAImports'].setdefault(source, [])
+        if docname not in docnames:
+            docnames.append(docname)
+
+    def note_dependencies(self, docname, uanode):
+        """
+        Registers all nodes, which are rendered by documenting ``uanode`` in ``docname``.
+
+        Besides the node itself, these are its parent, its children and the targets of the references of
+        the node and its children, as their names are shown in the reference tables.
+        """
+        node_ids = self.data['UADependencies'].setdefault(docname, set())
+        node_ids.add(uanode.nodeid)
+        if uanode.parent:
+            node_ids.add(uanode.parent)
+        if uanode.datatype:
+            node_ids.add(uanode.datatype)
+        node_ids.update(ref.target for ref in uanode.refs)
+        for child in self.find_child_nodes(uanode.nodeid):
+            node_ids.add(child.nodeid)
+            if child.datatype:
+                node_ids.add(child.datatype)
+            node_ids.update(ref.target for ref in child.refs)
+
+    def find_dependent_docs(self, node_ids):
+        """Returns all documents, which render at least one of the given nodes."""
+        return [
+            docname for docname, dependencies in self.data['UADependencies'].items()
+            if not dependencies.isdisjoint(node_ids)
+        ]
+
+    def note_uanode(self, uanode, docname, anchor):
+        """
+        Registers a node, which got documented in ``docname``.
+
+        The names and the NodeClass are stored together with the location, so that object
+        listings and cross references do not need to load the node model.
+        """
+        self.data['UAObjects'][uanode.nodeid] = (
+            docname, anchor, uanode.browsename, uanode.displayname, uanode.nodetype
+        )
+        self.data['UANodes'].derived.pop('xref_targets', None)
+
+    def purge_nodesets(self):
+        """Removes all nodesets, which are not imported by any document anymore."""
+        self.data['UAPreloaded'].clear()
+        for source, docnames in list(self.data['UAImports'].items()):
+            if not docnames:
+                self._remove_nodeset(source)
+
+    def reset_model(self) -> Set[str]:
+        """
+        Drops the node model and all documented nodes.
+
+        :return: docnames, which imported nodesets, documented or rendered nodes
+        """
+        docnames = {docname for docnames in self.data['UAImports'].values() for docname in docnames}
+        docnames.update(self.data['UADependencies'].keys())
+        docnames.update(obj[0] for obj in self.data['UAObjects'].values())
+        for key, value in copy.deepcopy(self.initial_data).items():
+            self.data[key] = value
+        return docnames
+
+    def _remove_nodeset(self, source):
+        self.data['UANodes'].remove_source(source)
+        self.data['UAImports'].pop(source, None)
+        self.data['UASources'].pop(source, None)
+        self.data['UASourceNamespaces'].pop(source, None)
+
     def find_uavariable(self, browse_name):
         """Find a UAVariable by name."""
-        for uanode in self.data['UANodes']:
-            if uanode.browsename == browse_name and uanode.nodetype == 'UAVariable':
-                return uanode
-        return None
+        return self.data['UANodes'].find(browse_name, 'UAVariable')
     
     def get_uavariable(self, node_id):
         """Find a UAVariable by id."""
-        for uanode in self.data['UANodes']:
-            if uanode.nodeid == node_id and uanode.nodetype == 'UAVariable':
-                return uanode
+        uanode = self.data['UANodes'].get(node_id)
+        if uanode is not None and uanode.nodetype == 'UAVariable':
+            return uanode
         return None
     
     def find_uanode_by_name(self, browse_name, node_type):
         """Find a UANode by browsename."""
-        for uanode in self.data['UANodes']:
-            if uanode.browsename == browse_name and uanode.nodetype == node_type:
-                return uanode
-        return None
+        return self.data['UANodes'].find(browse_name, node_type)
     
     def find_uanode_by_id(self, node_id):
-        """Find a UANode by browsename."""
-        for uanode in self.data['UANodes']:
-            if uanode.nodeid == node_id:
-                return uanode
-        return None
+        """Find a UANode by id."""
+        return self.data['UANodes'].get(node_id)
     
     def find_child_nodes(self, parent_id):
+        """Find all UANodes with the given parent id."""
+        return self.data['UANodes'].children(parent_id)
+    
+    def get_namespace_index(self, namespace):
+        """
+        Returns the index of a namespace in the merged model.
+
+        :param namespace: namespace uri or index
+        :return: namespace index or None, if the namespace is unknown
+        """
+        return find_namespace_index(self.data['UANamespaces'], namespace)
+
+    def get_source_namespaces(self, sources):
+        """
+        Returns the namespace uris of a model, which merges only the given sources in the given order.
+
+        This is the namespace array a document sees, which imports exactly these sources, independent
+        of the nodesets imported by other documents.
+        """
+        namespaces = []
+        for source in sources:
+            build_namespace_table(namespaces, self.data['UASourceNamespaces'].get(source, []))
+        return namespaces
+
+    def select_uanodes(self, namespace=None, node_classes=None, root_id=None, sources=None):
+        """
+        Yields all nodes of a namespace, NodeClasses or subtree in a single pass over the model.
+
+        :param namespace: namespace uri or index
+        :param node_classes: list of NodeClasses like ``UAVariable``
+        :param root_id: NodeId of the root node of a subtree
+        :param sources: If given, only the nodes of these sources are yielded. Namespace indices of
+                        ``namespace`` and ``root_id`` then refer to :meth:`get_source_namespaces`.
+        """
+        namespaces = self.data['UANamespaces']
+        if sources is not None:
+            # Translate the indices of the sources' own namespace array into the ones of the merged model
+            source_namespaces = self.get_source_namespaces(sources)
+            remapper = NamespaceRemapper(build_namespace_table(list(namespaces), source_namespaces))
+            if namespace is not None:
+                namespace_index = find_namespace_index(source_namespaces, namespace)
+                if namespace_index is None or namespace_index not in remapper.table:
+                    return iter(())
+                namespace = remapper.table[namespace_index]
+            if root_id is not None:
+                root_id = remapper.nodeid(root_id)
+
+        namespace_index = None
+        if namespace is not None:
+            namespace_index = find_namespace_index(namespaces, namespace)
+            if namespace_index is None:
+                return iter(())
+        return self.data['UANodes'].select(namespace_index, node_classes, root_id, sources)
+
+    def find_references_by_target(self, target_id):
+        """
+        Find all references pointing to the given node.
+
+        :return: list of (source NodeId, ReferenceType, IsForward)
+        """
+        return self.data['UANodes'].references_to(target_id)
+
+    def find_inverse_references(self, node_id):
+        """
+        Find the references of other nodes pointing to the given node, seen from the given node.
+
+        A forward ``HasComponent`` of the parent to ``node_id`` is returned as inverse ``HasComponent``
+        to the parent.
+        """
+        return [
+            UAReference(reftype, not forward, source_id)
+            for source_id, reftype, forward in self.data['UANodes'].references_to(node_id)
+        ]
+
+    def find_referencing_nodes(self, node_id, reftype=None):
+        """
+        Find all nodes using the given node by a forward reference, like instances using a type by
+        ``HasTypeDefinition``.
+
+        :param reftype: If given, only references of this type are taken into account
+        """
         result = []
-        """Find a UANode by browsename."""
-        for uanode in self.data['UANodes']:
-            if uanode.parent == parent_id:
+        for source_id, source_reftype, forward in self.data['UANodes'].references_to(node_id):
+            if not forward or (reftype is not None and source_reftype not in _reftype_names(reftype)):
+                continue
+            uanode = self.find_uanode_by_id(source_id)
+            if uanode is not None and uanode not in result:
                 result.append(uanode)
         return result
-    
-    def get_target_name(self, target):
-        m = re.match(r'i=(\d+)', target)
 
+    def find_subtypes(self, node_id):
+        """Find the direct subtypes of the given type node."""
+        result = []
+        subtype_names = _reftype_names('HasSubtype')
+
+        # Subtypes normally define an inverse HasSubtype reference to their super type
+        for source_id, reftype, forward in self.data['UANodes'].references_to(node_id):
+            if reftype in subtype_names and not forward:
+                result.append(source_id)
+
+        uanode = self.find_uanode_by_id(node_id)
+        if uanode is not None:
+            for ref in uanode.refs:
+                if ref.reftype in subtype_names and ref.forward and ref.target not in result:
+                    result.append(ref.target)
+
+        return [subtype for subtype in map(self.find_uanode_by_id, result) if subtype is not None]
+
+    def get_reference_summary(self, node_id):
+        """
+        Returns the reference summary of a node as tuple of
+        (NodeClass, TypeDefinition, ModellingRule, DataType) or ``None`` for unknown nodes.
+
+        Summaries are calculated once per node and model. Only requested nodes get calculated, so
+        nodes of memory-mapped snapshots are not built without need.
+        """
+        store = self.data['UANodes']
+        summaries = store.derived.setdefault('reference_summaries', {})
+        if node_id not in summaries:
+            uanode = store.get(node_id)
+            summaries[node_id] = None if uanode is None else self._build_reference_summary(uanode)
+        return summaries[node_id]
+
+    def _build_reference_summary(self, uanode):
+        ModellingRule = ""
+        TypeDefinition = ""
+        DataType = ""
+        if uanode.datatype:
+            if re.match(r'i=|ns=', uanode.datatype):
+                DataType = self.get_target_name(uanode.datatype)
+            else:
+                DataType = uanode.datatype
+
+        for ref in uanode.refs:
+            if ref.reftype == "HasModellingRule":
+                ModellingRule = self.get_modelling_rule_name(ref.target)
+            if ref.reftype == "HasTypeDefinition":
+                TypeDefinition = self.get_target_name(ref.target)
+
+        return (uanode.nodetype, TypeDefinition, ModellingRule, DataType)
+
+    def get_modelling_rule_name(self, target):
+        """Returns the short name of a modelling rule, like ``Mandatory`` for ``ModellingRule_Mandatory``."""
+        name = self.get_target_name(target)
+        m = modelling_rule_pattern.match(name)
         if m:
-            if int(m.group(1)) in ObjectIdNames:
-                return ObjectIdNames[int(m.group(1))]
-            
-        for alias in self.data['UAAliases']:
-            if self.data['UAAliases'][alias] == target:
-                return alias
-            
-        node = self.find_uanode_by_id(target)
-        if node:
-            return node.browsename
-        
-        return target
+            return m.group(1)
+        return name
+
+    def get_reference_rows(self, uanode):
+        """
+        Returns the hierarchical and non-hierarchical reference table rows of the given node.
+
+        Rows are calculated once per node and model from the reference summaries, only the row
+        dicts get created for each call.
+        """
+        store = self.data['UANodes']
+        reference_rows = store.derived.setdefault('reference_rows', {})
+        rows = reference_rows.get(uanode.nodeid)
+        if rows is None:
+            rows = reference_rows[uanode.nodeid] = self._build_reference_rows(uanode)
+        hierarchical_rows, non_hierarchical_rows = rows
+        hierarchical_refs = [dict(zip(HIERARCHICAL_REF_COLUMNS, row)) for row in hierarchical_rows]
+        non_hierarchical_refs = [dict(zip(NON_HIERARCHICAL_REF_COLUMNS, row)) for row in non_hierarchical_rows]
+        return hierarchical_refs, non_hierarchical_refs
+
+    def _build_reference_rows(self, uanode):
+        # Hierarchical References
+        # [forward, ReferenceType, TargetId, NodeClass, Name, TypeDefinition, ModellingRule, DataType]
+        hierarchical_rows = []
+        for ref in uanode.refs:
+            if ref.reftype == "HasSubtype" or ref.reftype == "Organizes" or ref.reftype == "HasComponent":
+                hierarchical_rows.append(
+                    (ref.forward, ref.reftype, ref.target, "", self.get_target_name(ref.target), "--", "--", "--")
+                )
+
+        for child in self.find_child_nodes(uanode.nodeid):
+            NodeClass, TypeDefinition, ModellingRule, DataType = self.get_reference_summary(child.nodeid)
+            for ref in child.refs:
+                if ref.reftype == "HasComponent" or ref.reftype == "HasProperty":
+                    hierarchical_rows.append(
+                        (not ref.forward, ref.reftype, child.nodeid, child.nodetype, child.browsename,
+                         TypeDefinition, ModellingRule, DataType)
+                    )
+
+        non_hierarchical_rows = []
+        for ref in uanode.refs:
+            if ref.reftype == "HasModellingRule":
+                non_hierarchical_rows.append(
+                    (ref.forward, ref.reftype, self.get_modelling_rule_name(ref.target), ref.target)
+                )
+            if ref.reftype == "HasTypeDefinition":
+                non_hierarchical_rows.append((ref.forward, ref.reftype, self.get_target_name(ref.target), ref.target))
+
+        return tuple(hierarchical_rows), tuple(non_hierarchical_rows)
+
+    def get_name_resolver(self):
+        """Returns the NodeId -> name resolver of the current model."""
+        store = self.data['UANodes']
+        resolver = store.derived.get('name_resolver')
+        if resolver is None:
+            resolver = NameResolver(self.data['UAAliases'], store, self.env.config.opcua_name_cache_size)
+            store.derived['name_resolver'] = resolver
+        return resolver
 
+    def get_target_name(self, target):
+        """Returns the name of the given NodeId: core name, alias or BrowseName, else the NodeId itself."""
+        return self.get_name_resolver().resolve(target)
 
 
-    
+def _reftype_names(reftype):
+    """Returns the alias name and the NodeId of a standard reference type, as both are used in nodesets."""
+    if hasattr(ObjectIds, reftype):
+        return (reftype, f'i={getattr(ObjectIds, reftype)}')
+    return (reftype,)
 
 
 def setup(app):
@@ -148,11 +587,49 @@ def setup(app):
 
     app.add_config_value("needs_extra_links", [], "html")
     app.add_config_value("needs_string_links", {}, "html")
+    app.add_config_value("needs_render_context", {}, "html")
+
+    app.add_config_value("opcua_nodeset_cache", True, "env", types=[bool])
+    app.add_config_value("opcua_nodeset_cache_dir", None, "env", types=[str])
+    app.add_config_value("opcua_nodeset_cache_max_size", 512 * 1024 * 1024, "env", types=[int])
+    app.add_config_value("opcua_import_workers", 0, "env", types=[int])
+    app.add_config_value("opcua_browse_batch_size", 500, "env", types=[int])
+    app.add_config_value("opcua_browse_max_requests", 4, "env", types=[int])
+    app.add_config_value("opcua_server_cache", "revalidate", "env", types=[str])
+    app.add_config_value("opcua_server_cache_dir", None, "env", types=[str])
+    app.add_config_value("opcua_name_cache_size", 4096, "", types=[int])
+    # Directory inside the source directory, which gets the pages generated for autodoc directives
+    app.add_config_value("opcua_autodoc_dir", "opcua_autodoc", "env", types=[str])
+    app.add_config_value("opcua_autodoc_pagesize", 100, "env", types=[int])
+    app.add_config_value("opcua_time_measurements", False, "", types=[bool])
+    app.add_config_value("opcua_memory_measurements", False, "", types=[bool])
+    app.add_config_value("opcua_trace", False, "", types=[bool])
+    app.add_config_value("opcua_trace_max_events", 200000, "", types=[int])
 
 
     app.add_domain(OpcuaDomain)
 
+    # Time measurements and tracing of the build phases, see opcuadomain.debug
+    app.connect("config-inited", init_measurements, priority=0)
+    app.connect("builder-inited", trace_builder_inited, priority=999)
+    app.connect("source-read", trace_source_read, priority=0)
+    app.connect("doctree-read", trace_doctree_read, priority=999)
+    # Before persist_env(), which writes the sidecar files while the environment gets pickled
+    app.connect("env-updated", trace_env_updated, priority=800)
+    app.connect("env-check-consistency", trace_env_check_consistency, priority=999)
+    app.connect("build-finished", process_timing, priority=999)
+    app.connect("build-finished", process_trace, priority=999)
+
+    app.connect("builder-inited", generate_autodoc_pages)
+    app.connect("env-get-outdated", check_sidecars, priority=400)
+    app.connect("env-get-outdated", find_outdated_docs)
     app.connect("env-before-read-docs", prepare_env)
+    app.connect("env-before-read-docs", preload_nodesets)
+    app.connect("env-purge-doc", purge_env)
+    app.connect("env-merge-info", merge_env)
+    app.connect("env-updated", purge_nodesets)
+    # Must run after all other handlers, which may still change the data
+    app.connect("env-updated", persist_env, priority=900)
 
     app.connect("doctree-resolved", process_ua_nodes)
 
@@ -162,11 +639,97 @@ def setup(app):
         'parallel_write_safe': True,
     }
 
-def prepare_env(app: Sphinx, env: BuildEnvironment, _docname: str) -> None:
-    
+def prepare_env(app: Sphinx, env: BuildEnvironment, docnames: List[str]) -> None:
+
+    # Sphinx pickles the environment only if documents get read, see persist_env()
+    env.opcua_docs_read = bool(docnames)
+
     if not hasattr(env, "needs_all_docs"):
         # Used to store all docnames, which have need-function in it and therefor
         # need to be handled later
         env.needs_all_docs = {"all": []}
 
-    app.config.needs_layouts = {**LAYOUTS}
\ No newline at end of file
+    app.config.needs_layouts = {**LAYOUTS}
+
+
+def check_sidecars(
+    app: Sphinx, env: BuildEnvironment, added: Set[str], changed: Set[str], removed: Set[str]
+) -> List[str]:
+    """
+    Drops the node model and the documented nodes, if their sidecar files do not match the environment.
+
+    This happens, if a build got interrupted after the sidecar files were written, but before the
+    environment got pickled, or if a sidecar file got removed. The documents using the model get read
+    again, which imports the nodesets again.
+    """
+    opcua = env.get_domain('opcua')
+    needs = getattr(env, "needs_all_needs", None)
+    if opcua.data['UANodes'].sidecar_valid() and (not isinstance(needs, SidecarMapping) or needs.sidecar_valid()):
+        return []
+
+    logger.info("Sidecar files do not match the environment, the node model gets imported again.")
+    docnames = opcua.reset_model()
+    if needs is not None:
+        env.needs_all_needs = {}
+    if hasattr(env, "needs_all_docs"):
+        for category_docnames in env.needs_all_docs.values():
+            docnames.update(category_docnames)
+        env.needs_all_docs = {"all": []}
+    return sorted(docname for docname in docnames if docname in env.found_docs and docname not in changed | added)
+
+
+def purge_env(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Removes all documented nodes of a document, which gets re-read or was removed."""
+    if hasattr(env, "needs_all_needs"):
+        for node_id, ua_info in list(env.needs_all_needs.items()):
+            if ua_info["docname"] == docname:
+                del env.needs_all_needs[node_id]
+
+    if hasattr(env, "needs_all_docs"):
+        for docnames in env.needs_all_docs.values():
+            if docname in docnames:
+                docnames.remove(docname)
+
+
+def merge_env(app: Sphinx, env: BuildEnvironment, docnames: List[str], other: BuildEnvironment) -> None:
+    """Merges the documented nodes of a parallel reader into the main environment."""
+    if hasattr(other, "needs_all_needs"):
+        if not hasattr(env, "needs_all_needs"):
+            env.needs_all_needs = {}
+        for node_id, ua_info in other.needs_all_needs.items():
+            if ua_info["docname"] in docnames:
+                env.needs_all_needs[node_id] = ua_info
+
+    if hasattr(other, "needs_all_docs"):
+        if not hasattr(env, "needs_all_docs"):
+            env.needs_all_docs = {"all": []}
+        for category, other_docnames in other.needs_all_docs.items():
+            category_docnames = env.needs_all_docs.setdefault(category, [])
+            for docname in other_docnames:
+                if docname in docnames and docname not in category_docnames:
+                    category_docnames.append(docname)
+
+
+def purge_nodesets(app: Sphinx, env: BuildEnvironment) -> None:
+    env.get_domain('opcua').purge_nodesets()
+
+
+def persist_env(app: Sphinx, env: BuildEnvironment) -> None:
+    """
+    Writes the node model and the documented nodes into sidecar files in the doctree directory.
+
+    The environment itself keeps only references to these files, so it stays small and gets
+    loaded fast. Unchanged data is not written again.
+
+    If no document was read, Sphinx does not pickle the environment. The sidecar files must then
+    keep the version referenced by the pickled environment, so nothing gets written.
+    """
+    if not getattr(env, "opcua_docs_read", False):
+        return
+
+    env.get_domain('opcua').data['UANodes'].persist(os.path.join(env.doctreedir, "opcua_model.pickle"))
+
+    if hasattr(env, "needs_all_needs"):
+        if not isinstance(env.needs_all_needs, SidecarMapping):
+            env.needs_all_needs = SidecarMapping(env.needs_all_needs)
+        env.needs_all_needs.persist(os.path.join(env.doctreedir, "opcua_needs.pickle"))
@@ -0,0 +1,144 @@
+"""
+Compact records for the nodes of the imported model.
+
+asyncua's ``NodeData`` carries an instance dict per object, the parsed XML value and a lot of repeated
+strings. As the model gets pickled together with the Sphinx environment, the domain converts each
+``NodeData`` into a :class:`UANodeRecord` at import time:
+
+* ``__slots__`` instead of instance dicts
+* NodeIds, reference types and node classes are interned, so equal strings share one object
+* the value payload is not kept, as it is not documented
+* pickling stores the field values positional only
+"""
+import hashlib
+import sys
+from typing import Any, List, Optional, Tuple
+
+from asyncua.common.xmlparser import NodeData
+
+_intern = sys.intern
+
+
+def intern_str(value: Optional[str]) -> Optional[str]:
+    """Interns strings, other values are returned untouched."""
+    if isinstance(value, str):
+        return _intern(value)
+    return value
+
+
+class UAReference:
+    """A single reference of a node, replaces asyncua's ``RefStruct``."""
+
+    __slots__ = ("reftype", "forward", "target")
+
+    def __init__(self, reftype: str, forward: bool, target: str) -> None:
+        self.reftype = reftype
+        self.forward = forward
+        self.target = target
+
+    def __reduce__(self):
+        return UAReference, (self.reftype, self.forward, self.target)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, UAReference):
+            return NotImplemented
+        return (self.reftype, self.forward, self.target) == (other.reftype, other.forward, other.target)
+
+    def __hash__(self) -> int:
+        return hash((self.reftype, self.forward, self.target))
+
+    def __repr__(self) -> str:
+        return f"UAReference({self.reftype, self.forward, self.target})"
+
+
+class UANodeRecord:
+    """
+    A node of the imported model.
+
+    The attribute names are the same as the ones of asyncua's ``NodeData``, so records can be used
+    wherever a ``NodeData`` was used before. Only ``value`` is not available.
+
+    ``definitions`` of data types are stored as tuples of
+    ``(Name, DataType, ValueRank, Value, Description)``.
+    """
+
+    __slots__ = (
+        "nodetype",
+        "nodeid",
+        "browsename",
+        "displayname",
+        "symname",
+        "parent",
+        "parentlink",
+        "desc",
+        "typedef",
+        "refs",
+        "eventnotifier",
+        "datatype",
+        "rank",
+        "valuetype",
+        "dimensions",
+        "accesslevel",
+        "useraccesslevel",
+        "minsample",
+        "historizing",
+        "inversename",
+        "abstract",
+        "symmetric",
+        "definitions",
+        "struct_type",
+    )
+
+    def __init__(self, *values: Any) -> None:
+        # Positional values in the order of __slots__, used by pickle
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_node_data(cls, data: NodeData) -> "UANodeRecord":
+        """Converts an asyncua ``NodeData`` into a record."""
+        record = cls.__new__(cls)
+        record.nodetype = intern_str(data.nodetype)
+        record.nodeid = intern_str(data.nodeid)
+        record.browsename = intern_str(data.browsename)
+        record.displayname = data.displayname
+        record.symname = data.symname
+        record.parent = intern_str(data.parent)
+        record.parentlink = intern_str(data.parentlink)
+        record.desc = data.desc
+        record.typedef = intern_str(data.typedef)
+        record.refs = [UAReference(intern_str(ref.reftype), ref.forward, intern_str(ref.target)) for ref in data.refs]
+        record.eventnotifier = data.eventnotifier
+        record.datatype = intern_str(data.datatype)
+        record.rank = data.rank
+        record.valuetype = intern_str(data.valuetype)
+        record.dimensions = data.dimensions
+        record.accesslevel = data.accesslevel
+        record.useraccesslevel = data.useraccesslevel
+        record.minsample = data.minsample
+        record.historizing = data.historizing
+        record.inversename = data.inversename
+        record.abstract = data.abstract
+        record.symmetric = data.symmetric
+        record.definitions = _convert_definitions(data.definitions)
+        record.struct_type = data.struct_type
+        return record
+
+    def __reduce__(self):
+        return UANodeRecord, tuple(getattr(self, name) for name in self.__slots__)
+
+    def content_hash(self) -> bytes:
+        """Returns a short digest over all values of the node, used to find changed nodes."""
+        values = tuple(getattr(self, name) for name in self.__slots__)
+        return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).digest()
+
+    def __str__(self) -> str:
+        return f"UANodeRecord(nodeid:{self.nodeid})"
+
+    __repr__ = __str__
+
+
+def _convert_definitions(definitions: List[Any]) -> List[Tuple[Any, ...]]:
+    return [
+        (field.name, intern_str(field.datatype), field.valuerank, field.value, field.desc) for field in definitions
+    ]
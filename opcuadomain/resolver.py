@@ -0,0 +1,97 @@
+"""
+Resolution of NodeIds to the names shown in the reference tables.
+
+Names get resolved in this order:
+
+1. NodeIds of the core namespace like ``i=85`` by asyncua's ``ObjectIdNames``
+2. aliases of the imported nodesets
+3. BrowseName of the node in the imported model
+4. the NodeId itself, if nothing else is found
+
+The resolver is built once per model, as the result of 2. and 3. depend on the imported nodesets.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from asyncua.ua.object_ids import ObjectIdNames
+
+from opcuadomain.debug import cache_counters, measure_time
+from opcuadomain.nodestore import UANodeStore
+
+_numeric_nodeid_pattern = re.compile(r"i=(\d+)")
+
+
+class NameResolver:
+    """
+    Memoized NodeId -> name resolver.
+
+    Numeric NodeIds of the core namespace and aliases are answered by precomputed dicts, all other
+    NodeIds by a bounded LRU cache in front of the node lookup.
+
+    Hits and misses get counted under ``name_resolver`` by :func:`~opcuadomain.debug.cache_counters`.
+
+    :param aliases: alias -> NodeId of the merged model
+    :param store: node model used for the BrowseName lookup
+    :param max_size: maximum amount of cached names, ``0`` disables the LRU cache
+    """
+
+    def __init__(self, aliases: Dict[str, str], store: UANodeStore, max_size: int = 4096) -> None:
+        self.store = store
+        self.max_size = max_size
+        # The first alias of a NodeId wins, like it was the case for the former scan over all aliases
+        self.alias_names: Dict[str, str] = {}
+        for alias, target in aliases.items():
+            self.alias_names.setdefault(target, alias)
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.stats = cache_counters("name_resolver", "numeric", "alias")
+
+    def resolve(self, target: str) -> str:
+        """Returns the name of the given NodeId."""
+        stats = self.stats
+        # Fast path for the core namespace, "i=85" and alike
+        if target[:2] == "i=" and target[2:].isdigit():
+            name = ObjectIdNames.get(int(target[2:]))
+            if name is not None:
+                stats["hits"] += 1
+                stats["numeric"] += 1
+                return name
+
+        name = self.alias_names.get(target)
+        if name is not None:
+            stats["hits"] += 1
+            stats["alias"] += 1
+            return name
+
+        cache = self._cache
+        name = cache.get(target)
+        if name is not None:
+            stats["hits"] += 1
+            cache.move_to_end(target)
+            return name
+
+        stats["misses"] += 1
+        name = self._resolve(target)
+        if self.max_size > 0:
+            cache[target] = name
+            if len(cache) > self.max_size:
+                cache.popitem(last=False)
+        return name
+
+    @measure_time("resolver")
+    def _resolve(self, target: str) -> str:
+        m = _numeric_nodeid_pattern.match(target)
+        if m:
+            name: Optional[str] = ObjectIdNames.get(int(m.group(1)))
+            if name is not None:
+                return name
+
+        node = self.store.get(target)
+        if node:
+            return node.browsename
+
+        return target
+
+    def clear(self) -> None:
+        """Drops all cached names."""
+        self._cache.clear()
@@ -0,0 +1,228 @@
+"""
+Persistent snapshots of node models browsed from OPC UA servers.
+
+Browsing a server on every build is slow and loads the server, so the browsed model of each endpoint
+gets stored as memory-mapped snapshot, see :mod:`opcuadomain.snapshot`. Next to the snapshot, the state
+needed for the revalidation is stored: namespace array, ``NamespacePublicationDate`` per namespace and
+the structure hashes of the browsed subtrees, see :func:`~opcuadomain.browse.revalidate_model`.
+
+The handling of cached models is configured by ``opcua_server_cache``:
+
+* ``"revalidate"``: the snapshot gets checked against the server and updated, if the server model
+  changed. If the server is not reachable, the snapshot is used.
+* ``"offline"``: the snapshot is used without connecting to the server.
+* ``"refresh"``: the server gets browsed completely and the snapshot replaced.
+* ``"off"``: the server gets browsed completely, nothing is stored. The nodes get a token over their
+  contents instead of the snapshot token, so changed servers are still detected.
+"""
+import asyncio
+import hashlib
+import os
+import pickle
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from asyncua import Client, ua
+from sphinx.application import Sphinx
+
+from opcuadomain.browse import ServerBrowser, ServerModel, browse_model, revalidate_model
+from opcuadomain.cache import NodesetData
+from opcuadomain.logging import get_logger
+from opcuadomain.nodestore import NamespaceRemapper
+from opcuadomain.records import UANodeRecord
+from opcuadomain.snapshot import SNAPSHOT_SUFFIX, SnapshotError, UASnapshot, write_snapshot
+
+logger = get_logger(__name__)
+
+# Increase, if the structure of the stored state changes
+STATE_FORMAT = 1
+STATE_SUFFIX = ".server.pickle"
+
+CACHE_MODES = ("revalidate", "offline", "refresh", "off")
+
+# Errors of an unreachable or failing server
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, ua.UaError)
+
+
+class BrowsedNodes(list):
+    """
+    Nodes browsed in mode ``"off"``.
+
+    ``token`` is a digest over the contents of the nodes. It takes the place of the token of a snapshot,
+    so that a changed server model is detected by comparing the tokens.
+    """
+
+    def __init__(self, ua_nodes: List[UANodeRecord]) -> None:
+        super().__init__(ua_nodes)
+        digest = hashlib.blake2b(digest_size=16)
+        for content_hash in sorted(ua_node.content_hash() for ua_node in self):
+            digest.update(content_hash)
+        self.token = digest.hexdigest()
+
+
+class ServerCache:
+    """
+    Cache directory for models browsed from servers.
+
+    Each endpoint url has a state entry ``<url key><STATE_SUFFIX>`` with the
+    :class:`~opcuadomain.browse.ServerModel` state and the token of the snapshot
+    ``<url key>-<token><SNAPSHOT_SUFFIX>`` with the nodes. The snapshot replaced by an update is kept
+    until the next one, so an environment of the last build can still compare against its nodes.
+
+    Every url gets loaded once per instance, :func:`get_server_cache` returns the same instance for
+    the whole build.
+
+    :param cache_dir: directory of the entries
+    :param mode: one of :data:`CACHE_MODES`
+    :param batch_size: maximum amount of nodes per request
+    :param max_requests: maximum amount of concurrent requests per server
+    """
+
+    def __init__(self, cache_dir: str, mode: str, batch_size: int, max_requests: int) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown opcua_server_cache mode {mode!r}, expected one of {', '.join(CACHE_MODES)}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_requests = max_requests
+        # Requests sent to the servers by this instance
+        self.request_count = 0
+        self._loaded: Dict[str, NodesetData] = {}
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+    def _snapshot_path(self, url: str, token: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._url_key(url)}-{token}{SNAPSHOT_SUFFIX}")
+
+    def _state_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._url_key(url)}{STATE_SUFFIX}")
+
+    def load(self, urls: List[str]) -> List[NodesetData]:
+        """
+        Returns namespaces, aliases and nodes of the given servers. The nodes are given as
+        :class:`~opcuadomain.snapshot.UASnapshot`, for mode ``"off"`` as :class:`BrowsedNodes`.
+
+        :raises ReferenceError: if a server can not be browsed and there is no snapshot of it
+        """
+        missing = [url for url in dict.fromkeys(urls) if url not in self._loaded]
+        if missing:
+            async def load_all():
+                return await asyncio.gather(*(self._load(url) for url in missing))
+
+            self._loaded.update(zip(missing, asyncio.run(load_all())))
+        return [self._loaded[url] for url in urls]
+
+    async def _load(self, url: str) -> NodesetData:
+        if self.mode == "off":
+            model = await self._browse(url, None)
+            return model.namespaces, {}, BrowsedNodes(model.nodes)
+
+        cached = self._read_entry(url)
+        if self.mode == "offline":
+            if cached is None:
+                raise ReferenceError(f"No snapshot of server {url} in {self.cache_dir} for offline builds")
+            logger.info(f"Using snapshot of server {url}.")
+            return cached[1].namespaces, {}, cached[1]
+
+        try:
+            model = await self._browse(url, cached if self.mode == "revalidate" else None)
+        except CONNECTION_ERRORS as e:
+            if cached is None:
+                raise ReferenceError(f"Could not browse server {url}: {e}")
+            logger.warning(f"Could not connect to server {url}, using its snapshot: {e}")
+            return cached[1].namespaces, {}, cached[1]
+
+        if model is None:
+            logger.info(f"Model of server {url} is unchanged, using its snapshot.")
+            return cached[1].namespaces, {}, cached[1]
+
+        snapshot = self._write_entry(url, model, cached[1] if cached is not None else None)
+        return snapshot.namespaces, {}, snapshot
+
+    async def _browse(self, url: str, cached: Optional[Tuple[ServerModel, UASnapshot]]) -> Optional[ServerModel]:
+        async with Client(url) as client:
+            browser = ServerBrowser(client, self.batch_size, self.max_requests)
+            if cached is None:
+                model = await browse_model(browser)
+                logger.info(f"Browsed {len(model.nodes)} nodes from {url} with {browser.request_count} requests.")
+            else:
+                model = await revalidate_model(browser, cached[0], lambda: _server_nodes(*cached))
+                logger.info(f"Revalidated model of {url} with {browser.request_count} requests.")
+        self.request_count += browser.request_count
+        return model
+
+    def _read_entry(self, url: str) -> Optional[Tuple[ServerModel, UASnapshot]]:
+        """Returns the stored state and snapshot of a server or ``None``, if there is no valid entry."""
+        state_path = self._state_path(url)
+        if not os.path.exists(state_path):
+            return None
+        try:
+            with open(state_path, "rb") as f:
+                state_format, state_url, token, model = pickle.load(f)
+            if state_format != STATE_FORMAT or state_url != url:
+                return None
+            snapshot = UASnapshot(self._snapshot_path(url, token), token)
+        except (OSError, SnapshotError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            logger.warning(f"Could not load snapshot of server {url}: {e}")
+            return None
+        return model, snapshot
+
+    def _write_entry(self, url: str, model: ServerModel, replaced: Optional[UASnapshot]) -> UASnapshot:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = os.path.join(self.cache_dir, f"{self._url_key(url)}.{os.getpid()}.tmp")
+        token = write_snapshot(tmp_path, model.namespaces, {}, model.nodes)
+        snapshot_path = self._snapshot_path(url, token)
+        os.replace(tmp_path, snapshot_path)
+
+        state_path = self._state_path(url)
+        tmp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((STATE_FORMAT, url, token, model), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, state_path)
+
+        # Remove older snapshots of the url, but keep the replaced one
+        keep = {os.path.basename(snapshot_path)}
+        if replaced is not None:
+            replaced.close()
+            keep.add(os.path.basename(replaced.path))
+        prefix = f"{self._url_key(url)}-"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(SNAPSHOT_SUFFIX) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        return UASnapshot(snapshot_path, token)
+
+
+def _server_nodes(model: ServerModel, snapshot: UASnapshot) -> Dict[str, UANodeRecord]:
+    """Returns the nodes of a snapshot by NodeId, translated back to the namespace indices of the server."""
+    remapper = NamespaceRemapper({index: server_index for server_index, index in model.table.items()})
+    return {ua_node.nodeid: ua_node for ua_node in map(remapper.node, snapshot.records())}
+
+
+_server_caches: "weakref.WeakKeyDictionary[Sphinx, ServerCache]" = weakref.WeakKeyDictionary()
+
+
+def get_server_cache(app: Sphinx) -> ServerCache:
+    """
+    Returns the server cache configured by ``opcua_server_cache``, ``opcua_server_cache_dir``,
+    ``opcua_browse_batch_size`` and ``opcua_browse_max_requests``. The same instance is returned for
+    all calls with the same application.
+    """
+    if app not in _server_caches:
+        cache_dir = app.config.opcua_server_cache_dir
+        if not cache_dir:
+            cache_dir = os.path.join(app.doctreedir, "opcua_servers")
+        elif not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(app.confdir, cache_dir)
+
+        _server_caches[app] = ServerCache(
+            cache_dir,
+            app.config.opcua_server_cache,
+            app.config.opcua_browse_batch_size,
+            app.config.opcua_browse_max_requests,
+        )
+    return _server_caches[app]
@@ -0,0 +1,125 @@
+"""
+Sidecar files for the bulk data of the domain.
+
+Sphinx pickles the complete environment at the end of each build and loads it again at the start of
+the next one. The node model and the rendered node infos are by far the largest part of it, but most
+incremental builds do not need them at all.
+
+So this data gets written into sidecar files in the doctree directory. The environment only keeps
+the path of the file and a token, which identifies the written version. The data is read on demand,
+when it gets accessed for the first time.
+"""
+import os
+import pickle
+import uuid
+from typing import Any, Dict, Iterator, MutableMapping, Optional
+
+# Increase, if the structure of the sidecar files changes
+SIDECAR_FORMAT = 2
+
+
+class SidecarError(Exception):
+    """Raised if a sidecar file is missing or does not match the environment."""
+
+
+def write_sidecar(path: str, data: Any) -> str:
+    """
+    Writes ``data`` atomically into the sidecar file ``path``.
+
+    :return: token of the written version
+    """
+    token = uuid.uuid4().hex
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        # The header is pickled on its own, so that it can be checked without loading the data
+        pickle.dump((SIDECAR_FORMAT, token), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return token
+
+
+def read_sidecar(path: str, token: str) -> Any:
+    """Reads the data of the sidecar file ``path``, which must have been written with ``token``."""
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if header != (SIDECAR_FORMAT, token):
+                raise SidecarError(f"Sidecar file {path} does not match the environment.")
+            return pickle.load(f)
+    except SidecarError:
+        raise
+    except Exception as e:
+        raise SidecarError(f"Could not read sidecar file {path}: {e}")
+
+
+def sidecar_matches(path: str, token: str) -> bool:
+    """
+    Checks if the sidecar file ``path`` exists and was written with ``token``.
+
+    Only the header of the file gets read. A sidecar file may not match the environment, if a build
+    got interrupted after writing the sidecar files, but before pickling the environment.
+    """
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f) == (SIDECAR_FORMAT, token)
+    except Exception:
+        return False
+
+
+class SidecarMapping(MutableMapping):
+    """
+    Dict, which gets pickled into a sidecar file.
+
+    After :meth:`persist`, pickling the mapping stores the path and the token only, as long as it is
+    not changed. An unpickled mapping reads its items on the first access.
+    """
+
+    def __init__(self, data: Optional[Dict[Any, Any]] = None) -> None:
+        self._data: Optional[Dict[Any, Any]] = dict(data or {})
+        self._path: Optional[str] = None
+        self._token: Optional[str] = None
+        self._dirty = True
+
+    @property
+    def data(self) -> Dict[Any, Any]:
+        if self._data is None:
+            self._data = read_sidecar(self._path, self._token)
+        return self._data
+
+    def sidecar_valid(self) -> bool:
+        """Checks if the items are loaded or can be read from the sidecar file."""
+        return self._data is not None or sidecar_matches(self._path, self._token)
+
+    def persist(self, path: str) -> None:
+        """Writes the items into the sidecar file ``path``, if they were changed."""
+        if not self._dirty and self._path == path:
+            return
+        self._token = write_sidecar(path, self.data)
+        self._path = path
+        self._dirty = False
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self._dirty or self._path is None:
+            return {"_data": self.data, "_path": None, "_token": None, "_dirty": True}
+        return {"_data": None, "_path": self._path, "_token": self._token, "_dirty": False}
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.data[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.data[key] = value
+        self._dirty = True
+
+    def __delitem__(self, key: Any) -> None:
+        del self.data[key]
+        self._dirty = True
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.data
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
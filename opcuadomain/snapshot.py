@@ -0,0 +1,510 @@
+"""
+Memory-mapped binary snapshots of a node model.
+
+Unpickling a large model creates every node object up front, even if only a handful of nodes get
+documented. A snapshot file stores the model in a flat binary layout instead, which gets mapped into
+memory with ``mmap``. Python objects are only built for the nodes, which are actually looked up.
+
+Layout of a snapshot file:
+
+* header: magic, format version and the table of sections as ``(offset, length)``
+* ``meta``: JSON with namespaces, aliases, token and byte order
+* string table: all strings of the model, deduplicated and sorted by their UTF-8 bytes, so a string
+  gets found by binary search. Strings are referenced by their index in the table.
+* nodes: one fixed-width record per node, see :data:`NODE_STRUCT`
+* references: ``(ReferenceType, Target, IsForward)`` triples of all nodes. The references of a
+  node are a contiguous range, given by the node record (CSR layout).
+* lookup indices: NodeId -> node and CSR tables for BrowseName -> nodes, parent -> children and
+  target -> references, all keyed by string index
+
+Values, which do not fit into the fixed-width record (like data type definitions), are stored as
+pickled blob per node.
+
+Snapshots get written by :func:`write_snapshot`, see :mod:`opcuadomain.convert` for the conversion of
+nodeset files.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import uuid
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from opcuadomain.records import UANodeRecord, UAReference, intern_str
+
+# Increase, if the layout of the snapshot files changes
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_MAGIC = b"OPCUASNP"
+SNAPSHOT_SUFFIX = ".uasnap"
+
+# Marks a missing string or blob
+NONE = 0xFFFFFFFF
+
+SECTIONS = (
+    "meta",
+    "str_offsets",
+    "str_data",
+    "blob_offsets",
+    "blob_data",
+    "nodes",
+    "refs",
+    "ref_sources",
+    "id_index",
+    "name_offsets",
+    "name_values",
+    "parent_offsets",
+    "parent_values",
+    "target_offsets",
+    "target_values",
+)
+
+HEADER_STRUCT = struct.Struct("<8sII")
+SECTION_STRUCT = struct.Struct("<QQ")
+
+# Fields of UANodeRecord stored as string index
+STRING_FIELDS = (
+    "nodetype",
+    "nodeid",
+    "browsename",
+    "displayname",
+    "symname",
+    "parent",
+    "parentlink",
+    "desc",
+    "typedef",
+    "datatype",
+    "valuetype",
+    "inversename",
+    "struct_type",
+)
+
+# String indices, rank, eventnotifier, flags, first reference, reference count, blob index
+NODE_STRUCT = struct.Struct(f"<{len(STRING_FIELDS)}IiiB3xIII")
+
+FLAG_HISTORIZING = 1
+FLAG_ABSTRACT = 2
+FLAG_SYMMETRIC = 4
+
+_INT32_RANGE = range(-(2**31), 2**31)
+
+
+class SnapshotError(Exception):
+    """Raised if a snapshot file is invalid or does not match the expected version."""
+
+
+def _blob_defaults() -> Dict[str, Any]:
+    # Fields of UANodeRecord, which are only stored in the blob of a node, if they differ from the default
+    return {"dimensions": None, "accesslevel": None, "useraccesslevel": None, "minsample": None, "definitions": []}
+
+
+def _align(f) -> None:
+    padding = -f.tell() % 8
+    if padding:
+        f.write(b"\0" * padding)
+
+
+def _csr(groups: Dict[int, List[int]], key_count: int) -> Tuple[array, array]:
+    offsets = array("I", [0])
+    values = array("I")
+    for key in range(key_count):
+        values.extend(groups.get(key, ()))
+        offsets.append(len(values))
+    return offsets, values
+
+
+def write_snapshot(path: str, namespaces: List[str], aliases: Dict[str, str], ua_nodes: Iterable[UANodeRecord]) -> str:
+    """
+    Writes the given model atomically into the snapshot file ``path``.
+
+    :param namespaces: namespace uris of the model without the core namespace
+    :param aliases: aliases of the model
+    :param ua_nodes: nodes of the model
+    :return: token of the written snapshot
+    """
+    ua_nodes = list(ua_nodes)
+
+    # String table, sorted by the UTF-8 bytes, so lookups can compare the raw bytes of the mapped file
+    strings = set()
+    for ua_node in ua_nodes:
+        for name in STRING_FIELDS:
+            value = getattr(ua_node, name)
+            if isinstance(value, str):
+                strings.add(value)
+        for ref in ua_node.refs:
+            strings.add(ref.reftype)
+            strings.add(ref.target)
+    encoded = sorted(value.encode("utf-8") for value in strings)
+    string_index = {value.decode("utf-8"): index for index, value in enumerate(encoded)}
+    str_offsets = array("Q", [0])
+    for value in encoded:
+        str_offsets.append(str_offsets[-1] + len(value))
+
+    blobs: List[bytes] = []
+    node_data = bytearray()
+    refs = array("I")
+    ref_sources = array("I")
+    id_index = array("I", [NONE]) * len(encoded)
+    by_name: Dict[int, List[int]] = {}
+    by_parent: Dict[int, List[int]] = {}
+    by_target: Dict[int, List[int]] = {}
+
+    for node_index, ua_node in enumerate(ua_nodes):
+        blob = {}
+        values = []
+        for name in STRING_FIELDS:
+            value = getattr(ua_node, name)
+            if isinstance(value, str):
+                values.append(string_index[value])
+            else:
+                values.append(NONE)
+                if value is not None:
+                    blob[name] = value
+
+        numbers = []
+        for name in ("rank", "eventnotifier"):
+            value = getattr(ua_node, name)
+            if type(value) is int and value in _INT32_RANGE:
+                numbers.append(value)
+            else:
+                numbers.append(0)
+                blob[name] = value
+
+        flags = 0
+        for name, flag in (("historizing", FLAG_HISTORIZING), ("abstract", FLAG_ABSTRACT), ("symmetric", FLAG_SYMMETRIC)):
+            value = getattr(ua_node, name)
+            if value is True:
+                flags |= flag
+            elif value is not False:
+                blob[name] = value
+
+        for name, default in _blob_defaults().items():
+            value = getattr(ua_node, name)
+            if value != default:
+                blob[name] = value
+
+        blob_index = NONE
+        if blob:
+            blob_index = len(blobs)
+            blobs.append(pickle.dumps(blob, protocol=pickle.HIGHEST_PROTOCOL))
+
+        first_ref = len(ref_sources)
+        for ref in ua_node.refs:
+            target = string_index[ref.target]
+            by_target.setdefault(target, []).append(len(ref_sources))
+            refs.extend((string_index[ref.reftype], target, 1 if ref.forward else 0))
+            ref_sources.append(node_index)
+
+        node_data += NODE_STRUCT.pack(*values, *numbers, flags, first_ref, len(ua_node.refs), blob_index)
+
+        # The first node of a NodeId wins, as in UANodeStore
+        node_id = values[1]
+        if id_index[node_id] == NONE:
+            id_index[node_id] = node_index
+        if values[2] != NONE:
+            by_name.setdefault(values[2], []).append(node_index)
+        if values[5] != NONE:
+            by_parent.setdefault(values[5], []).append(node_index)
+
+    blob_offsets = array("Q", [0])
+    for blob in blobs:
+        blob_offsets.append(blob_offsets[-1] + len(blob))
+
+    name_offsets, name_values = _csr(by_name, len(encoded))
+    parent_offsets, parent_values = _csr(by_parent, len(encoded))
+    target_offsets, target_values = _csr(by_target, len(encoded))
+
+    token = uuid.uuid4().hex
+    meta = {
+        "token": token,
+        "byteorder": sys.byteorder,
+        "namespaces": namespaces,
+        "aliases": aliases,
+        "nodes": len(ua_nodes),
+        "refs": len(ref_sources),
+    }
+    sections = {
+        "meta": json.dumps(meta).encode("utf-8"),
+        "str_offsets": str_offsets,
+        "str_data": b"".join(encoded),
+        "blob_offsets": blob_offsets,
+        "blob_data": b"".join(blobs),
+        "nodes": node_data,
+        "refs": refs,
+        "ref_sources": ref_sources,
+        "id_index": id_index,
+        "name_offsets": name_offsets,
+        "name_values": name_values,
+        "parent_offsets": parent_offsets,
+        "parent_values": parent_values,
+        "target_offsets": target_offsets,
+        "target_values": target_values,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        table_size = HEADER_STRUCT.size + SECTION_STRUCT.size * len(SECTIONS)
+        f.write(b"\0" * table_size)
+        table = []
+        for name in SECTIONS:
+            _align(f)
+            data = sections[name]
+            data = data.tobytes() if isinstance(data, array) else bytes(data)
+            table.append((f.tell(), len(data)))
+            f.write(data)
+
+        f.seek(0)
+        f.write(HEADER_STRUCT.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, len(SECTIONS)))
+        for offset, length in table:
+            f.write(SECTION_STRUCT.pack(offset, length))
+    os.replace(tmp_path, path)
+    return token
+
+
+def is_snapshot(path: str) -> bool:
+    """Returns True, if ``path`` names a snapshot file."""
+    return path.endswith(SNAPSHOT_SUFFIX)
+
+
+class UASnapshot:
+    """
+    Read-only node model backed by a memory-mapped snapshot file.
+
+    The lookup methods are the same as the ones of :class:`~opcuadomain.nodestore.UANodeStore`.
+    Nodes get built on their first lookup and are cached afterwards, so each node is
+    represented by a single object.
+
+    Pickling stores the path and the token only. An unpickled snapshot maps the file again on first
+    access and raises :class:`SnapshotError`, if the file was replaced in the meantime.
+
+    :param path: path of the snapshot file
+    :param token: if given, the token the snapshot must have
+    """
+
+    def __init__(self, path: str, token: Optional[str] = None) -> None:
+        self.path = path
+        self.token = token
+        self._mm: Optional[mmap.mmap] = None
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Could not open snapshot {self.path}: {e}")
+
+        magic, snapshot_format, section_count = HEADER_STRUCT.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or snapshot_format != SNAPSHOT_FORMAT or section_count != len(SECTIONS):
+            mm.close()
+            raise SnapshotError(f"{self.path} is not a snapshot of format {SNAPSHOT_FORMAT}.")
+
+        sections = {}
+        for index, name in enumerate(SECTIONS):
+            sections[name] = SECTION_STRUCT.unpack_from(mm, HEADER_STRUCT.size + index * SECTION_STRUCT.size)
+
+        offset, length = sections["meta"]
+        meta = json.loads(mm[offset:offset + length].decode("utf-8"))
+        if meta["byteorder"] != sys.byteorder:
+            mm.close()
+            raise SnapshotError(f"Snapshot {self.path} was written on a platform with different byte order.")
+        if self.token is not None and meta["token"] != self.token:
+            mm.close()
+            raise SnapshotError(f"Snapshot {self.path} was replaced, rebuild with -E.")
+
+        self._mm = mm
+        self.token = meta["token"]
+        self.namespaces: List[str] = meta["namespaces"]
+        self.aliases: Dict[str, str] = meta["aliases"]
+        self._node_count: int = meta["nodes"]
+        self._nodes_offset = sections["nodes"][0]
+        self._str_data_offset = sections["str_data"][0]
+        self._blob_data_offset = sections["blob_data"][0]
+
+        view = self._view = memoryview(mm)
+        formats = {"str_offsets": "Q", "blob_offsets": "Q"}
+        self._arrays = {}
+        for name in SECTIONS[1:]:
+            if name in ("str_data", "blob_data", "nodes"):
+                continue
+            offset, length = sections[name]
+            self._arrays[name] = view[offset:offset + length].cast(formats.get(name, "I"))
+        self._str_offsets = self._arrays["str_offsets"]
+        self._refs = self._arrays["refs"]
+        self._id_index = self._arrays["id_index"]
+
+        self._strings: Dict[int, str] = {}
+        self._records: Dict[int, UANodeRecord] = {}
+
+    def _ensure_open(self) -> None:
+        if self._mm is None:
+            self._open()
+
+    def close(self) -> None:
+        """Unmaps the file. The snapshot gets mapped again on the next access."""
+        if self._mm is None:
+            return
+        for view in self._arrays.values():
+            view.release()
+        self._arrays = {}
+        self._view.release()
+        self._mm.close()
+        self._mm = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path, "token": self.token}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.path = state["path"]
+        self.token = state["token"]
+        self._mm = None
+
+    # Strings
+
+    def _raw_string(self, index: int) -> bytes:
+        start = self._str_data_offset + self._str_offsets[index]
+        end = self._str_data_offset + self._str_offsets[index + 1]
+        return self._mm[start:end]
+
+    def _string(self, index: int) -> Optional[str]:
+        if index == NONE:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            value = self._strings[index] = intern_str(self._raw_string(index).decode("utf-8"))
+        return value
+
+    def _string_index(self, value: str) -> Optional[int]:
+        """Returns the index of ``value`` in the string table by binary search or ``None``."""
+        key = value.encode("utf-8")
+        low, high = 0, len(self._str_offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._raw_string(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._str_offsets) - 1 and self._raw_string(low) == key:
+            return low
+        return None
+
+    # Nodes
+
+    def _node_values(self, index: int) -> Tuple[int, ...]:
+        return NODE_STRUCT.unpack_from(self._mm, self._nodes_offset + index * NODE_STRUCT.size)
+
+    def node(self, index: int) -> UANodeRecord:
+        """Returns the node at position ``index`` of the snapshot."""
+        self._ensure_open()
+        record = self._records.get(index)
+        if record is None:
+            record = self._records[index] = self.read_node(index)
+        return record
+
+    def read_node(self, index: int) -> UANodeRecord:
+        """Builds a new, uncached record for the node at position ``index``."""
+        self._ensure_open()
+        values = self._node_values(index)
+        record = UANodeRecord.__new__(UANodeRecord)
+        for name, string in zip(STRING_FIELDS, values):
+            setattr(record, name, self._string(string))
+
+        rank, eventnotifier, flags, first_ref, ref_count, blob_index = values[len(STRING_FIELDS):]
+        record.rank = rank
+        record.eventnotifier = eventnotifier
+        record.historizing = bool(flags & FLAG_HISTORIZING)
+        record.abstract = bool(flags & FLAG_ABSTRACT)
+        record.symmetric = bool(flags & FLAG_SYMMETRIC)
+
+        refs = self._refs
+        record.refs = [
+            UAReference(self._string(refs[3 * ref]), bool(refs[3 * ref + 2]), self._string(refs[3 * ref + 1]))
+            for ref in range(first_ref, first_ref + ref_count)
+        ]
+
+        for name, value in _blob_defaults().items():
+            setattr(record, name, value)
+        if blob_index != NONE:
+            blob_offsets = self._arrays["blob_offsets"]
+            start = self._blob_data_offset + blob_offsets[blob_index]
+            end = self._blob_data_offset + blob_offsets[blob_index + 1]
+            for name, value in pickle.loads(self._mm[start:end]).items():
+                setattr(record, name, value)
+        return record
+
+    def records(self) -> Iterator[UANodeRecord]:
+        """Yields new, uncached records of all nodes, e.g. to be modified by a ``NamespaceRemapper``."""
+        self._ensure_open()
+        for index in range(self._node_count):
+            yield self.read_node(index)
+
+    def scan(self) -> Iterator[Tuple[int, str, str]]:
+        """
+        Yields ``(position, NodeId, NodeClass)`` of all nodes in import order without building them.
+        Nodes hidden by an earlier node with the same NodeId are skipped.
+        """
+        self._ensure_open()
+        for index in range(self._node_count):
+            values = self._node_values(index)
+            if self._id_index[values[1]] != index:
+                continue
+            yield index, self._raw_string(values[1]).decode("utf-8"), self._string(values[0])
+
+    def _group(self, name: str, key: str) -> List[int]:
+        string = self._string_index(key)
+        if string is None:
+            return []
+        offsets = self._arrays[f"{name}_offsets"]
+        return list(self._arrays[f"{name}_values"][offsets[string]:offsets[string + 1]])
+
+    # Lookup API of UANodeStore
+
+    def index_of(self, node_id: str) -> Optional[int]:
+        """Returns the position of the node with the given NodeId or ``None``."""
+        self._ensure_open()
+        string = self._string_index(node_id)
+        if string is None or self._id_index[string] == NONE:
+            return None
+        return self._id_index[string]
+
+    def get(self, node_id: str) -> Optional[UANodeRecord]:
+        """Returns the node with the given NodeId or ``None``."""
+        index = self.index_of(node_id)
+        return None if index is None else self.node(index)
+
+    def find(self, browse_name: str, node_type: str) -> Optional[UANodeRecord]:
+        """Returns the node with the given BrowseName and NodeClass or ``None``."""
+        self._ensure_open()
+        for index in self._group("name", browse_name):
+            if self._string(self._node_values(index)[0]) == node_type:
+                return self.node(index)
+        return None
+
+    def children(self, parent_id: str) -> List[UANodeRecord]:
+        """Returns all nodes, which have ``parent_id`` set as parent."""
+        self._ensure_open()
+        return [self.node(index) for index in self._group("parent", parent_id)]
+
+    def references_to(self, target_id: str) -> List[Tuple[str, str, bool]]:
+        """
+        Returns all references pointing to ``target_id`` as ``(source NodeId, ReferenceType, IsForward)``.
+        """
+        self._ensure_open()
+        result = []
+        ref_sources = self._arrays["ref_sources"]
+        for ref in self._group("target", target_id):
+            source = self._string(self._node_values(ref_sources[ref])[1])
+            result.append((source, self._string(self._refs[3 * ref]), bool(self._refs[3 * ref + 2])))
+        return result
+
+    def __iter__(self) -> Iterator[UANodeRecord]:
+        self._ensure_open()
+        for index in range(self._node_count):
+            yield self.node(index)
+
+    def __len__(self) -> int:
+        self._ensure_open()
+        return self._node_count
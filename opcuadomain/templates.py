@@ -0,0 +1,74 @@
+"""
+Cache for jinja templates given as strings, like mapping options or string links.
+
+All templates get compiled by shared ``Environment`` objects, one per autoescape flag.
+Compiled templates are kept in a bounded LRU cache keyed by the template source and the
+autoescape flag, so the same template string used for thousands of nodes gets compiled only once.
+"""
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from jinja2 import BaseLoader, Environment, Template
+
+from opcuadomain.debug import cache_counters, measure_time
+
+DEFAULT_TEMPLATE_CACHE_SIZE = 512
+
+
+class TemplateCache:
+    """
+    Bounded LRU cache of compiled jinja templates.
+
+    Hits and misses get counted under ``jinja_templates`` by :func:`~opcuadomain.debug.cache_counters`.
+
+    :param max_size: maximum amount of cached templates
+    """
+
+    def __init__(self, max_size: int = DEFAULT_TEMPLATE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.environments: Dict[bool, Environment] = {
+            autoescape: Environment(loader=BaseLoader, autoescape=autoescape) for autoescape in (False, True)
+        }
+        self._templates: "OrderedDict[Tuple[str, bool], Template]" = OrderedDict()
+        self.stats = cache_counters("jinja_templates")
+
+    def get(self, source: str, autoescape: bool = True) -> Template:
+        """
+        Returns the compiled template for the given source.
+
+        :param source: jinja template string
+        :param autoescape: If true, the rendered variables get html escaped
+        :return: jinja Template
+        """
+        key = (source, autoescape)
+        template = self._templates.get(key)
+        if template is not None:
+            self.stats["hits"] += 1
+            self._templates.move_to_end(key)
+            return template
+
+        self.stats["misses"] += 1
+        template = self._compile(source, autoescape)
+        self._templates[key] = template
+        if len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+        return template
+
+    @measure_time("jinja")
+    def _compile(self, source: str, autoescape: bool) -> Template:
+        return self.environments[autoescape].from_string(source)
+
+    def clear(self) -> None:
+        """Drops all compiled templates."""
+        self._templates.clear()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
+def get_template(source: str, autoescape: bool = True) -> Template:
+    """Returns the compiled template for ``source`` from the shared :data:`TEMPLATE_CACHE`."""
+    return TEMPLATE_CACHE.get(source, autoescape)
@@ -7,18 +7,19 @@ from docutils import nodes
 
 from docutils.parsers.rst.states import RSTState
 from docutils.statemachine import StringList
-from jinja2 import Template
 from sphinx.application import Sphinx
 from sphinx.environment import BuildEnvironment
 from sphinx.util.nodes import nested_parse_with_titles
 
-from asyncua.common.xmlparser import NodeData
+from opcuadomain.records import UANodeRecord
 from asyncua.ua.object_ids import ObjectIds
 
 from opcuadomain.nodes import uanodes
 
 from opcuadomain.layout import build_need
 
+from opcuadomain.debug import measure_time
+
 from opcuadomain.logging import get_logger
 from opcuadomain.utils import unwrap
 
@@ -27,10 +28,15 @@ logger = get_logger(__name__)
 class UAPart(nodes.Inline, nodes.Element):
     pass
 
+def _uanode_span(app: Sphinx, state, data: UANodeRecord, docname: str, *args, **kwargs) -> dict:
+    return {"nodeid": data.nodeid, "docname": docname}
+
+
+@measure_time("uanode", span_args=_uanode_span)
 def add_uanode(
     app: Sphinx,
     state,
-    data: NodeData,
+    data: UANodeRecord,
     docname: str,
     lineno: int,
     content: str = "",
@@ -93,62 +99,8 @@ def add_uanode(
         if data.dimensions:
             additional_attribs["ArrayDimensions"] = data.dimensions
 
-    childs = opcua.find_child_nodes(data.nodeid)
-
-
-    # Hierarchical References
-    # [forward, ReferenceType, TargetId, NodeClass, Name, TypeDefinition, ModellingRule, DataType]
-    hierarchical_refs = []
-    for ref in data.refs:
-        if ref.reftype == "HasSubtype" or ref.reftype == "Organizes" or ref.reftype == "HasComponent":
-            hierarchical_refs.append({'Forward':ref.forward, 'ReferenceType':ref.reftype, 'TargetId': ref.target, 'NodeClass': "", 'Name': opcua.get_target_name(ref.target), 'TypeDefinition': "--", 'ModellingRule': "--", 'DataType': "--"})
-
-    for child in childs:
-        ModellingRule = ""
-        TypeDefinition = ""
-        DataType = ""
-        if child.datatype:
-            if re.match(r'i=|ns=', child.datatype):
-                DataType = opcua.get_target_name(child.datatype)
-            else:
-                DataType = child.datatype
-
-        # first find the non-hierarchical references
-        for ref in child.refs:
-            if ref.reftype == "HasModellingRule":
-                ModellingRule = opcua.get_target_name(ref.target)
-                #shorten the name
-                m = re.match(r'ModellingRule_(.+)', ModellingRule)
-                if m:
-                    ModellingRule = m.group(1)
-            if ref.reftype == "HasTypeDefinition":
-                TypeDefinition = opcua.get_target_name(ref.target)
-
-        for ref in child.refs:
-            if ref.reftype == "HasComponent" or ref.reftype == "HasProperty":
-                hierarchical_refs.append({'Forward': not ref.forward, 'ReferenceType':ref.reftype, 'TargetId': child.nodeid,  'NodeClass':child.nodetype, 'Name': child.browsename, 'TypeDefinition': TypeDefinition, 'ModellingRule': ModellingRule, 'DataType': DataType})
-    #hierarchical_refs = opcua.find_references_by_target(data.nodeid)
-                
-    non_hierarchical_refs = []
-    for ref in data.refs:
-        if ref.reftype == "HasModellingRule":
-            Target = opcua.get_target_name(ref.target)
-            #shorten the name
-            m = re.match(r'ModellingRule_(.+)', Target)
-            if m:
-                Target = m.group(1)
-            non_hierarchical_refs.append({'Forward':ref.forward, 'ReferenceType':ref.reftype, 'Target': Target, 'Target NodeId': ref.target})
-
-        if ref.reftype == "HasTypeDefinition":
-            Target = opcua.get_target_name(ref.target)
-
-            non_hierarchical_refs.append({'Forward':ref.forward, 'ReferenceType':ref.reftype, 'Target': Target, 'Target NodeId': ref.target})
-
-
-
-
-
-
+    # The reference rows are calculated once per node and model by the domain
+    hierarchical_refs, non_hierarchical_refs = opcua.get_reference_rows(data)
 
     #ua_references = data.refs    
 
@@ -172,6 +124,10 @@ def add_uanode(
 
     env.needs_all_needs[data.nodeid] = ua_info
 
+    if not is_external:
+        opcua.note_uanode(data, docname, data.nodeid)
+        opcua.note_dependencies(docname, data)
+
     if ua_info["is_external"]:
         return[]
     
@@ -298,6 +254,7 @@ def find_parts(node: nodes.Element) -> List[UAPart]:
             found_nodes += find_parts(child)
     return found_nodes
 
+@measure_time("uanode", span_args=lambda app, doctree, fromdocname: {"docname": fromdocname})
 def process_ua_nodes(app: Sphinx, doctree: nodes.document, fromdocname: str) -> None:
     """
     Finally creates the need-node in the docutils node-tree.
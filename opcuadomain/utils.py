@@ -7,14 +7,15 @@ from functools import reduce, wraps
 from re import Pattern
 from typing import Any, Dict, List, Optional, TypeVar, Union
 from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
 
 from docutils import nodes
-from jinja2 import BaseLoader, Environment, Template
 from matplotlib.figure import FigureBase
 from sphinx.application import BuildEnvironment, Sphinx
 
 from opcuadomain.defaults import UA_PROFILING
 from opcuadomain.logging import get_logger
+from opcuadomain.templates import get_template
 
 logger = get_logger(__name__)
 
@@ -113,14 +114,17 @@ def row_col_maker(
     row_col = nodes.entry(classes=["needs_" + need_key])
     para_col = nodes.paragraph()
 
-    needs_string_links_option: List[str] = []
-    for v in app.config.needs_string_links.values():
-        needs_string_links_option.extend(v["options"])
+    string_links = get_string_links(app)
+
+    link_list = []
+    for link_type in env.config.needs_extra_links:
+        link_list.append(link_type["option"])
+        link_list.append(link_type["option"] + "_back")
 
     if need_key in need_info and need_info[need_key] is not None:
         if isinstance(need_info[need_key], (list, set)):
             data = need_info[need_key]
-        elif isinstance(need_info[need_key], str) and need_key in needs_string_links_option:
+        elif isinstance(need_info[need_key], str) and need_key in string_links.options:
             data = re.split(r",|;", need_info[need_key])
             data = [i.strip() for i in data if len(i) != 0]
         else:
@@ -130,28 +134,8 @@ def row_col_maker(
             link_id = datum
             link_part = None
 
-            link_list = []
-            for link_type in env.config.needs_extra_links:
-                link_list.append(link_type["option"])
-                link_list.append(link_type["option"] + "_back")
-
             # For needs_string_links
-            link_string_list = {}
-            for link_name, link_conf in app.config.needs_string_links.items():
-                link_string_list[link_name] = {
-                    "url_template": Environment(loader=BaseLoader, autoescape=True).from_string(link_conf["link_url"]),
-                    "name_template": Environment(loader=BaseLoader, autoescape=True).from_string(
-                        link_conf["link_name"]
-                    ),
-                    "regex_compiled": re.compile(link_conf["regex"]),
-                    "options": link_conf["options"],
-                    "name": link_name,
-                }
-
-            matching_link_confs = []
-            for link_conf in link_string_list.values():
-                if need_key in link_conf["options"] and len(datum) != 0:
-                    matching_link_confs.append(link_conf)
+            matching_link_confs = string_links.get(need_key) if len(datum) != 0 else []
 
             if need_key in link_list and "." in datum:
                 link_id = datum.split(".")[0]
@@ -341,7 +325,7 @@ def jinja_parse(context: Dict, jinja_string: str) -> str:
 
     """
     try:
-        content_template = Template(jinja_string, autoescape=True)
+        content_template = get_template(jinja_string, autoescape=True)
     except Exception as e:
         raise ReferenceError(f'There was an error in the jinja statement: "{jinja_string}". ' f"Error Msg: {e}")
 
@@ -405,6 +389,55 @@ def dict_get(root, items, default=None) -> Any:
     return value
 
 
+class StringLinks:
+    """
+    Compiled ``needs_string_links`` configuration.
+
+    Regexes and jinja templates of all string links get compiled once per build, see
+    :func:`get_string_links`.
+
+    ``links`` is a dict of link name -> link conf, each link conf contains ``url_template``,
+    ``name_template``, ``regex_compiled``, ``options`` and ``name``, as expected by
+    :func:`match_string_link`.
+    """
+
+    def __init__(self, string_links_config: Dict[str, Dict[str, Any]]) -> None:
+        self.links: Dict[str, Dict[str, Any]] = {}
+        for link_name, link_conf in string_links_config.items():
+            self.links[link_name] = {
+                "url_template": get_template(link_conf["link_url"], autoescape=True),
+                "name_template": get_template(link_conf["link_name"], autoescape=True),
+                "regex_compiled": re.compile(link_conf["regex"]),
+                "options": link_conf["options"],
+                "name": link_name,
+            }
+
+        # option name -> list of matching link confs, in the order of the configuration
+        self.by_option: Dict[str, List[Dict[str, Any]]] = {}
+        for link_conf in self.links.values():
+            for option in link_conf["options"]:
+                matching_link_confs = self.by_option.setdefault(option, [])
+                if link_conf not in matching_link_confs:
+                    matching_link_confs.append(link_conf)
+        # All option names, which have at least one string link
+        self.options = set(self.by_option)
+
+    def get(self, option: str) -> List[Dict[str, Any]]:
+        """Returns the link confs of all string links, which are configured for ``option``."""
+        return self.by_option.get(option, [])
+
+
+_string_links: "WeakKeyDictionary[Sphinx, StringLinks]" = WeakKeyDictionary()
+
+
+def get_string_links(app: Sphinx) -> StringLinks:
+    """Returns the compiled string links of the current build."""
+    string_links = _string_links.get(app)
+    if string_links is None:
+        string_links = _string_links[app] = StringLinks(app.config.needs_string_links)
+    return string_links
+
+
 def match_string_link(
     text_item: str, data: str, need_key: str, matching_link_confs: List[Dict], render_context: Dict[str, Any]
 ) -> Any:
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import shutil
+import socket
+import sys
+import threading
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pytest
+
+TESTS_DIR = Path(__file__).parent
+REPO_DIR = TESTS_DIR.parent
+NODESET_DIR = TESTS_DIR / "nodesets"
+DOC_TESTS_DIR = TESTS_DIR / "doc_tests"
+
+# The domain imports some of its modules by their top-level name, like the conf.py of the doc tests
+sys.path.insert(0, str(REPO_DIR))
+sys.path.append(str(REPO_DIR / "opcuadomain"))
+
+CONF_PY = f"""
+import sys
+sys.path.append({str(REPO_DIR / "opcuadomain")!r})
+project = "test"
+extensions = ["opcuadomain"]
+"""
+
+
+@pytest.fixture
+def nodeset_dir() -> Path:
+    return NODESET_DIR
+
+
+def write_project(project_dir: Path, pages: Dict[str, str], nodesets=(), conf: str = "") -> Path:
+    """
+    Creates a Sphinx project with the given pages, docname -> rst content, and copies the given nodesets
+    of ``tests/nodesets`` into it.
+    """
+    project_dir.mkdir(parents=True, exist_ok=True)
+    (project_dir / "conf.py").write_text(CONF_PY + conf, encoding="utf-8")
+    for name in nodesets:
+        shutil.copy(NODESET_DIR / name, project_dir / name)
+    for docname, content in pages.items():
+        path = project_dir / f"{docname}.rst"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return project_dir
+
+
+def make_app(project_dir: Path, buildername: str = "html", freshenv: bool = False,
+             parallel: int = 0, confoverrides: Optional[Dict[str, Any]] = None):
+    from sphinx.application import Sphinx
+
+    return Sphinx(
+        str(project_dir),
+        str(project_dir),
+        str(project_dir / "_build" / buildername),
+        str(project_dir / "_build" / "doctrees"),
+        buildername,
+        confoverrides=confoverrides,
+        status=StringIO(),
+        warning=StringIO(),
+        freshenv=freshenv,
+        parallel=parallel,
+    )
+
+
+def build(project_dir: Path, **kwargs: Any):
+    """Builds the project incrementally and returns the application."""
+    app = make_app(project_dir, **kwargs)
+    app.build()
+    return app
+
+
+def read_html(project_dir: Path, docname: str, buildername: str = "html") -> str:
+    return (project_dir / "_build" / buildername / f"{docname}.html").read_text(encoding="utf-8")
+
+
+class NodesetServer:
+    """
+    asyncua server, which serves nodesets on a free local port.
+
+    The server runs in the event loop of a background thread, so that it can be used by builds, which
+    run their own event loops. :meth:`call` runs a coroutine function with the server in that loop.
+    """
+
+    def __init__(self, *paths: Path) -> None:
+        self.paths = paths
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.server = None
+        self.url = None
+        self.running = False
+
+    def call(self, func):
+        return asyncio.run_coroutine_threadsafe(func(self.server), self.loop).result()
+
+    async def _start(self, _server) -> None:
+        from asyncua import Server
+        from asyncua.common.xmlimporter import XmlImporter
+
+        class NodesetImporter(XmlImporter):
+            # The models of the bundled nodesets require each other, which the check of asyncua does not allow
+            async def _check_required_models(self, xmlpath=None, xmlstring=None):
+                return None
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.url = f"opc.tcp://127.0.0.1:{s.getsockname()[1]}/"
+        self.server = Server()
+        await self.server.init()
+        self.server.set_endpoint(self.url)
+        for path in self.paths:
+            await NodesetImporter(self.server).import_xml(str(path))
+        await self.server.start()
+        self.running = True
+
+    def start(self) -> None:
+        self.thread.start()
+        self.call(self._start)
+
+    def stop(self) -> None:
+        if self.running:
+            self.call(lambda server: server.stop())
+            self.running = False
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@pytest.fixture
+def nodeset_server():
+    """Server serving ``WDS_Nodeset.xml``, the test gets skipped if it can not be started."""
+    server = NodesetServer(NODESET_DIR / "WDS_Nodeset.xml")
+    try:
+        server.start()
+    except OSError as e:
+        server.stop()
+        pytest.skip(f"Could not start a local server: {e}")
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def _clean_cwd(tmp_path, monkeypatch):
+    # Caches default to directories below the build dirs, keep everything else in the test's tmp dir
+    monkeypatch.chdir(tmp_path)
+    yield
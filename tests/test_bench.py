@@ -0,0 +1,61 @@
+import json
+import sys
+
+import pytest
+
+from conftest import NODESET_DIR, REPO_DIR
+
+sys.path.append(str(REPO_DIR / "benchmarks"))
+
+import bench  # noqa: E402
+
+
+def write_results(path, **metrics):
+    data = {
+        "format": bench.RESULT_FORMAT,
+        "metrics": {
+            name: {"value": value, "unit": "s" if lower_is_better else "ops/s", "lower_is_better": lower_is_better}
+            for name, (value, lower_is_better) in metrics.items()
+        },
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_compare_gates_regressions(tmp_path, capsys):
+    baseline = write_results(tmp_path / "baseline.json", parse=(1.0, True), lookups=(1000.0, False))
+
+    faster = write_results(tmp_path / "faster.json", parse=(0.5, True), lookups=(2000.0, False))
+    assert bench.main(["compare", baseline, faster]) == 0
+
+    # Within the threshold
+    slower = write_results(tmp_path / "slower.json", parse=(1.1, True), lookups=(900.0, False))
+    assert bench.main(["compare", baseline, slower]) == 0
+    assert bench.main(["compare", baseline, slower, "--threshold", "0.05"]) == 1
+
+    # Fewer lookups per second are a regression as well
+    fewer = write_results(tmp_path / "fewer.json", parse=(1.0, True), lookups=(500.0, False))
+    assert bench.main(["compare", baseline, fewer]) == 1
+    assert "lookups" in capsys.readouterr().out.splitlines()[-1]
+
+    old_format = tmp_path / "old.json"
+    old_format.write_text(json.dumps({"format": 0, "metrics": {}}), encoding="utf-8")
+    with pytest.raises(SystemExit):
+        bench.main(["compare", str(old_format), faster])
+
+
+def test_run_writes_results(tmp_path):
+    output = tmp_path / "results.json"
+    args = [
+        "run", "-o", str(output), "--nodeset", str(NODESET_DIR / "uaNodesGIM.xml"), "--repeat", "1",
+        "--sample", "5", "--skip-doc-basic", "--skip-browse",
+    ]
+    assert bench.main(args) == 0
+
+    data = json.loads(output.read_text(encoding="utf-8"))
+    assert data["nodesets"]["uaNodesGIM.xml"]["nodes"] == 75
+    for metric in ("parse", "import", "build", "add_uanode", "render", "find_uanode_by_id", "peak_memory"):
+        assert f"uaNodesGIM.xml/{metric}" in data["metrics"]
+
+    # A result file compared against itself never regresses
+    assert bench.main(["compare", str(output), str(output)]) == 0
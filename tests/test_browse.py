@@ -0,0 +1,64 @@
+import asyncio
+
+from asyncua import Client
+
+from conftest import NODESET_DIR
+
+from opcuadomain.browse import ServerBrowser, browse_model
+from opcuadomain.nodeset import read_nodesets
+
+WDS_NODESET = str(NODESET_DIR / "WDS_Nodeset.xml")
+
+
+def qualified(namespaces, value):
+    """Replaces the namespace index of a NodeId or BrowseName by the namespace uri."""
+    if value is None:
+        return None
+    if value.startswith("ns="):
+        index, rest = value[3:].split(";", 1)
+        return namespaces[int(index) - 1], rest
+    index, sep, name = value.partition(":")
+    if sep and index.isdigit() and index != "0":
+        return namespaces[int(index) - 1], name
+    return None, value
+
+
+def node_key(namespaces, ua_node):
+    return (
+        qualified(namespaces, ua_node.nodeid),
+        ua_node.nodetype,
+        qualified(namespaces, ua_node.browsename),
+        ua_node.displayname,
+        qualified(namespaces, ua_node.parent),
+    )
+
+
+async def server_nodes(server):
+    """Returns the NodeIds of the server namespaces as (uri, identifier), which the server holds."""
+    namespaces = await server.get_namespace_array()
+    return {
+        (namespaces[node_id.NamespaceIndex], node_id.to_string().split(";", 1)[1])
+        for node_id in server.iserver.aspace.keys() if node_id.NamespaceIndex != 0
+    }
+
+
+async def browse(url):
+    async with Client(url) as client:
+        browser = ServerBrowser(client, batch_size=50)
+        return await browse_model(browser), browser.request_count
+
+
+def test_browse_model_equals_xml_import(nodeset_server):
+    model, request_count = asyncio.run(browse(nodeset_server.url))
+    namespaces, _aliases, xml_nodes = read_nodesets([WDS_NODESET], 1)[0]
+
+    # asyncua creates the DataTypeEncodings on its own, instead of importing the ones of the nodeset
+    held = nodeset_server.call(server_nodes)
+    imported = [ua_node for ua_node in xml_nodes if qualified(namespaces, ua_node.nodeid) in held]
+    assert len(imported) > 300
+
+    assert model.namespaces == namespaces
+    assert sorted(node_key(model.namespaces, ua_node) for ua_node in model.nodes) == sorted(
+        node_key(namespaces, ua_node) for ua_node in imported
+    )
+    assert request_count > 0
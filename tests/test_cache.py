@@ -0,0 +1,60 @@
+import os
+import shutil
+
+from opcuadomain.cache import CACHE_SUFFIX, NodesetCache
+from opcuadomain.nodeset import read_nodeset
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(CACHE_SUFFIX))
+
+
+def test_hit_and_miss(nodeset_dir, tmp_path):
+    path = tmp_path / "WDS_Nodeset.xml"
+    shutil.copy(nodeset_dir / "WDS_Nodeset.xml", path)
+    cache = NodesetCache(str(tmp_path / "cache"), 1 << 30)
+
+    assert cache.load(str(path)) is None
+    namespaces, aliases, ua_nodes = read_nodeset(str(path))
+    cache.store(str(path), (namespaces, aliases, ua_nodes))
+
+    cached_namespaces, cached_aliases, cached_nodes = cache.load(str(path))
+    assert cached_namespaces == namespaces
+    assert cached_aliases == aliases
+    assert [n.content_hash() for n in cached_nodes] == [n.content_hash() for n in ua_nodes]
+
+    # A changed file misses and storing it replaces the outdated entry
+    path.write_text(path.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    assert cache.load(str(path)) is None
+    old_entries = entries(tmp_path / "cache")
+    cache.store(str(path), (namespaces, aliases, ua_nodes))
+    assert len(entries(tmp_path / "cache")) == 1
+    assert entries(tmp_path / "cache") != old_entries
+    assert cache.load(str(path)) is not None
+
+
+def test_least_recently_used_entries_get_evicted(nodeset_dir, tmp_path):
+    data = read_nodeset(str(nodeset_dir / "WDS_Nodeset.xml"))
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.xml"
+        shutil.copy(nodeset_dir / "WDS_Nodeset.xml", path)
+        paths.append(str(path))
+
+    cache_dir = tmp_path / "cache"
+    cache = NodesetCache(str(cache_dir), 1 << 30)
+    for age, path in enumerate(paths[:2]):
+        cache.store(path, data)
+        (entry,) = [name for name in entries(cache_dir) if name.startswith(cache._path_key(path))]
+        os.utime(cache_dir / entry, (1000 + age, 1000 + age))
+    entry_size = os.path.getsize(cache_dir / entries(cache_dir)[0])
+
+    # Loading "a" marks it as used, so "b" is the least recently used entry now
+    assert cache.load(paths[0]) is not None
+
+    small = NodesetCache(str(cache_dir), int(entry_size * 2.5))
+    small.store(paths[2], data)
+    assert len(entries(cache_dir)) == 2
+    assert small.load(paths[1]) is None
+    assert small.load(paths[0]) is not None
+    assert small.load(paths[2]) is not None
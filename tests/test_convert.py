@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+from conftest import NODESET_DIR, REPO_DIR
+
+from opcuadomain.nodeset import read_nodesets
+from opcuadomain.nodestore import NamespaceRemapper, UANodeStore, build_namespace_table
+from opcuadomain.snapshot import UASnapshot
+
+NODESETS = [str(NODESET_DIR / "WDS_Nodeset.xml"), str(NODESET_DIR / "uaNodesGIM.xml")]
+
+
+def import_nodesets(paths):
+    """Merges the nodesets the same way as ``uaimport``."""
+    namespaces = []
+    store = UANodeStore()
+    for path, (ua_namespaces, _ua_aliases, ua_nodes) in zip(paths, read_nodesets(paths, 1)):
+        store.add_remapped(path, ua_nodes, NamespaceRemapper(build_namespace_table(namespaces, ua_namespaces)))
+    return namespaces, store
+
+
+def test_cli_writes_snapshot_equal_to_xml_import(tmp_path):
+    snapshot_path = tmp_path / "model.uasnap"
+    # Only the repository is on the path, like for an installed package
+    env = {**os.environ, "PYTHONPATH": str(REPO_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-m", "opcuadomain.convert", *NODESETS, "-o", str(snapshot_path), "-j", "1"],
+        cwd=tmp_path, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    namespaces, store = import_nodesets(NODESETS)
+    snapshot = UASnapshot(str(snapshot_path))
+    try:
+        assert result.stdout.strip() == f"Wrote {len(store)} nodes to {snapshot_path}."
+        assert snapshot.namespaces == namespaces
+        assert len(snapshot) == len(store)
+        for ua_node in store:
+            snapshot_node = snapshot.get(ua_node.nodeid)
+            assert snapshot_node.content_hash() == ua_node.content_hash(), ua_node.nodeid
+            assert snapshot_node.parent == ua_node.parent
+        for parent_id in ("ns=1;i=6", "i=85"):
+            assert [n.nodeid for n in snapshot.children(parent_id)] == [n.nodeid for n in store.children(parent_id)]
+    finally:
+        snapshot.close()
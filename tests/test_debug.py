@@ -0,0 +1,116 @@
+import json
+
+from conftest import build, write_project
+
+from opcuadomain import debug
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+
+def test_measurements_use_given_name(monkeypatch):
+    monkeypatch.setattr(debug, "EXECUTE_TIME_MEASUREMENTS", True)
+    monkeypatch.setattr(debug, "TIME_MEASUREMENTS", {})
+
+    def run():
+        return 1
+
+    first = debug.measure_time("test", name="First.run")(run)
+    second = debug.measure_time("test", name="Second.run")(run)
+    first()
+    first()
+    second()
+
+    assert debug.TIME_MEASUREMENTS["test_First.run"].amount == 2
+    assert debug.TIME_MEASUREMENTS["test_Second.run"].amount == 1
+    assert "test_run" not in debug.TIME_MEASUREMENTS
+
+
+def test_build_phases(tmp_path):
+    project = write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"])
+    confoverrides = {"opcua_time_measurements": True}
+
+    build(project, confoverrides=confoverrides)
+    assert list(debug.PHASE_MEASUREMENTS) == ["init", "read", "pickle", "consistency", "write"]
+    assert "import_UAImportDirective.run" in debug.TIME_MEASUREMENTS
+
+    # Without read documents, the environment is neither pickled nor checked
+    (project / "_build" / "html" / "index.html").unlink()
+    build(project, confoverrides=confoverrides)
+    assert list(debug.PHASE_MEASUREMENTS) == ["init", "read", "write"]
+
+
+def test_build_trace(tmp_path, monkeypatch):
+    # A failing build would leave tracing switched on, the attribute gets restored after the test
+    monkeypatch.setattr(debug, "TRACE_EVENTS", None)
+    project = write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"])
+
+    build(project, confoverrides={"opcua_trace": True})
+    trace = json.loads((project / "_build" / "html" / "opcua_trace.json").read_text(encoding="utf-8"))
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in spans)
+    assert [event["name"] for event in spans if event["cat"] == "phase"] == [
+        "init", "read", "pickle", "consistency", "write"
+    ]
+    (add_uanode,) = [event for event in spans if event["name"] == "add_uanode"]
+    assert add_uanode["args"] == {"nodeid": "ns=1;i=6", "docname": "index"}
+    assert {"build_need", "UAImportDirective.run", "index"} <= {event["name"] for event in spans}
+    (merge,) = [event for event in spans if event["name"] == "merge"]
+    assert merge["cat"] == "import"
+    assert merge["args"]["nodeset"] == str(project / "WDS_Nodeset.xml")
+    assert trace["otherData"]["dropped_events"] == 0
+
+    # The ring buffer keeps the newest spans only
+    build(project, freshenv=True, confoverrides={"opcua_trace": True, "opcua_trace_max_events": 3})
+    trace = json.loads((project / "_build" / "html" / "opcua_trace.json").read_text(encoding="utf-8"))
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(spans) == 3
+    assert spans[-1]["name"] == "write"
+    assert trace["otherData"]["dropped_events"] == trace["otherData"]["recorded_events"] - 3
+    assert trace["otherData"]["dropped_events"] > 0
+
+
+def test_measurement_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(debug, "EXECUTE_TIME_MEASUREMENTS", False)
+    project = write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"])
+
+    build(project, confoverrides={"opcua_time_measurements": True, "opcua_memory_measurements": True})
+    outdir = project / "_build" / "html"
+    report = json.loads((outdir / "debug_measurement.json").read_text(encoding="utf-8"))
+
+    assert list(report["phases"]) == ["init", "read", "pickle", "consistency", "write"]
+    assert all(phase["memory_peak"] >= phase["memory_current"] for phase in report["phases"].values())
+    assert {(node["function"], node["nodeid"]) for node in report["slowest_nodes"]} == {
+        ("add_uanode", "ns=1;i=6"), ("build_need", "ns=1;i=6")
+    }
+    assert "ua_attributes" in [result["name"] for result in report["layout_functions"]]
+    assert report["caches"]["name_resolver"]["hit_rate"] > 0
+
+    # The report has no external assets, it gets rendered without sphinx_needs
+    html = (outdir / "debug_measurement.html").read_text(encoding="utf-8")
+    assert "ns=1;i=6" in html
+    assert "src=" not in html and "<link" not in html
+
+
+def test_zero_runtimes_count_into_the_lowest_bucket():
+    histogram = debug.TimeHistogram("run", "test", "", lambda: None)
+    for runtime in (0.0, 0.0, 0.0, 0.3):
+        histogram.add(runtime, (), {})
+
+    assert histogram.buckets[0] == 3
+    assert sum(histogram.buckets) == 4
+    assert histogram.percentile(50) == histogram.bucket_bound(0)
+    assert histogram.percentile(100) == 0.3
+
+    # Bucket bounds are at most 1/8 above the counted runtime
+    histogram = debug.TimeHistogram("run", "test", "", lambda: None)
+    for runtime in (1e-6, 0.001, 0.7, 3.0):
+        histogram.add(runtime, (), {})
+        index = max(index for index, bucket in enumerate(histogram.buckets) if bucket)
+        assert runtime < histogram.bucket_bound(index) <= runtime * 1.125
@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+
+from opcuadomain.nodeset import read_nodeset
+from opcuadomain.nodestore import UANodeStore, nodeid_namespace
+
+sys.path.append(str(REPO_DIR / "benchmarks"))
+
+from generate import NAMESPACE_TEMPLATE, generate_nodeset  # noqa: E402
+
+
+@pytest.mark.parametrize("nodes, namespaces", [(10, 1), (1000, 1), (2500, 3)])
+def test_generated_nodesets_have_the_exact_size(tmp_path, nodes, namespaces):
+    path = tmp_path / "synthetic.xml"
+    assert generate_nodeset(str(path), nodes, namespaces=namespaces, seed=1) == nodes
+
+    uris, _aliases, ua_nodes = read_nodeset(str(path))
+    assert len(ua_nodes) == nodes
+    assert uris == [NAMESPACE_TEMPLATE.format(index) for index in range(1, namespaces + 1)]
+    assert {nodeid_namespace(ua_node.nodeid) for ua_node in ua_nodes} == set(range(1, namespaces + 1))
+
+    # All parents are part of the nodeset or the core namespace
+    store = UANodeStore(ua_nodes)
+    assert len(store.by_id) == nodes
+    for ua_node in ua_nodes:
+        assert ua_node.parent is None or ua_node.parent.startswith("i=") or store.get(ua_node.parent) is not None
+
+
+def test_generator_is_deterministic(tmp_path):
+    first, second, other = tmp_path / "first.xml", tmp_path / "second.xml", tmp_path / "other.xml"
+    generate_nodeset(str(first), 2000, namespaces=2, seed=7)
+    generate_nodeset(str(second), 2000, namespaces=2, seed=7)
+    generate_nodeset(str(other), 2000, namespaces=2, seed=8)
+
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+    with pytest.raises(ValueError):
+        generate_nodeset(str(tmp_path / "small.xml"), 3, namespaces=2)
@@ -0,0 +1,74 @@
+from conftest import make_app, read_html, write_project
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+   base
+   order
+   other
+"""
+
+BASE = """
+Base
+====
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+ORDER = """
+Order
+=====
+
+.. opcua:uanode:: 2:SetOrder UAMethod
+"""
+
+OTHER = """
+Other
+=====
+
+Nothing about nodes.
+"""
+
+
+def build_and_record(project):
+    """Builds the project and returns the app and the docnames, which got read."""
+    app = make_app(project)
+    docnames = []
+    app.connect("source-read", lambda app, docname, source: docnames.append(docname))
+    app.build()
+    return app, sorted(docnames)
+
+
+def test_changed_nodeset_rereads_dependent_docs_only(tmp_path):
+    project = write_project(
+        tmp_path / "project", {"index": INDEX, "base": BASE, "order": ORDER, "other": OTHER}, ["WDS_Nodeset.xml"]
+    )
+    _app, docnames = build_and_record(project)
+    assert docnames == ["base", "index", "order", "other"]
+
+    # A touched but unchanged nodeset does not re-read anything
+    nodeset = project / "WDS_Nodeset.xml"
+    nodeset.write_text(nodeset.read_text(encoding="utf-8"), encoding="utf-8")
+    _app, docnames = build_and_record(project)
+    assert docnames == []
+
+    method = '<UAMethod NodeId="ns=2;i=7001" BrowseName="2:SetOrder" ParentNodeId="ns=2;i=1000">'
+    content = nodeset.read_text(encoding="utf-8")
+    nodeset.write_text(
+        content.replace(f"{method}\n        <DisplayName>SetOrder<", f"{method}\n        <DisplayName>SetNewOrder<"),
+        encoding="utf-8",
+    )
+    app, docnames = build_and_record(project)
+    # The importing document gets read as well, so the updated model gets stored
+    assert docnames == ["index", "order"]
+    assert "SetNewOrder" in read_html(project, "order")
+
+    opcua = app.env.get_domain("opcua")
+    assert opcua.find_uanode_by_id("ns=2;i=7001").displayname == "SetNewOrder"
+    assert "ns=2;i=7001" in opcua.data["UADependencies"]["order"]
+    assert "ns=2;i=7001" not in opcua.data["UADependencies"]["base"]
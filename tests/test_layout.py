@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import build, write_project
+
+from opcuadomain.layout import LayoutHandler, SphinxNeedLayoutException, compile_grids
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+
+@pytest.fixture()
+def app(tmp_path):
+    return build(write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"]))
+
+
+def test_grids_get_resolved():
+    grid_funcs = compile_grids(LayoutHandler)
+
+    assert grid_funcs.keys() == LayoutHandler.grids.keys()
+    assert grid_funcs["detailed"] == (LayoutHandler._grid_detailed, {})
+    assert grid_funcs["simple_footer"][1]["footer"] is True
+
+
+def test_unknown_grid_method_fails_on_compile():
+    class BrokenHandler(LayoutHandler):
+        grids = {"simple": "_grid_simpel"}
+
+    with pytest.raises(SphinxNeedLayoutException, match="_grid_simpel"):
+        compile_grids(BrokenHandler)
+
+
+def test_unknown_layout_function_fails_on_compile(app):
+    handler = LayoutHandler(app, {"id": "test", "docname": "index"}, "detailed", None)
+
+    plan = handler._compile_line('**<<meta("title")>>**')
+    assert plan[0][2][0][1][0][1][0] == "meta"
+
+    with pytest.raises(SphinxNeedLayoutException, match="mta"):
+        handler._compile_line('**<<mta("title")>>**')
+
+
+def test_handlers_parse_into_own_documents(app):
+    first = LayoutHandler(app, {"id": "first", "docname": "index"}, "detailed", None)
+    second = LayoutHandler(app, {"id": "second", "docname": "index"}, "detailed", None)
+
+    assert first.doc_settings is second.doc_settings
+    assert first.dummy_doc is not second.dummy_doc
+
+    first._parse("`target <https://example.org>`_")
+    assert "target" in first.dummy_doc.nameids
+    assert first.dummy_doc.ids
+
+    assert not second.dummy_doc.nameids
+    assert not second.dummy_doc.ids
@@ -0,0 +1,40 @@
+import pytest
+from asyncua.common.xmlparser import XMLParser
+
+from opcuadomain.nodeset import NodesetReader, read_nodeset, read_nodesets
+from opcuadomain.records import UANodeRecord
+
+
+def _values(ua_node):
+    return tuple(getattr(ua_node, name) for name in UANodeRecord.__slots__)
+
+
+@pytest.mark.parametrize("name", ["WDS_Nodeset.xml", "uaNodesGIM.xml", "Opc.Ua.NodeSet2.xml"])
+def test_read_nodeset_equals_xmlparser(nodeset_dir, name):
+    path = str(nodeset_dir / name)
+    namespaces, aliases, ua_nodes = read_nodeset(path)
+
+    parser = XMLParser()
+    parser.parse_sync(path)
+    expected = [UANodeRecord.from_node_data(node_data) for node_data in parser.get_node_datas()]
+
+    assert namespaces == parser.get_used_namespaces()
+    assert aliases == parser.get_aliases()
+    assert [_values(ua_node) for ua_node in ua_nodes] == [_values(ua_node) for ua_node in expected]
+
+
+def test_reader_collects_namespaces_while_iterating(nodeset_dir):
+    reader = NodesetReader(str(nodeset_dir / "WDS_Nodeset.xml"))
+    assert reader.get_used_namespaces() == []
+    ua_nodes = list(reader)
+    assert len(ua_nodes) == 322
+    assert reader.get_used_namespaces()
+    assert all(isinstance(ua_node, UANodeRecord) for ua_node in ua_nodes)
+
+
+def test_read_nodesets_keeps_order(nodeset_dir):
+    paths = [str(nodeset_dir / "WDS_Nodeset.xml"), str(nodeset_dir / "uaNodesGIM.xml")]
+    serial = read_nodesets(paths, 1)
+    parallel = read_nodesets(paths, 2)
+    assert [len(nodes) for _, _, nodes in parallel] == [322, 75]
+    assert [[_values(n) for n in nodes] for _, _, nodes in parallel] == [[_values(n) for n in nodes] for _, _, nodes in serial]
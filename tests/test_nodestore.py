@@ -0,0 +1,73 @@
+from opcuadomain.nodeset import read_nodeset
+from opcuadomain.nodestore import UANodeStore, nodeid_namespace
+from opcuadomain.records import UANodeRecord, UAReference
+
+
+def make_node(node_id, browse_name, node_type="UAObject", parent=None, refs=()):
+    ua_node = UANodeRecord()
+    ua_node.nodeid = node_id
+    ua_node.browsename = browse_name
+    ua_node.nodetype = node_type
+    ua_node.parent = parent
+    ua_node.refs = [UAReference(*ref) for ref in refs]
+    return ua_node
+
+
+def test_lookups_equal_linear_search(nodeset_dir):
+    _namespaces, _aliases, ua_nodes = read_nodeset(str(nodeset_dir / "WDS_Nodeset.xml"))
+    store = UANodeStore(ua_nodes)
+    assert len(store) == len(ua_nodes)
+
+    for ua_node in ua_nodes:
+        assert store.get(ua_node.nodeid) is next(n for n in ua_nodes if n.nodeid == ua_node.nodeid)
+        assert store.find(ua_node.browsename, ua_node.nodetype) is next(
+            n for n in ua_nodes if n.browsename == ua_node.browsename and n.nodetype == ua_node.nodetype
+        )
+        assert store.children(ua_node.nodeid) == [n for n in ua_nodes if n.parent == ua_node.nodeid]
+
+    assert store.get("ns=1;i=999999") is None
+    assert store.find("1:Unknown", "UAObject") is None
+
+    objects = list(store.select(namespace_index=1, node_classes=["UAObjectType"]))
+    assert objects == [n for n in ua_nodes if n.nodetype == "UAObjectType" and nodeid_namespace(n.nodeid) == 1]
+
+
+def test_first_node_wins_and_sources_get_replaced():
+    first = make_node("ns=1;i=1", "1:Node")
+    second = make_node("ns=1;i=1", "1:Node")
+    child = make_node("ns=1;i=2", "1:Child", parent="ns=1;i=1", refs=[("i=47", False, "ns=1;i=1")])
+
+    store = UANodeStore()
+    store.add_source("a", [first])
+    store.add_source("b", [second, child])
+    assert store.get("ns=1;i=1") is first
+    assert store.find("1:Node", "UAObject") is first
+    assert store.children("ns=1;i=1") == [child]
+    assert store.references_to("ns=1;i=1") == [("ns=1;i=2", "i=47", False)]
+
+    # The indices get rebuilt without the removed nodes
+    store.remove_source("a")
+    assert store.get("ns=1;i=1") is second
+    assert len(store) == 2
+
+    store.add_source("b", [child])
+    assert store.get("ns=1;i=1") is None
+    assert store.children("ns=1;i=1") == [child]
+
+
+def test_select_restricted_to_sources():
+    node = make_node("ns=1;i=1", "1:Node")
+    duplicate = make_node("ns=1;i=1", "1:Node")
+    child = make_node("ns=1;i=2", "1:Child", parent="ns=1;i=1")
+    foreign_child = make_node("ns=1;i=3", "1:Foreign", parent="ns=1;i=1")
+    grandchild = make_node("ns=1;i=4", "1:Grandchild", parent="ns=1;i=3")
+
+    store = UANodeStore()
+    store.add_source("a", [node, child, grandchild])
+    store.add_source("b", [duplicate, foreign_child])
+
+    assert list(store.select(sources=["b", "a"])) == [duplicate, foreign_child, child, grandchild]
+    assert list(store.select(sources=["a"])) == [node, child, grandchild]
+    # Subtrees get walked along the nodes of the given sources only
+    assert [n.nodeid for n in store.select(root_id="ns=1;i=1", sources=["a"])] == ["ns=1;i=1", "ns=1;i=2"]
+    assert list(store.select(root_id="ns=1;i=3", sources=["a"])) == []
@@ -0,0 +1,85 @@
+import os
+import re
+
+import pytest
+from sphinx.util.parallel import parallel_available
+
+from conftest import build, read_html, write_project
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+{toctree}
+"""
+
+GIM_PAGE = """
+GIM
+===
+
+.. opcua:uaimport:: uaNodesGIM.xml
+
+.. opcua:uanode:: 5:ChannelCount UAVariable
+"""
+
+NODES = [
+    "1:PackMLBaseObjectType UAObjectType",
+    "2:WDS_PackML_Base UAObjectType",
+    "2:WDS_currentOrder UADataType",
+    "2:SetOrder UAMethod",
+    "3:WDS_APL781_01 UAObject",
+    "5:ChannelCount UAVariable",
+]
+
+
+def make_pages():
+    # Read last, so that the namespace indices of the WDS nodeset are not shifted
+    pages = {"zgim": GIM_PAGE}
+    for number, node in enumerate(NODES):
+        pages[f"page{number}"] = f"Page {number}\n=======\n\n.. opcua:uanode:: {node}\n"
+    pages["index"] = INDEX.format(toctree="\n".join(f"   {docname}" for docname in pages))
+    return pages
+
+
+def normalized_html(project, docname):
+    # The ids of the node containers are random
+    return re.sub(r"SNCB-\w+", "SNCB", read_html(project, docname))
+
+
+def opcua_state(app):
+    opcua = app.env.get_domain("opcua")
+    return (
+        opcua.data["UANamespaces"],
+        sorted((os.path.basename(source), docnames) for source, docnames in opcua.data["UAImports"].items()),
+        sorted(opcua.data["UAObjects"].items()),
+        {docname: sorted(node_ids) for docname, node_ids in opcua.data["UADependencies"].items()},
+        len(opcua.data["UANodes"]),
+    )
+
+
+@pytest.mark.skipif(not parallel_available, reason="Parallel builds are not available")
+def test_parallel_build_equals_serial_build(tmp_path):
+    pages = make_pages()
+    serial_project = write_project(tmp_path / "serial", pages, ["WDS_Nodeset.xml", "uaNodesGIM.xml"])
+    parallel_project = write_project(tmp_path / "parallel", pages, ["WDS_Nodeset.xml", "uaNodesGIM.xml"])
+
+    serial = build(serial_project)
+    parallel = build(parallel_project, parallel=4)
+    # Parallel readers report chunks of documents
+    assert "index .. page0" in parallel._status.getvalue()
+    assert opcua_state(parallel) == opcua_state(serial)
+    for docname in pages:
+        assert normalized_html(parallel_project, docname) == normalized_html(serial_project, docname)
+
+    # Incremental parallel rebuild after a change of a document
+    for project in (serial_project, parallel_project):
+        (project / "page0.rst").write_text("Page 0\n======\n\nNo nodes anymore.\n", encoding="utf-8")
+    serial = build(serial_project)
+    parallel = build(parallel_project, parallel=4)
+    assert opcua_state(parallel) == opcua_state(serial)
+    for docname in pages:
+        assert normalized_html(parallel_project, docname) == normalized_html(serial_project, docname)
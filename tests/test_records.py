@@ -0,0 +1,32 @@
+import pickle
+
+from asyncua.common.xmlparser import XMLParser
+
+from opcuadomain.nodeset import read_nodeset
+from opcuadomain.records import UANodeRecord
+
+
+def test_records_are_compact_and_round_trip(nodeset_dir):
+    path = str(nodeset_dir / "WDS_Nodeset.xml")
+    _namespaces, _aliases, ua_nodes = read_nodeset(path)
+
+    assert not any(hasattr(ua_node, "__dict__") for ua_node in ua_nodes)
+    assert not hasattr(ua_nodes[0], "value")
+
+    # Equal NodeIds share one string object
+    by_id = {ua_node.nodeid: ua_node for ua_node in ua_nodes}
+    for ua_node in ua_nodes:
+        if ua_node.parent in by_id:
+            assert ua_node.parent is by_id[ua_node.parent].nodeid
+
+    loaded = pickle.loads(pickle.dumps(ua_nodes, protocol=pickle.HIGHEST_PROTOCOL))
+    assert [ua_node.content_hash() for ua_node in loaded] == [ua_node.content_hash() for ua_node in ua_nodes]
+    assert [ua_node.refs for ua_node in loaded] == [ua_node.refs for ua_node in ua_nodes]
+    assert all(isinstance(ua_node, UANodeRecord) for ua_node in loaded)
+
+    parser = XMLParser()
+    parser.parse_sync(path)
+    node_datas = parser.get_node_datas()
+    assert len(pickle.dumps(ua_nodes, protocol=pickle.HIGHEST_PROTOCOL)) < len(
+        pickle.dumps(node_datas, protocol=pickle.HIGHEST_PROTOCOL)
+    )
@@ -0,0 +1,118 @@
+import re
+
+import pytest
+
+from conftest import build, write_project
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+
+@pytest.fixture()
+def opcua(tmp_path):
+    app = build(write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"]))
+    return app.env.get_domain("opcua")
+
+
+def test_inverse_references_equal_a_scan_over_all_nodes(opcua):
+    ua_nodes = list(opcua.data["UANodes"])
+    for ua_node in ua_nodes:
+        expected = [
+            (ref.reftype, not ref.forward, other.nodeid)
+            for other in ua_nodes
+            for ref in other.refs
+            if ref.target == ua_node.nodeid
+        ]
+        inverse = opcua.find_inverse_references(ua_node.nodeid)
+        assert [(ref.reftype, ref.forward, ref.target) for ref in inverse] == expected
+
+    # All types of the nodeset are subtypes of core types, which only the inverse references know
+    subtypes = opcua.find_subtypes("i=58")
+    assert {subtype.browsename for subtype in subtypes} == {
+        "1:PackMLAdminObjectType",
+        "1:PackMLBaseObjectType",
+        "1:PackMLStatusObjectType",
+        "2:WDS_PackML_Base",
+    }
+
+    base_type = opcua.find_uanode_by_name("2:WDS_PackML_Base", "UAObjectType")
+    instances = opcua.find_referencing_nodes(base_type.nodeid, "HasTypeDefinition")
+    assert len(instances) == 9
+    assert instances == [
+        other
+        for other in ua_nodes
+        if any(ref.reftype == "HasTypeDefinition" and ref.forward and ref.target == base_type.nodeid for ref in other.refs)
+    ]
+
+
+def reference_rows_by_scan(opcua, uanode):
+    """The reference tables as calculated for each rendered node before the rows got cached."""
+
+    def short_rule(name):
+        m = re.match(r"ModellingRule_(.+)", name)
+        return m.group(1) if m else name
+
+    hierarchical_refs = []
+    for ref in uanode.refs:
+        if ref.reftype in ("HasSubtype", "Organizes", "HasComponent"):
+            hierarchical_refs.append({
+                "Forward": ref.forward, "ReferenceType": ref.reftype, "TargetId": ref.target, "NodeClass": "",
+                "Name": opcua.get_target_name(ref.target), "TypeDefinition": "--", "ModellingRule": "--",
+                "DataType": "--",
+            })
+
+    for child in [other for other in opcua.data["UANodes"] if other.parent == uanode.nodeid]:
+        modelling_rule = type_definition = data_type = ""
+        if child.datatype:
+            data_type = opcua.get_target_name(child.datatype) if re.match(r"i=|ns=", child.datatype) else child.datatype
+        for ref in child.refs:
+            if ref.reftype == "HasModellingRule":
+                modelling_rule = short_rule(opcua.get_target_name(ref.target))
+            if ref.reftype == "HasTypeDefinition":
+                type_definition = opcua.get_target_name(ref.target)
+        for ref in child.refs:
+            if ref.reftype in ("HasComponent", "HasProperty"):
+                hierarchical_refs.append({
+                    "Forward": not ref.forward, "ReferenceType": ref.reftype, "TargetId": child.nodeid,
+                    "NodeClass": child.nodetype, "Name": child.browsename, "TypeDefinition": type_definition,
+                    "ModellingRule": modelling_rule, "DataType": data_type,
+                })
+
+    non_hierarchical_refs = []
+    for ref in uanode.refs:
+        if ref.reftype == "HasModellingRule":
+            target = short_rule(opcua.get_target_name(ref.target))
+        elif ref.reftype == "HasTypeDefinition":
+            target = opcua.get_target_name(ref.target)
+        else:
+            continue
+        non_hierarchical_refs.append(
+            {"Forward": ref.forward, "ReferenceType": ref.reftype, "Target": target, "Target NodeId": ref.target}
+        )
+
+    return hierarchical_refs, non_hierarchical_refs
+
+
+def test_reference_rows_equal_a_scan_and_get_cached(opcua):
+    ua_nodes = list(opcua.data["UANodes"])
+    for ua_node in ua_nodes:
+        assert opcua.get_reference_rows(ua_node) == reference_rows_by_scan(opcua, ua_node)
+
+    store = opcua.data["UANodes"]
+    assert len(store.derived["reference_rows"]) == len(ua_nodes)
+
+    # Each call gets its own row dicts, so changes of a caller do not leak into the cache
+    base_type = opcua.find_uanode_by_name("1:PackMLBaseObjectType", "UAObjectType")
+    hierarchical_refs, _non_hierarchical_refs = opcua.get_reference_rows(base_type)
+    hierarchical_refs[0]["Name"] = "changed"
+    assert opcua.get_reference_rows(base_type) == reference_rows_by_scan(opcua, base_type)
+
+    # A changed model drops the cached rows
+    store.add_source("other", [])
+    assert "reference_rows" not in store.derived
@@ -0,0 +1,42 @@
+from opcuadomain import debug
+from opcuadomain.nodeset import read_nodeset
+from opcuadomain.nodestore import UANodeStore
+from opcuadomain.resolver import NameResolver
+
+
+def make_resolver(nodeset_dir, max_size=4096):
+    _namespaces, aliases, ua_nodes = read_nodeset(str(nodeset_dir / "WDS_Nodeset.xml"))
+    return NameResolver(aliases, UANodeStore(ua_nodes), max_size)
+
+
+def test_resolution_order(nodeset_dir, monkeypatch):
+    monkeypatch.setattr(debug, "CACHE_MEASUREMENTS", {})
+    resolver = make_resolver(nodeset_dir)
+
+    # Core names win over aliases of the same NodeId
+    assert resolver.resolve("i=47") == "HasComponent"
+    assert resolver.resolve("i=58") == "BaseObjectType"
+    assert resolver.resolve("ns=1;i=14") == "PackMLCountDataType"
+    assert resolver.resolve("ns=1;i=6") == "1:PackMLBaseObjectType"
+    assert resolver.resolve("ns=1;i=999999") == "ns=1;i=999999"
+
+    stats = debug.CACHE_MEASUREMENTS["name_resolver"]
+    assert stats["numeric"] == 2
+    assert stats["alias"] == 1
+    assert stats["misses"] == 2
+
+    resolver.resolve("ns=1;i=6")
+    assert stats["misses"] == 2
+    assert stats["hits"] == 4
+
+
+def test_cache_is_bounded(nodeset_dir):
+    resolver = make_resolver(nodeset_dir, max_size=2)
+    for node_id in ("ns=1;i=6", "ns=1;i=1", "ns=1;i=6", "ns=2;i=1"):
+        resolver.resolve(node_id)
+    # "ns=1;i=1" is the least recently used name
+    assert list(resolver._cache) == ["ns=1;i=6", "ns=2;i=1"]
+
+    uncached = make_resolver(nodeset_dir, max_size=0)
+    assert uncached.resolve("ns=1;i=6") == "1:PackMLBaseObjectType"
+    assert not uncached._cache
@@ -0,0 +1,89 @@
+import pytest
+
+from conftest import build, write_project
+
+from opcuadomain.servercache import BrowsedNodes, ServerCache
+from opcuadomain.snapshot import UASnapshot
+
+
+def make_cache(tmp_path, mode):
+    return ServerCache(str(tmp_path / "servers"), mode, 500, 4)
+
+
+async def add_object(server):
+    index = await server.get_namespace_index("http://WDS_instance")
+    await server.nodes.objects.add_object(index, "AddedObject")
+
+
+def test_revalidate_and_offline(nodeset_server, tmp_path):
+    url = nodeset_server.url
+    refresh = make_cache(tmp_path, "refresh")
+    ((namespaces, _aliases, snapshot),) = refresh.load([url])
+    assert isinstance(snapshot, UASnapshot)
+    assert len(snapshot) > 300
+
+    # An unchanged server only gets revalidated and the stored snapshot is used
+    revalidate = make_cache(tmp_path, "revalidate")
+    ((revalidated_namespaces, _aliases, revalidated),) = revalidate.load([url])
+    assert revalidated.token == snapshot.token
+    assert revalidated_namespaces == namespaces
+    assert 0 < revalidate.request_count < refresh.request_count / 2
+
+    nodeset_server.stop()
+
+    offline = make_cache(tmp_path, "offline")
+    ((_namespaces, _aliases, cached),) = offline.load([url])
+    assert cached.token == snapshot.token
+    assert len(cached) == len(snapshot)
+    assert offline.request_count == 0
+
+    # A server, which is not reachable, gets replaced by its snapshot
+    ((_namespaces, _aliases, cached),) = make_cache(tmp_path, "revalidate").load([url])
+    assert cached.token == snapshot.token
+
+    with pytest.raises(ReferenceError):
+        make_cache(tmp_path / "other", "offline").load([url])
+
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: {url}
+
+.. toctree::
+
+   page
+"""
+
+PAGE = """
+Page
+====
+
+No nodes.
+"""
+
+
+def test_off_detects_changed_server(nodeset_server, tmp_path):
+    project = write_project(tmp_path / "project", {"index": INDEX.format(url=nodeset_server.url), "page": PAGE})
+    confoverrides = {"opcua_server_cache": "off"}
+
+    app = build(project, confoverrides=confoverrides)
+    opcua = app.env.get_domain("opcua")
+    _mtime, token = opcua.data["UASources"][nodeset_server.url]
+    assert token is not None
+    assert not (project / "_build" / "doctrees" / "opcua_servers").exists()
+
+    app = build(project, confoverrides=confoverrides)
+    assert "0 changed" in app._status.getvalue()
+
+    nodeset_server.call(add_object)
+    nodes = make_cache(tmp_path, "off").load([nodeset_server.url])[0][2]
+    assert isinstance(nodes, BrowsedNodes)
+    assert nodes.token != token
+
+    app = build(project, confoverrides=confoverrides)
+    assert "1 changed" in app._status.getvalue()
+    opcua = app.env.get_domain("opcua")
+    assert opcua.data["UASources"][nodeset_server.url][1] == nodes.token
+    assert opcua.find_uanode_by_name("3:AddedObject", "UAObject") is not None
@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from conftest import build, read_html, write_project
+
+from opcuadomain.sidecar import SidecarError, read_sidecar, sidecar_matches, write_sidecar
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+   page
+   other
+"""
+
+PAGE = """
+Page
+====
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+OTHER = """
+Other
+=====
+
+Nothing about nodes.
+"""
+
+
+def page_html(project):
+    # The ids of the node containers are random
+    return re.sub(r"SNCB-\w+", "SNCB", read_html(project, "page"))
+
+
+def test_sidecar_header(tmp_path):
+    path = str(tmp_path / "sidecar.pickle")
+    token = write_sidecar(path, {"a": 1})
+
+    assert sidecar_matches(path, token)
+    assert read_sidecar(path, token) == {"a": 1}
+
+    assert not sidecar_matches(path, "other")
+    with pytest.raises(SidecarError):
+        read_sidecar(path, "other")
+    assert not sidecar_matches(str(tmp_path / "missing.pickle"), token)
+
+
+@pytest.mark.parametrize("sidecar", ["opcua_model.pickle", "opcua_needs.pickle"])
+@pytest.mark.parametrize("damage", ["remove", "overwrite"])
+def test_build_recovers_from_damaged_sidecar(tmp_path, sidecar, damage):
+    project = write_project(tmp_path / "project", {"index": INDEX, "page": PAGE, "other": OTHER}, ["WDS_Nodeset.xml"])
+    build(project)
+    expected = page_html(project)
+
+    path = project / "_build" / "doctrees" / sidecar
+    if damage == "remove":
+        path.unlink()
+    else:
+        # Like a build interrupted after writing the sidecar files, but before pickling the environment
+        write_sidecar(str(path), {})
+
+    # Only the documents using the model get read again
+    app = build(project)
+    assert "2 changed" in app._status.getvalue()
+    opcua = app.env.get_domain("opcua")
+    assert len(opcua.data["UANodes"]) == 322
+    assert "ns=1;i=6" in opcua.data["UAObjects"]
+    assert page_html(project) == expected
+
+    # The recovered environment is consistent again
+    app = build(project)
+    assert "0 changed" in app._status.getvalue()
+    assert len(app.env.get_domain("opcua").data["UANodes"]) == 322
@@ -0,0 +1,46 @@
+from conftest import build, read_html, write_project
+
+from opcuadomain.layout import LayoutHandler
+from opcuadomain.utils import get_string_links
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+
+.. opcua:uanode:: 1:PackMLStatusObjectType UAObjectType
+"""
+
+CONF = """
+needs_string_links = {
+    "spec_link": {
+        "regex": r"^PackML(?P<value>\\w+)$",
+        "link_url": "https://spec.example/{{value | lower}}",
+        "link_name": "Spec {{value}}",
+        "options": ["title", "spec"],
+    },
+}
+"""
+
+
+def test_string_links_get_compiled_once_and_rendered(tmp_path):
+    project = write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"], conf=CONF)
+    app = build(project)
+
+    html = read_html(project, "index")
+    assert '<a class="reference external" href="https://spec.example/baseobjecttype">Spec BaseObjectType</a>' in html
+    assert '<a class="reference external" href="https://spec.example/statusobjecttype">Spec StatusObjectType</a>' in html
+
+    string_links = get_string_links(app)
+    assert get_string_links(app) is string_links
+    assert string_links.options == {"title", "spec"}
+    assert string_links.get("title") == [string_links.links["spec_link"]]
+    assert string_links.get("description") == []
+
+    # All layout handlers of a build share the compiled links
+    need = {"id": "test", "docname": "index"}
+    assert LayoutHandler(app, need, "detailed", None).string_link_registry is string_links
+    assert LayoutHandler(app, need, "complete", None).string_link_registry is string_links
@@ -0,0 +1,34 @@
+import pytest
+
+from opcuadomain import debug
+from opcuadomain.templates import TEMPLATE_CACHE, TemplateCache
+from opcuadomain.utils import jinja_parse
+
+
+def test_templates_get_compiled_once(monkeypatch):
+    monkeypatch.setattr(debug, "CACHE_MEASUREMENTS", {})
+    cache = TemplateCache(max_size=2)
+
+    template = cache.get("Hello {{name}}")
+    assert cache.get("Hello {{name}}") is template
+    assert template.render(name="<b>") == "Hello &lt;b&gt;"
+    # The autoescape flag is part of the key
+    assert cache.get("Hello {{name}}", autoescape=False).render(name="<b>") == "Hello <b>"
+    assert debug.CACHE_MEASUREMENTS["jinja_templates"] == {"hits": 1, "misses": 2}
+
+    # The least recently used template gets dropped
+    cache.get("Hello {{name}}")
+    cache.get("Bye {{name}}")
+    assert len(cache) == 2
+    assert cache.get("Hello {{name}}") is template
+    assert debug.CACHE_MEASUREMENTS["jinja_templates"]["misses"] == 3
+
+
+def test_jinja_parse_uses_the_shared_cache():
+    TEMPLATE_CACHE.clear()
+    assert jinja_parse({"value": "a_b"}, "{{value | replace('_', '-')}}") == "a-b"
+    assert jinja_parse({"value": "c_d"}, "{{value | replace('_', '-')}}") == "c-d"
+    assert len(TEMPLATE_CACHE) == 1
+
+    with pytest.raises(ReferenceError, match="error in the jinja statement"):
+        jinja_parse({}, "{{ value ")
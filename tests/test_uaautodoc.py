@@ -0,0 +1,157 @@
+import os
+import re
+
+import pytest
+
+from conftest import build, write_project
+
+from opcuadomain.directives import uaautodoc
+from opcuadomain.nodeset import read_nodeset
+from opcuadomain.nodestore import NamespaceRemapper
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. opcua:uaautodoc:: http://WDS_object
+   :nodeclass: UADataType
+   :pagesize: 2
+"""
+
+
+def generated_pages(project):
+    return sorted(path.name for path in (project / "opcua_autodoc").glob("*.rst"))
+
+
+@pytest.fixture()
+def project(tmp_path):
+    return write_project(tmp_path / "project", {"index": INDEX}, ["WDS_Nodeset.xml"])
+
+
+def test_pages_get_generated(project):
+    app = build(project)
+
+    assert generated_pages(project) == ["index-0-1.rst", "index-0-2.rst", "index-0-3.rst"]
+    source = (project / "opcua_autodoc" / "index-0-1.rst").read_text(encoding="utf-8")
+    assert source.startswith(uaautodoc.AUTODOC_MARKER)
+    assert "opcua_autodoc/index-0-3" in app.env.found_docs
+
+
+def test_only_generated_pages_get_removed(project):
+    build(project)
+    user_page = project / "opcua_autodoc" / "notes.rst"
+    user_page.write_text("Notes\n=====\n", encoding="utf-8")
+
+    (project / "index.rst").write_text(INDEX.replace(":pagesize: 2", ":pagesize: 3"), encoding="utf-8")
+    build(project)
+
+    assert generated_pages(project) == ["index-0-1.rst", "index-0-2.rst", "notes.rst"]
+    assert user_page.read_text(encoding="utf-8") == "Notes\n=====\n"
+
+
+def test_unchanged_sources_skip_the_model(project, monkeypatch):
+    build(project)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("model built for unchanged autodoc sources")
+
+    with monkeypatch.context() as m:
+        m.setattr(uaautodoc, "_build_model", fail)
+        build(project)
+    assert len(generated_pages(project)) == 3
+
+    # Changed nodesets and removed pages get the pages generated again
+    nodeset = project / "WDS_Nodeset.xml"
+    stat = nodeset.stat()
+    os.utime(nodeset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    built = []
+    original = uaautodoc._build_model
+    monkeypatch.setattr(uaautodoc, "_build_model", lambda app, paths: built.append(paths) or original(app, paths))
+    build(project)
+    assert built == [[str(nodeset)]]
+
+    (project / "opcua_autodoc" / "index-0-2.rst").unlink()
+    build(project)
+    assert len(built) == 2
+    assert len(generated_pages(project)) == 3
+
+
+WDS_INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+   a_gim
+
+.. opcua:uaautodoc::
+   :nodeclass: UAObject
+   :pagesize: 41
+
+.. opcua:uaautodoc:: 3
+   :nodeclass: UAObject
+   :pagesize: 4
+"""
+
+GIM_PAGE = """
+GIM
+===
+
+.. opcua:uaimport:: uaNodesGIM.xml
+"""
+
+
+def documented_node_ids(project, pattern):
+    node_ids = []
+    for page in sorted((project / "_build" / "html" / "opcua_autodoc").glob(pattern)):
+        node_ids += re.findall(r'id="(ns=\d+;[^"]+)"', page.read_text(encoding="utf-8"))
+    return node_ids
+
+
+def test_pages_hold_the_nodes_of_the_document_imports_only(tmp_path, nodeset_dir):
+    # The GIM nodeset gets read first, so the WDS namespaces get other indices in the merged model
+    project = write_project(
+        tmp_path / "project", {"index": WDS_INDEX, "a_gim": GIM_PAGE}, ["WDS_Nodeset.xml", "uaNodesGIM.xml"]
+    )
+    app = build(project)
+    opcua = app.env.get_domain("opcua")
+    assert opcua.get_namespace_index("http://WDS_instance") == 5
+
+    _namespaces, _aliases, ua_nodes = read_nodeset(str(nodeset_dir / "WDS_Nodeset.xml"))
+    objects = [ua_node.nodeid for ua_node in ua_nodes if ua_node.nodetype == "UAObject"]
+    remapper = NamespaceRemapper({0: 0, 1: 3, 2: 4, 3: 5})
+    expected = sorted(remapper.nodeid(node_id) for node_id in objects)
+
+    all_objects = documented_node_ids(project, "index-0-*.html")
+    assert len(all_objects) == len(expected) > 41
+    assert sorted(all_objects) == expected
+
+    # The namespace index refers to the namespaces of the imported nodeset
+    instances = documented_node_ids(project, "index-1-*.html")
+    assert sorted(instances) == [node_id for node_id in expected if node_id.startswith("ns=5;")]
+    assert len(instances) == len(set(instances)) > 4
+
+
+def test_pages_follow_the_autodoc_dir(project):
+    build(project)
+    app = build(project, confoverrides={"opcua_autodoc_dir": "generated/nodes"})
+
+    assert generated_pages(project) == []
+    assert sorted(path.name for path in (project / "generated" / "nodes").glob("*.rst")) == [
+        "index-0-1.rst", "index-0-2.rst", "index-0-3.rst"
+    ]
+    assert "generated/nodes/index-0-1" in app.env.found_docs
+    assert "opcua_autodoc/index-0-1" not in app.env.found_docs
+
+
+def test_misplaced_pages_get_reported(project):
+    app = build(project, confoverrides={"exclude_patterns": ["opcua_autodoc"]})
+    assert "3 generated autodoc pages are excluded from the build" in app._warning.getvalue()
+
+    app = build(project, confoverrides={"opcua_autodoc_dir": "../outside"})
+    assert "must be a directory inside the source directory" in app._warning.getvalue()
+    assert not (project.parent / "outside").exists()
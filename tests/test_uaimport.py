@@ -0,0 +1,110 @@
+import shutil
+import sys
+from collections import Counter
+
+from conftest import NODESET_DIR, build, read_html, write_project
+
+from opcuadomain import cache
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+   sub/page
+"""
+
+SUB_PAGE = """
+Page
+====
+
+.. opcua:uaimport:: ../WDS_Nodeset.xml
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+"""
+
+
+def test_same_nodeset_through_different_relative_paths(tmp_path):
+    project = write_project(tmp_path / "project", {"index": INDEX, "sub/page": SUB_PAGE}, ["WDS_Nodeset.xml"])
+    single = write_project(
+        tmp_path / "single", {"index": SUB_PAGE.replace("../WDS_Nodeset.xml", "WDS_Nodeset.xml")}, ["WDS_Nodeset.xml"]
+    )
+
+    opcua = build(project).env.get_domain("opcua")
+
+    path = str(project / "WDS_Nodeset.xml")
+    assert list(opcua.data["UAImports"]) == [path]
+    assert sorted(opcua.data["UAImports"][path]) == ["index", "sub/page"]
+    assert list(opcua.data["UASources"]) == [path]
+    assert len(opcua.data["UANodes"]) == 322
+    assert len(list(opcua.find_child_nodes("ns=1;i=6"))) == 11
+
+    build(single)
+    assert read_html(project, "sub/page").count("<tr") == read_html(single, "index").count("<tr")
+
+
+def test_absolute_import_path_is_relative_to_srcdir(tmp_path):
+    pages = {"index": INDEX, "sub/page": SUB_PAGE.replace("../WDS_Nodeset.xml", "/WDS_Nodeset.xml")}
+    project = write_project(tmp_path / "project", pages, ["WDS_Nodeset.xml"])
+
+    opcua = build(project).env.get_domain("opcua")
+
+    assert list(opcua.data["UAImports"]) == [str(project / "WDS_Nodeset.xml")]
+    assert len(opcua.data["UANodes"]) == 322
+
+
+def test_autodoc_pages_import_the_same_nodeset(tmp_path):
+    auto_page = """
+Auto
+====
+
+.. opcua:uaimport:: ../WDS_Nodeset.xml
+
+.. opcua:uaautodoc:: http://WDS_object
+   :nodeclass: UADataType
+   :pagesize: 2
+"""
+    index = INDEX.replace("sub/page", "sub/auto")
+    project = write_project(tmp_path / "project", {"index": index, "sub/auto": auto_page}, ["WDS_Nodeset.xml"])
+
+    opcua = build(project).env.get_domain("opcua")
+
+    path = str(project / "WDS_Nodeset.xml")
+    assert list(opcua.data["UAImports"]) == [path]
+    importing = opcua.data["UAImports"][path]
+    assert "sub/auto" in importing
+    assert any(docname.startswith("opcua_autodoc/") for docname in importing)
+    assert len(opcua.data["UANodes"]) == 322
+
+
+def test_many_nodesets_get_hashed_once(tmp_path, monkeypatch):
+    names = [f"nodeset_{index:02}.xml" for index in range(60)]
+    lines = [" ".join(names[index:index + 10]) for index in range(0, len(names), 10)]
+    index = "Index\n=====\n\n.. opcua:uaimport:: " + "\n   ".join(lines) + "\n"
+    project = write_project(tmp_path / "project", {"index": index})
+    for name in names:
+        shutil.copy(NODESET_DIR / "uaNodesGIM.xml", project / name)
+
+    # The domain holds file_hash in modules imported by their top-level name as well
+    import opcuadomain.opcua  # noqa: F401
+    counts = Counter()
+    original = cache.file_hash
+
+    def counting_file_hash(path):
+        counts[path] += 1
+        return original(path)
+
+    for module in list(sys.modules.values()):
+        if getattr(module, "file_hash", None) is original:
+            monkeypatch.setattr(module, "file_hash", counting_file_hash)
+
+    opcua = build(project).env.get_domain("opcua")
+
+    paths = [str(project / name) for name in names]
+    assert list(opcua.data["UAImports"]) == paths
+    assert all(opcua.data["UASources"][path][1] == original(path) for path in paths)
+    # Loading from the cache, storing into it and registering the source share one hash per file
+    assert counts == {path: 1 for path in paths}
@@ -0,0 +1,62 @@
+import re
+
+from conftest import build, read_html, write_project
+
+INDEX = """
+Index
+=====
+
+.. opcua:uaimport:: WDS_Nodeset.xml
+
+.. toctree::
+
+   page
+   refs
+"""
+
+PAGE = """
+Page
+====
+
+.. opcua:uanode:: 1:PackMLBaseObjectType UAObjectType
+
+.. opcua:uanode:: 2:SetOrder UAMethod
+"""
+
+REFS = """
+Refs
+====
+
+* :opcua:type:`PackMLBaseObjectType`
+* :opcua:ref:`1:PackMLBaseObjectType`
+* :opcua:ref:`ns=1;i=6`
+* :opcua:obj:`PackMLBaseObjectType`
+* :opcua:method:`SetOrder`
+* :any:`SetOrder`
+"""
+
+
+def test_roles_resolve_documented_nodes(tmp_path):
+    project = write_project(tmp_path / "project", {"index": INDEX, "page": PAGE, "refs": REFS}, ["WDS_Nodeset.xml"])
+    app = build(project)
+
+    items = re.findall(r"<li><p>(.*?)</p></li>", read_html(project, "refs"))
+    links = [re.search(r'href="([^"]*)"', item) for item in items]
+    assert [link and link.group(1) for link in links] == [
+        "page.html#ns=1;i=6",
+        "page.html#ns=1;i=6",
+        "page.html#ns=1;i=6",
+        # The role of objects does not resolve types
+        None,
+        "page.html#ns=2;i=7001",
+        "page.html#ns=2;i=7001",
+    ]
+    assert "opcua-method" in items[-1]
+
+    opcua = app.env.get_domain("opcua")
+    assert opcua.find_xref_target("SetOrder", ("UAMethod",)) == ("UAMethod", "page", "ns=2;i=7001")
+    assert opcua.find_xref_target("SetOrder", ("UAVariable",)) is None
+
+    # The index follows the documented nodes
+    opcua.clear_doc("page")
+    assert opcua.find_xref_target("PackMLBaseObjectType") is None